@@ -0,0 +1,106 @@
+'''
+Sampling throughput of EpisodeDataset compared to an in-memory baseline
+holding the same columns as numpy arrays. A synthetic store is recorded
+first with TrajectoryRecorder.
+
+    python benchmarks/bench_dataset.py --steps 200000 --nagents 10 --nenemies 10
+'''
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from gym_starcraft.dataset import EpisodeDataset
+from gym_starcraft.recorder import TrajectoryRecorder
+
+
+def get_parser():
+    parser = argparse.ArgumentParser('StarCraft dataset benchmark')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Directory for synthetic store (default: temporary directory)')
+    parser.add_argument('--steps', type=int, default=100000,
+                        help='Number of steps to record')
+    parser.add_argument('--episode_length', type=int, default=100,
+                        help='Length of recorded episodes')
+    parser.add_argument('--nagents', type=int, default=10,
+                        help='Number of agents')
+    parser.add_argument('--nenemies', type=int, default=10,
+                        help='Number of enemies')
+    parser.add_argument('--batch_size', type=int, default=256,
+                        help='Batch size of uniform sampling')
+    parser.add_argument('--window', type=int, default=32,
+                        help='Length of sampled windows')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Number of sampled batches to time')
+    return parser
+
+
+def record(args, path):
+    rng = np.random.RandomState(0)
+    recorder = TrajectoryRecorder(path, chunk_size=10000)
+    obs_shape = (args.nagents, 5 + 5 * args.nenemies)
+
+    for step in range(args.steps):
+        if step % args.episode_length == 0:
+            recorder.record_reset()
+
+        done = (step + 1) % args.episode_length == 0
+        recorder.record_step(rng.rand(*obs_shape), rng.randint(0, 9 + args.nenemies, args.nagents),
+                             rng.rand(args.nagents), done, np.ones(args.nagents))
+
+    recorder.close()
+
+
+def load_in_memory(dataset):
+    return {name: dataset.get_rows(name, 0, len(dataset)).copy()
+            for name in dataset.column_names}
+
+
+def timed(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    args = get_parser().parse_args()
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'store')
+
+    start = time.perf_counter()
+    record(args, path)
+    print("Recorded %d steps in %.2fs" % (args.steps, time.perf_counter() - start))
+
+    dataset = EpisodeDataset(path)
+    rng = np.random.RandomState(0)
+
+    start = time.perf_counter()
+    memory = load_in_memory(dataset)
+    print("Loaded in-memory baseline in %.2fs" % (time.perf_counter() - start))
+
+    def memory_sample():
+        indices = rng.randint(0, len(dataset), size=args.batch_size)
+        return {name: column[indices] for name, column in memory.items()}
+
+    def memory_windows():
+        starts = rng.randint(0, len(dataset) - args.window, size=args.batch_size)
+        return [{name: column[s:s + args.window] for name, column in memory.items()}
+                for s in starts]
+
+    results = [
+        ('uniform (mmap)', lambda: dataset.sample(args.batch_size, rng)),
+        ('uniform (memory)', memory_sample),
+        ('windows (mmap)', lambda: dataset.sample_windows(args.batch_size, args.window, rng)),
+        ('windows (memory)', memory_windows),
+        ('episodes (mmap)', lambda: dataset.sample_episodes(args.batch_size, rng))
+    ]
+
+    print("%20s %14s" % ('sampler', 'batches/sec'))
+    for name, func in results:
+        print("%20s %14.1f" % (name, timed(func, args.iterations)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+'''
+Step and reset throughput benchmark of StarCraft environments, run against
+the local TorchCraft stand-in so that it only measures the Python side.
+
+    python benchmarks/bench_env.py --env mvn --nagents 5 10 50 --nenemies_list 5 10 50
+'''
+import argparse
+import random
+import time
+
+import numpy as np
+
+import gym_starcraft.local_torchcraft as local_torchcraft
+local_torchcraft.install()
+
+from gym_starcraft.envs.starcraft_wrapper_env import StarCraftWrapperEnv
+
+
+def get_parser():
+    parser = argparse.ArgumentParser('StarCraft env benchmark')
+    StarCraftWrapperEnv().init_args(parser)
+    parser.add_argument('--env', type=str, default='mvn',
+                        help='Environment to benchmark (mvn|explore)')
+    parser.add_argument('--nagents', type=int, nargs='+', default=[5, 10, 50],
+                        help='Numbers of agents to benchmark')
+    parser.add_argument('--nenemies_list', type=int, nargs='+', default=None,
+                        help='Numbers of enemies, one per entry of --nagents ' +
+                        '(default: same as --nagents)')
+    parser.add_argument('--steps', type=int, default=1000,
+                        help='Number of steps to time per configuration')
+    parser.add_argument('--resets', type=int, default=50,
+                        help='Number of resets to time per configuration')
+    parser.add_argument('--max_steps', type=int, default=100,
+                        help='Max steps of an episode')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed')
+    return parser
+
+
+def make_env(args, nagents, nenemies):
+    args = argparse.Namespace(**vars(args))
+    args.nagents = nagents
+    args.nenemies = nenemies
+
+    if args.env == 'explore':
+        from gym_starcraft.envs.starcraft_explore import StarCraftExplore
+        env_class = StarCraftExplore
+    else:
+        from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+        env_class = StarCraftMvN
+
+    return local_torchcraft.local_env(env_class)(args, final_init=True), args
+
+
+def percentiles(values):
+    return np.percentile(np.array(values) * 1000, [50, 95, 99])
+
+
+def bench(args, nagents, nenemies):
+    random.seed(args.seed)
+    env, env_args = make_env(args, nagents, nenemies)
+    rng = np.random.RandomState(args.seed)
+
+    env.reset()
+    latencies = []
+    start = time.perf_counter()
+
+    for _ in range(args.steps):
+        actions = rng.randint(0, env.nactions, size=env_args.nagents)
+
+        step_start = time.perf_counter()
+        _, _, done, _ = env.step(actions)
+        latencies.append(time.perf_counter() - step_start)
+
+        if done:
+            env.reward_terminal()
+            env.reset()
+
+    steps_per_sec = args.steps / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(args.resets):
+        env.reset()
+    resets_per_sec = args.resets / (time.perf_counter() - start)
+
+    env.close()
+
+    return env_args, steps_per_sec, resets_per_sec, percentiles(latencies)
+
+
+def main():
+    args = get_parser().parse_args()
+    nenemies_list = args.nenemies_list or args.nagents
+
+    print("%8s %8s %12s %12s %10s %10s %10s" % (
+        'nagents', 'nenemies', 'steps/sec', 'resets/sec', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)'))
+
+    for nagents, nenemies in zip(args.nagents, nenemies_list):
+        env_args, steps_per_sec, resets_per_sec, (p50, p95, p99) = bench(args, nagents, nenemies)
+        print("%8d %8d %12.1f %12.1f %10.3f %10.3f %10.3f" % (
+            env_args.nagents, env_args.nenemies, steps_per_sec, resets_per_sec, p50, p95, p99))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+'''
+Import and space construction time of StarCraft environments, each measured
+in fresh interpreters with TorchCraft made unimportable, the way a trainer
+process builds an env with final_init=False just to read its spaces.
+
+    python benchmarks/bench_import.py --env mvn explore --repeats 10
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+
+ENV_MODULES = {
+    'mvn': ('gym_starcraft.envs.starcraft_mvn', 'StarCraftMvN'),
+    'explore': ('gym_starcraft.envs.starcraft_explore', 'StarCraftExplore')
+}
+
+# Run in child interpreter, prints timings in seconds as json
+CHILD_SCRIPT = '''
+import sys, time, json, importlib
+
+# TorchCraft must not be needed for imports and spaces
+sys.modules['torchcraft'] = None
+
+start = time.perf_counter()
+import gym
+gym_end = time.perf_counter()
+
+module = importlib.import_module(%(module)r)
+import_end = time.perf_counter()
+
+from gym_starcraft.envs.starcraft_wrapper_env import StarCraftWrapperEnv
+import argparse
+parser = argparse.ArgumentParser()
+StarCraftWrapperEnv().init_args(parser)
+args = parser.parse_args([])
+args.nagents = args.nenemies = 5
+args.max_steps = 100
+
+env = getattr(module, %(cls)r)(args, final_init=False)
+spaces = (env.action_space, env.observation_space)
+spaces_end = time.perf_counter()
+
+print(json.dumps({
+    'gym': gym_end - start,
+    'import': import_end - gym_end,
+    'spaces': spaces_end - import_end,
+    'total': spaces_end - start,
+    'torchcraft_loaded': any(name.startswith('torchcraft') and sys.modules[name] is not None
+                             for name in sys.modules)
+}))
+'''
+
+
+def get_parser():
+    parser = argparse.ArgumentParser('StarCraft import time benchmark')
+    parser.add_argument('--env', type=str, nargs='+', default=['mvn', 'explore'],
+                        help='Environments to benchmark (mvn|explore)')
+    parser.add_argument('--repeats', type=int, default=10,
+                        help='Number of fresh interpreters per environment')
+    return parser
+
+
+def measure(env):
+    module, cls = ENV_MODULES[env]
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environ = dict(os.environ)
+    environ['PYTHONPATH'] = os.pathsep.join([repo, environ.get('PYTHONPATH', '')])
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD_SCRIPT % {'module': module, 'cls': cls}],
+        env=environ, stderr=subprocess.DEVNULL)
+
+    # Last line, libraries may print warnings on stdout
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    args = get_parser().parse_args()
+
+    print("%8s %12s %12s %12s %12s %12s" % (
+        'env', 'gym (ms)', 'import (ms)', 'spaces (ms)', 'total (ms)', 'torchcraft'))
+
+    for env in args.env:
+        runs = [measure(env) for _ in range(args.repeats)]
+        median = {key: np.median([run[key] for run in runs]) * 1000
+                  for key in ('gym', 'import', 'spaces', 'total')}
+        loaded = any(run['torchcraft_loaded'] for run in runs)
+
+        print("%8s %12.1f %12.1f %12.1f %12.1f %12s" % (
+            env, median['gym'], median['import'], median['spaces'], median['total'],
+            'loaded' if loaded else 'not loaded'))
+
+
+if __name__ == '__main__':
+    main()
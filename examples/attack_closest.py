@@ -55,10 +55,7 @@ if __name__ == '__main__':
         total_reward += env.reward_terminal()
         success += env.stat['success']
         episodes += 1
-        state1 = info['state1']
-        state2 = info['state2']
         print("Reward: ", total_reward)
         print("Success: ", success / episodes)
-        print("Alive:", "Mine:", len(state1.units[state1.player_id]),
-              "Theirs:", len(state2.units[state2.player_id]))
+        print("Alive:", "Mine:", info.get('my_count', 'n/a'), "Theirs:", info.get('enemy_count', 'n/a'))
     env.close()
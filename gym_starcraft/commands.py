@@ -0,0 +1,110 @@
+'''
+Batched encoding of unit orders into TorchCraft commands. Environments
+compute orders of all agents with array ops and the encoder turns them into
+command lists, optionally dropping commands which repeat the last command
+sent to a unit that is still executing it.
+'''
+import numpy as np
+
+from gym_starcraft.torchcraft_constants import tcc
+
+
+def get_move_targets(x, y, actions, move_steps, step_size, low, high):
+    """Get targets of move actions, clamped to [low, high] on both axes
+
+    Arguments:
+        x {np.ndarray} -- X of units in walktiles
+        y {np.ndarray} -- Y of units in walktiles
+        actions {np.ndarray} -- Move action of each unit, index into 'move_steps'
+        move_steps {tuple} -- (dx, dy) direction of each move action
+        step_size {int} -- Walktiles moved per step
+        low {int or tuple} -- Lowest coordinate of target, or (x, y) pair of them
+        high {int or tuple} -- Highest coordinate of target, or (x, y) pair of them
+
+    Returns:
+        tuple -- Integer x and y of targets
+    """
+    steps = np.asarray(move_steps)[actions]
+    low_x, low_y = np.broadcast_to(low, (2,))
+    high_x, high_y = np.broadcast_to(high, (2,))
+    target_x = np.clip(x + steps[:, 0] * step_size, low_x, high_x)
+    target_y = np.clip(y + steps[:, 1] * step_size, low_y, high_y)
+    return target_x.astype(np.int64), target_y.astype(np.int64)
+
+
+class CommandEncoder(object):
+    def __init__(self, suppress_repeated=False):
+        """Encodes orders of rows of a unit table into TorchCraft commands
+
+        Keyword Arguments:
+            suppress_repeated {bool} -- Drop commands which are same as last
+            command of the row while the unit is still executing it (default: {False})
+        """
+        self.suppress_repeated = suppress_repeated
+        self.suppressed = 0
+        self.reset(0)
+
+    def reset(self, count):
+        """Forgets last commands, call it when rows of unit table change"""
+        # Order, target unit id, target x and target y of last command of each row
+        self.last = np.full((count, 4), -2, dtype=np.int64)
+
+    def encode(self, table, rows, orders, targets=None, target_x=None, target_y=None,
+               protected=None):
+        """Returns list of commands for units at 'rows' of 'table', in order of rows
+
+        Arguments:
+            table {UnitTable} -- Unit table of the commanded units
+            rows {np.ndarray} -- Rows of units to command
+            orders {np.ndarray} -- tcc.unitcommandtypes order of each row, Move,
+            Attack_Unit and Stop are supported
+
+        Keyword Arguments:
+            targets {np.ndarray} -- Target unit id for Attack_Unit orders (default: {None})
+            target_x {np.ndarray} -- Target x for Move orders (default: {None})
+            target_y {np.ndarray} -- Target y for Move orders (default: {None})
+            protected {np.ndarray} -- Whether to use command_unit_protected,
+            command_unit is used otherwise (default: {None})
+        """
+        count = len(rows)
+        rows = np.asarray(rows, dtype=np.int64)
+        orders = np.broadcast_to(orders, (count,))
+        minus_one = np.full(count, -1)
+
+        issued = np.stack([
+            orders,
+            minus_one if targets is None else targets,
+            minus_one if target_x is None else target_x,
+            minus_one if target_y is None else target_y
+        ], axis=1).astype(np.int64)
+
+        if len(self.last) != len(table):
+            self.reset(len(table))
+
+        send = np.ones(count, dtype=bool)
+        if self.suppress_repeated:
+            # Stop is being executed while unit is idle, other orders until it is
+            executing = np.where(orders == tcc.unitcommandtypes.Stop,
+                                 table.idle[rows], ~table.idle[rows])
+            send = ~(executing & (issued == self.last[rows]).all(axis=1))
+            self.suppressed += count - np.count_nonzero(send)
+
+        self.last[rows] = issued
+
+        unit_ids = table.id[rows].tolist()
+        command_types = np.where(protected if protected is not None else False,
+                                 tcc.command_unit_protected, tcc.command_unit)
+        command_types = np.broadcast_to(command_types, (count,)).tolist()
+
+        cmds = []
+        for idx in np.flatnonzero(send).tolist():
+            order, target, x, y = issued[idx].tolist()
+
+            if order == tcc.unitcommandtypes.Move:
+                cmds.append([command_types[idx], unit_ids[idx], order, -1, x, y, -1])
+            elif order == tcc.unitcommandtypes.Attack_Unit:
+                cmds.append([command_types[idx], unit_ids[idx], order, target])
+            else:
+                cmds.append([command_types[idx], unit_ids[idx], order])
+
+        return cmds
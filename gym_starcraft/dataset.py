@@ -0,0 +1,123 @@
+'''
+Lazy loader for episodes recorded with `gym_starcraft.recorder.TrajectoryRecorder`.
+Column chunks are memory mapped, so only the rows which are actually sampled
+are read from disk.
+'''
+import json
+import os
+
+import numpy as np
+
+from gym_starcraft.recorder import META_FILE, EPISODES_FILE, chunk_file
+
+
+class EpisodeDataset(object):
+    def __init__(self, path):
+        """Opens store at 'path' for reading
+
+        Arguments:
+            path {str} -- Directory written by TrajectoryRecorder
+        """
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.chunk_size = meta['chunk_size']
+        self.num_steps = meta['num_steps']
+        self.column_names = list(meta['columns'])
+
+        # Plain ndarray views over np.memmap make slicing cheaper
+        self.chunks = {}
+        for name in self.column_names:
+            self.chunks[name] = [np.asarray(np.load(chunk_file(path, name, chunk), mmap_mode='r'))
+                                 for chunk in range(meta['num_chunks'])]
+
+        # (num_episodes, 2) table of episode start and length
+        self.episodes = np.load(os.path.join(path, EPISODES_FILE))
+        self.episode_starts = self.episodes[:, 0]
+        self.episode_ends = self.episodes[:, 0] + self.episodes[:, 1]
+
+    def __len__(self):
+        return self.num_steps
+
+    @property
+    def num_episodes(self):
+        return len(self.episodes)
+
+    def get_rows(self, name, start, stop):
+        """Returns rows [start, stop) of column 'name'. This is a view over the
+        memory mapped file when the rows are in a single chunk, a copy otherwise"""
+        first, last = start // self.chunk_size, (stop - 1) // self.chunk_size
+        offset = first * self.chunk_size
+
+        if first == last:
+            return self.chunks[name][first][start - offset:stop - offset]
+
+        parts = []
+        for chunk in range(first, last + 1):
+            chunk_start = chunk * self.chunk_size
+            parts.append(self.chunks[name][chunk][max(start - chunk_start, 0):
+                                                  min(stop - chunk_start, self.chunk_size)])
+        return np.concatenate(parts)
+
+    def get_episode(self, idx):
+        """Returns dict of column name to rows of episode 'idx'"""
+        start, length = self.episodes[idx]
+        return {name: self.get_rows(name, start, start + length)
+                for name in self.column_names}
+
+    def gather(self, name, indices):
+        """Returns rows of column 'name' at step 'indices' as a new array"""
+        indices = np.asarray(indices)
+        first = self.chunks[name][0]
+        out = np.empty(indices.shape + first.shape[1:], dtype=first.dtype)
+
+        chunk_ids = indices // self.chunk_size
+        for chunk in np.unique(chunk_ids):
+            mask = chunk_ids == chunk
+            out[mask] = self.chunks[name][chunk][indices[mask] - chunk * self.chunk_size]
+
+        return out
+
+    def sample(self, batch_size, rng=np.random):
+        """Samples transitions uniformly over all recorded steps
+
+        Returns:
+            dict -- Columns at sampled steps and 'next_obs', which is the
+            observation of next step or same observation at end of an episode
+        """
+        indices = rng.randint(0, self.num_steps, size=batch_size)
+        batch = {name: self.gather(name, indices) for name in self.column_names}
+
+        # Last step of an episode has no next observation
+        episode = np.searchsorted(self.episode_starts, indices, side='right') - 1
+        is_last = indices + 1 >= self.episode_ends[episode]
+        batch['next_obs'] = self.gather('obs', np.where(is_last, indices, indices + 1))
+
+        return batch
+
+    def sample_episodes(self, count, rng=np.random):
+        """Samples 'count' episodes uniformly, returns list of 'get_episode' dicts"""
+        return [self.get_episode(idx) for idx in rng.randint(0, self.num_episodes, size=count)]
+
+    def sample_windows(self, count, length, rng=np.random):
+        """Samples 'count' windows of 'length' consecutive steps, each within
+        a single episode. Windows are views over the files unless they cross
+        a chunk boundary.
+
+        Returns:
+            list -- List of dicts of column name to 'length' rows
+        """
+        valid = np.flatnonzero(self.episodes[:, 1] >= length)
+        if len(valid) == 0:
+            raise RuntimeError('No episode is at least %d steps long' % length)
+
+        # Weight episodes by number of windows they have, so that windows
+        # are uniform over all valid start steps
+        num_windows = self.episodes[valid, 1] - length + 1
+        choice = rng.choice(len(valid), size=count, p=num_windows / num_windows.sum())
+        offsets = (rng.random_sample(count) * num_windows[choice]).astype(np.int64)
+        starts = self.episodes[valid[choice], 0] + offsets
+
+        return [{name: self.get_rows(name, start, start + length)
+                 for name in self.column_names} for start in starts]
@@ -1,21 +1,41 @@
 import gym
+import numpy as np
 
-import torchcraft.Constants as tcc
+from gym_starcraft.torchcraft_constants import tcc
+import math
 import random
-import yaml
-import subprocess
 import sys
 import time
 import socket, errno
 import os
 import signal
 import atexit
-import uuid
 import gym_starcraft.utils as utils
-import tempfile
+import gym_starcraft.info as step_info
+import gym_starcraft.launcher as launcher
+from gym_starcraft.unit_table import UnitTable
+from gym_starcraft.unit_types import UnitTypeTable
+from gym_starcraft.perf import PhaseTimer
+from gym_starcraft.step_events import StepEvents, ARRIVAL_RADIUS
+from collections import deque
 
 
 DISTANCE_FACTOR = 8
+# Number of last round trips over which client latency is reported
+LATENCY_WINDOW = 1000
+# Frames 'fast_reset' waits for reused units to reach their positions before
+# it falls back to killing and respawning all units
+FAST_RESET_MAX_FRAMES = 240
+
+# Batched target selection functions for scripted enemy AI types
+AI_TARGET_FUNCS = {
+    'attack_closest': utils.get_closest_targets,
+    'attack_weakest': utils.get_weakest_targets,
+    'attack_weakest_in_vision': utils.get_weakest_targets
+}
+# AI types whose target functions only pick targets within vision of each unit
+VISION_AI_TYPES = ('attack_weakest_in_vision',)
+
 class StarCraftBaseEnv(gym.Env):
     def __init__(self, torchcraft_dir='~/TorchCraft',
                  config_path='./config.yml', **kwargs):
@@ -40,7 +60,10 @@ class StarCraftBaseEnv(gym.Env):
         if not self.final_init:
             return
 
-        options = self.load_config_options()
+        if self.launcher_pool is None:
+            options = self.load_config_options()
+        else:
+            options = None
 
         self.start_torchcraft(options)
 
@@ -49,6 +72,7 @@ class StarCraftBaseEnv(gym.Env):
         self.episode_steps = 0
         self.first_reset = True
         self._set_unit_attributes()
+        self.unit_types = UnitTypeTable(tcc.staticvalues, self.unit_attributes, DISTANCE_FACTOR)
 
         # NOTE: These should be overrided in derived class
         # Should be a list of pairs where each pair is
@@ -63,10 +87,30 @@ class StarCraftBaseEnv(gym.Env):
         self.enemy_current_units = {}
         self.agent_ids = []
         self.enemy_ids = []
+        self.my_unit_table = UnitTable([])
+        self.enemy_unit_table = UnitTable([])
         self.state1 = None
         self.obs = None
         self.obs_pre = None
         self.stat = {}
+        self.recorder = None
+        self.round_trips = 0
+        # Frames server advances per exchange, set in init_conn
+        self.server_skip = 1
+        self.reset_stats = {}
+        self.client_latency = (deque(maxlen=LATENCY_WINDOW), deque(maxlen=LATENCY_WINDOW))
+        # Pairs of observation buffers by shape, used when 'obs_buffers' is on
+        self._obs_buffer_pairs = {}
+        # Task of step started by 'step_async'
+        self._pending_step = None
+        # Threads waiting on replies of both clients in async API, created on first use
+        self._recv_executor = None
+        # Dict of enemy unit id to (target id, step it was picked at) and
+        # counts of reused (hits) and newly picked (misses) targets
+        self.ai_targets = {}
+        self.ai_target_stats = {'hits': 0, 'misses': 0}
+        # Orders of current step, used when 'event_step_completion' is on
+        self.step_events = StepEvents(self.max_step_frames)
         self._set_units()
 
     def init_from_kwargs(self, kwargs):
@@ -76,7 +120,8 @@ class StarCraftBaseEnv(gym.Env):
             'server_ip': '127.0.0.1',
             # Speed passed to TorchCraft
             'speed': 0,
-            # AI Type: builtin | attack_closest | attack_weakest,
+            # AI Type: builtin | attack_closest | attack_weakest |
+            # attack_weakest_in_vision,
             'ai_type': 'builtin',
             # Enable fog of war if false
             'full_vision': False,
@@ -94,7 +139,39 @@ class StarCraftBaseEnv(gym.Env):
             # Number of our agents
             'nagents': 1,
             # Number of enemy agents
-            'nenemies': 1
+            'nenemies': 1,
+            # Send commands to both clients before waiting on either reply
+            'concurrent_io': False,
+            # Let TorchCraft skip frames on server instead of empty round trips
+            'server_frame_skip': False,
+            # launcher.LauncherPool to take warm TorchCraft servers from
+            'launcher_pool': None,
+            # Reuse units alive at reset instead of killing and respawning all
+            'fast_reset': False,
+            # Time phases of steps and resets, see 'perf_stats()'
+            'perf_stats': False,
+            # Add timings of phases of last step to info as 'perf'
+            'perf_stats_in_info': False,
+            # Write observations into two preallocated float32 buffers which
+            # are reused in turns, returned obs is overwritten two steps later
+            'obs_buffers': False,
+            # Return a copy of observation from step and reset so that
+            # caller can keep it around when 'obs_buffers' is on
+            'copy_obs': False,
+            # Keep targets of scripted enemy AI for this many steps unless the
+            # target dies or leaves vision, 0 to pick targets every step
+            'ai_retarget_interval': 0,
+            # End steps when an order of any agent finishes (arrival at move
+            # target, attack cooldown reset, idle or death) instead of after
+            # 'frame_skip' frames, see gym_starcraft.step_events
+            'event_step_completion': False,
+            # Max frames of a step with 'event_step_completion'
+            'max_step_frames': 24,
+            # Info returned by step: slim | full, slim is a summary of unit
+            # tables plus raw states not pickled, full has only raw states
+            'info_mode': 'slim',
+            # Seconds to wait for TorchCraft servers to start
+            'launcher_timeout': launcher.STARTUP_TIMEOUT
         }
 
         if kwargs is None:
@@ -113,107 +190,124 @@ class StarCraftBaseEnv(gym.Env):
         self.print_summary = kwargs['print_summary']
         self.nagents = kwargs['nagents']
         self.nenemies = kwargs['nenemies']
+        self.concurrent_io = kwargs['concurrent_io']
+        self.server_frame_skip = kwargs['server_frame_skip']
+        self.launcher_pool = kwargs['launcher_pool']
+        self.fast_reset = kwargs['fast_reset']
+        self.perf_timer = PhaseTimer() if kwargs['perf_stats'] else None
+        self.perf_stats_in_info = kwargs['perf_stats_in_info']
+        self.obs_buffers = kwargs['obs_buffers']
+        self.copy_obs = kwargs['copy_obs']
+        self.ai_retarget_interval = kwargs['ai_retarget_interval']
+        self.event_step_completion = kwargs['event_step_completion']
+        self.max_step_frames = kwargs['max_step_frames']
+        self.info_mode = kwargs['info_mode']
+        self.launcher_timeout = kwargs['launcher_timeout']
+
+        # Select AI's target function only once
+        self.ai_target_func = AI_TARGET_FUNCS.get(self.ai_type)
 
     def load_config_options(self):
         """Load config options from config file and environment"""
-        config = None
-        with open(self.config_path, 'r') as f:
-            try:
-                config = yaml.load(f)
-            except yaml.YAMLError as err:
-                print('Config yaml error', err)
-                sys.exit(0)
-
-        self.bwapi_launcher_path = config['options']['BWAPI_INSTALL_PREFIX']
-
-        # Check if environment contains BWAPI_INSTALL path
-        if 'BWAPI_INSTALL_PREFIX' in os.environ:
-            self.bwapi_launcher_path = os.environ['BWAPI_INSTALL_PREFIX']
-
-        self.bwapi_launcher_path = os.path.join(self.bwapi_launcher_path,
-                                                'bin', 'BWAPILauncher')
-
-        # Set environment variables to be passed directly to BWAPI
-        tmpfile = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
-        options = dict(os.environ)
-        for key, val in config['options'].items():
-            options[key] = str(val)
-
-
-        options['BWAPI_CONFIG_AUTO_MENU__GAME_TYPE'] = "USE MAP SETTINGS"
-        options['BWAPI_CONFIG_AUTO_MENU__AUTO_RESTART'] = "ON"
-        # Use LAN and Local mode to start a self-play kind of mode
-        options['BWAPI_CONFIG_AUTO_MENU__AUTO_MENU'] = "LAN"
-        options['OPENBW_LAN_MODE'] = "LOCAL"
-        options['OPENBW_LOCAL_PATH'] = tmpfile
-        options['BWAPI_CONFIG_AUTO_MENU__MAP'] = os.path.abspath(options['BWAPI_CONFIG_AUTO_MENU__MAP'])
-
+        self.bwapi_launcher_path, options = launcher.load_launcher_config(self.config_path)
         return options
 
     def start_torchcraft(self, options):
-        """Starts torchcraft on available port and given IP with passed options"""
-        cmds = []
-        cmds.append(os.path.expanduser(self.bwapi_launcher_path))
-
-        proc1 = subprocess.Popen(cmds,
-                                 cwd=os.path.expanduser(self.torchcraft_dir),
-                                 env=options,
-                                 stdout=subprocess.PIPE
-                )
-        self._register_kill_at_exit(proc1)
-
-        proc2 = subprocess.Popen(cmds,
-                                 cwd=os.path.expanduser(self.torchcraft_dir),
-                                 env=options,
-                                 stdout=subprocess.PIPE
-                )
-        self._register_kill_at_exit(proc2)
-
-        matchstr = b"TorchCraft server listening on port "
-        for line in iter(proc1.stdout.readline, ''):
-            if len(line) != 0:
-                print(line.rstrip().decode('utf-8'))
-            if line[:len(matchstr)] == matchstr:
-                self.server_port1 = int(line[len(matchstr):].strip())
-                break
+        """Starts torchcraft on available port and given IP with passed options.
+        If a 'launcher_pool' was passed, a warm server pair is taken from it instead.
+        """
+        if self.launcher_pool is not None:
+            self.server_pair = self.launcher_pool.acquire()
+        else:
+            self.server_pair = launcher.start_server_pairs(self.bwapi_launcher_path,
+                                                           self.torchcraft_dir, options,
+                                                           timeout=self.launcher_timeout)[0]
 
-        for line in iter(proc2.stdout.readline, ''):
-            if len(line) != 0:
-                print(line.rstrip().decode('utf-8'))
-            if line[:len(matchstr)] == matchstr:
-                self.server_port2 = int(line[len(matchstr):].strip())
-                break
+        self.server_port1, self.server_port2 = self.server_pair.ports
 
     def init_conn(self):
         """Init connection with torchcraft server"""
         # Import torchcraft in this function so that torchcraft is not an explicit
         # dependency for projects importing this repo
         import torchcraft as tc
-        self.client1 = tc.Client()
-        self.client1.connect(self.server_ip, self.server_port1)
-        self.state1 = self.client1.init()
-
-        self.client2 = tc.Client()
-        self.client2.connect(self.server_ip, self.server_port2)
-        self.state2 = self.client2.init()
-
-        setup = [[tcc.set_combine_frames, 1],
+        try:
+            self._connect_clients(tc)
+        except Exception:
+            if self.launcher_pool is None:
+                raise
+            # A pooled pair can be alive but not take a new client, e.g. when
+            # its previous client did not disconnect cleanly. Replace it once.
+            self._close_clients()
+            self.server_pair.kill()
+            self.start_torchcraft(None)
+            self._connect_clients(tc)
+
+        # NOTE: By default we use custom frameskip method, see _skip_frames.
+        # With 'server_frame_skip', server advances the frame of the step and
+        # 'frame_skip' frames after it on every exchange, same as our method
+        server_skip = 1
+        if self.server_frame_skip:
+            server_skip = self.frame_skip + 1
+        self.server_skip = server_skip
+
+        setup = [[tcc.set_combine_frames, server_skip],
                  [tcc.set_speed, self.speed],
                  [tcc.set_gui, self.set_gui],
-                 # NOTE: We use custom frameskip method now
-                 # Skip frame below
-                 [tcc.set_frameskip, 1],
+                 [tcc.set_frameskip, server_skip],
                  [tcc.set_cmd_optim, 1]]
 
-        self.client1.send(setup)
-        self.state1 = self.client1.recv()
-        self.client2.send(setup)
-        self.state2 = self.client2.recv()
+        self._send_recv(setup, setup)
+
+    def _connect_clients(self, tc):
+        self.client1, self.state1 = self._connect_client(tc, self.server_port1)
+        self.client2, self.state2 = self._connect_client(tc, self.server_port2)
+
+    def _connect_client(self, tc, port):
+        client = tc.Client()
+        if client.connect(self.server_ip, port) is False:
+            raise RuntimeError('Could not connect to TorchCraft server on port ' + str(port))
+        return client, client.init()
+
+    def _close_clients(self):
+        for name in ('client1', 'client2'):
+            client = getattr(self, name, None)
+            if client is not None:
+                client.close()
+            setattr(self, name, None)
+
+    def launcher_logs(self):
+        """Returns last output lines of both BWAPILauncher processes of this
+        env, e.g. for post-mortems after TorchCraft stopped responding"""
+        server_pair = getattr(self, 'server_pair', None)
+        if server_pair is None:
+            return []
+        return server_pair.logs()
 
     def __del__(self):
         if hasattr(self, 'client') and self.client1:
             self.client1.close()
 
+    def close(self):
+        """Close connections with TorchCraft servers and give servers back to
+        'launcher_pool' if the env was created with one, otherwise kill them"""
+        self._close_clients()
+
+        if getattr(self, '_recv_executor', None) is not None:
+            self._recv_executor.shutdown(wait=False)
+            self._recv_executor = None
+
+        server_pair = getattr(self, 'server_pair', None)
+        if server_pair is None:
+            return
+
+        if self.launcher_pool is not None:
+            self.launcher_pool.release(server_pair)
+        else:
+            server_pair.kill()
+
+        self.server_pair = None
+        self.first_reset = True
+
     def _register_kill_at_exit(self, proc):
         atexit.register(proc.kill)
 
@@ -225,8 +319,8 @@ class StarCraftBaseEnv(gym.Env):
 
     def _set_unit_attributes(self):
         # Creating a map for easy access of max cooldowns and other things
-        # NOTE: At the moment, this wrapper supports only air vs air and ground vs ground
-        # matches, some minor changes will be required to support mix.
+        # Types not listed here use ground range column and BWAPI weapon
+        # cooldowns as max, see UnitTypeTable
         self.unit_attributes = {
             # Marine
             0: {
@@ -283,92 +377,392 @@ class StarCraftBaseEnv(gym.Env):
         This makes commands for TorchCraft, sends them and gets back the reward
         Also update statistics and returns new observation based on the action taken
         """
+        return self._run_exchanges(self._step_exchanges(action))
+
+    def _step_exchanges(self, action):
+        """Generator doing the step of '_step'. It yields (cmds1, cmds2) whenever
+        commands need to be exchanged with the clients and expects the new
+        states to be received before it is resumed, so that the same step can
+        be driven by blocking '_step' and by async 'step_wait'.
+        Returns same tuple as '_step'.
+        """
         # Stop stepping if map config has come into play
-        if len(self.state1.aliveUnits.values()) > self.nagents + self.nenemies:
+        if self._has_extra_units():
             reward = self._compute_reward()
-            self.my_current_units = {}
+            self.my_unit_table.update([])
+            self.my_current_units = self.my_unit_table.units
             self.obs = self._make_observation()
             done = True
-            info = {}
-            return self.obs, reward, done, info
+            info = self._get_info()
+            return self._return_obs(), reward, done, info
 
         self.episode_steps += 1
+        timer = self.perf_timer
 
-        cmds = self._make_commands(action)
-        self.client1.send(cmds)
-        self.state1 = self.client1.recv()
+        if timer:
+            step_start = time.perf_counter()
+            timer.start()
+
+        if self.event_step_completion:
+            self.step_events.start(getattr(self.state1, 'frame_from_bwapi', 0))
 
+        # Enemy commands only depend on last state of second client so
+        # they can be made before sending anything
+        cmds = self._make_commands(action)
+        if timer: timer.lap('make_commands')
         enemy_cmds = self._get_enemy_commands()
+        if timer: timer.lap('enemy_commands')
+
+        # Exchange of step skips 'frame_skip' frames on server unless the
+        # step is driven by events, restore it after polls of last step
+        skip_cmds = self._server_skip_commands(
+            1 if self.event_step_completion else self.frame_skip + 1)
+        if len(skip_cmds):
+            cmds = skip_cmds + cmds
+            enemy_cmds = skip_cmds + enemy_cmds
+
+        yield cmds, enemy_cmds
+        if timer: timer.lap('send_recv')
 
-        self.client2.send(enemy_cmds)
-        self.state2 = self.client2.recv()
+        # Steps driven by events poll from the first frame on
+        if not self.event_step_completion:
+            yield from self._skip_frame_exchanges()
+        if timer: timer.lap('skip_frames')
 
-        self._skip_frames()
+        self._update_unit_tables()
 
         while not self._has_step_completed():
-            self._skip_frames(1)
+            yield from self._skip_frame_exchanges(1)
+            self._update_unit_tables()
+        if timer: timer.lap('step_completion')
 
         self.obs = self._make_observation()
+        if timer: timer.lap('make_observation')
         reward = self._compute_reward()
+        if timer: timer.lap('compute_reward')
         done = self._check_done()
         info = self._get_info()
 
+        if self.recorder is not None:
+            alive_mask = info.get('alive_mask', np.ones(np.shape(reward)))
+            self.recorder.record_step(self.obs_pre, action, reward, done, alive_mask)
+
         self._update_stat()
         self.obs_pre = self.obs
-        return self.obs, reward, done, info
+
+        if timer:
+            timer.add('step', time.perf_counter() - step_start)
+            if self.perf_stats_in_info:
+                info['perf'] = dict(timer.last)
+
+        return self._return_obs(), reward, done, info
+
+    def _send_recv(self, cmds1, cmds2):
+        """Send commands to both clients and receive their new states.
+        If 'concurrent_io' is set, commands are sent to both clients before waiting
+        on either reply, so that round trips to both game instances overlap.
+        Time from send to recv of each client is recorded in 'client_latency'.
+        """
+        if self.concurrent_io:
+            start1 = time.perf_counter()
+            self.client1.send(cmds1)
+            start2 = time.perf_counter()
+            self.client2.send(cmds2)
+            self.state1 = self.client1.recv()
+            end1 = time.perf_counter()
+            self.state2 = self.client2.recv()
+            end2 = time.perf_counter()
+        else:
+            start1 = time.perf_counter()
+            self.client1.send(cmds1)
+            self.state1 = self.client1.recv()
+            end1 = start2 = time.perf_counter()
+            self.client2.send(cmds2)
+            self.state2 = self.client2.recv()
+            end2 = time.perf_counter()
+
+        self.client_latency[0].append(end1 - start1)
+        self.client_latency[1].append(end2 - start2)
+        self.round_trips += 1
+
+    def _run_exchanges(self, exchanges):
+        """Runs an exchange generator, doing each round trip with '_send_recv'.
+        Returns the value returned by generator."""
+        try:
+            cmds = next(exchanges)
+            while True:
+                self._send_recv(*cmds)
+                cmds = exchanges.send(None)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _async_run_exchanges(self, exchanges):
+        """Same as '_run_exchanges' but round trips are awaited"""
+        try:
+            cmds = next(exchanges)
+            while True:
+                await self._async_send_recv(*cmds)
+                cmds = exchanges.send(None)
+        except StopIteration as stop:
+            return stop.value
+
+    def _get_recv_executor(self):
+        # One thread per client, so waits of many environments on one loop
+        # don't queue up behind each other in the loop's default executor
+        if self._recv_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._recv_executor = ThreadPoolExecutor(max_workers=2)
+        return self._recv_executor
+
+    async def _async_recv(self, client):
+        """Waits for reply of 'client' without blocking event loop, blocking
+        recv runs in a thread of this environment"""
+        # asyncio is imported by callers of async API already, importing it
+        # here keeps it out of import time of environments
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_recv_executor(), client.recv)
+
+    async def _async_send_recv(self, cmds1, cmds2):
+        """Same as '_send_recv' with 'concurrent_io', waits on replies are awaited"""
+        import asyncio
+
+        start1 = time.perf_counter()
+        self.client1.send(cmds1)
+        start2 = time.perf_counter()
+        self.client2.send(cmds2)
+
+        async def recv1():
+            self.state1 = await self._async_recv(self.client1)
+            return time.perf_counter()
+
+        async def recv2():
+            self.state2 = await self._async_recv(self.client2)
+            return time.perf_counter()
+
+        end1, end2 = await asyncio.gather(recv1(), recv2())
+
+        self.client_latency[0].append(end1 - start1)
+        self.client_latency[1].append(end2 - start2)
+        self.round_trips += 1
+
+    async def async_reset(self):
+        """Coroutine doing same reset as '_reset' without blocking event loop
+        on TorchCraft, so that one loop can drive many environments"""
+        import asyncio
+
+        if self.first_reset:
+            await asyncio.get_running_loop().run_in_executor(None, self.init_conn)
+            self.first_reset = False
+
+        return await self._async_run_exchanges(self._reset_exchanges())
+
+    def step_async(self, action, loop=None):
+        """Starts step of 'action' as a task on 'loop', get its result with
+        'step_wait' awaited on the same loop
+
+        Arguments:
+            action {np.ndarray} -- Action of the step
+
+        Keyword Arguments:
+            loop {asyncio.AbstractEventLoop} -- Loop running the step, the running
+            loop of the caller if None (default: {None})
+        """
+        import asyncio
+
+        if self._pending_step is not None:
+            raise RuntimeError('step_wait should be awaited before next step_async')
+
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                raise RuntimeError('step_async should be called from a running event '
+                                   'loop or be given one through loop')
+
+        self._pending_step = loop.create_task(
+            self._async_run_exchanges(self._step_exchanges(action)))
+
+    async def step_wait(self):
+        """Waits for step started by 'step_async' and returns same as '_step'"""
+        if self._pending_step is None:
+            raise RuntimeError('step_async should be called before step_wait')
+
+        pending, self._pending_step = self._pending_step, None
+        return await pending
+
+    def get_client_latency(self):
+        """Returns mean and last send to recv latency (in seconds) of both clients
+        over last LATENCY_WINDOW round trips"""
+        latency = {}
+
+        for name, values in zip(('client1', 'client2'), self.client_latency):
+            latency[name] = {
+                'mean': sum(values) / len(values) if len(values) else 0.,
+                'last': values[-1] if len(values) else 0.
+            }
+
+        return latency
 
     def _empty_step(self):
         """Make an empty step where we don't send anything to server"""
-        self.client1.send([])
-        self.state1 = self.client1.recv()
-        self.client2.send([])
-        self.state2 = self.client2.recv()
+        self._send_recv([], [])
 
     def _skip_frames(self, skips=-1):
+        """Skip 'skips' frames (default 'frame_skip') through empty steps.
+        With 'server_frame_skip', default skip is already done by the server in
+        the exchange of step itself. Other skips set server frame skip to 1
+        first, so that polls in '_step' stay one frame apart like without it.
+        """
+        self._run_exchanges(self._skip_frame_exchanges(skips))
+
+    def _skip_frame_exchanges(self, skips=-1):
+        """Exchange generator of '_skip_frames', see '_step_exchanges'"""
         if skips == -1:
+            if self.server_frame_skip:
+                return
             skips = self.frame_skip
 
         count = 0
+        cmds = self._server_skip_commands(1)
 
         while count < skips:
-            self._empty_step()
+            yield cmds, cmds
+            cmds = []
             count += 1
 
+    def _server_skip_commands(self, skip):
+        """Returns commands making server advance 'skip' frames per exchange,
+        empty unless 'server_frame_skip' is on and server uses another skip"""
+        if not self.server_frame_skip or self.server_skip == skip:
+            return []
+
+        self.server_skip = skip
+        return [[tcc.set_combine_frames, skip], [tcc.set_frameskip, skip]]
+
     def _get_enemy_commands(self):
         """Get enemy commands based on the 'ai_type'
         NOTE: Override this function in case you want custom enemy AI.
-        TODO: Initialize func for AI only once.
         """
         cmds = []
-        func = lambda *args: None
 
-        if self.ai_type == 'attack_closest':
-            func = utils.get_closest
-        elif self.ai_type == 'attack_weakest':
-            func = utils.get_weakest
+        if self.ai_target_func is None:
+            # No-op or empty cmds means in built AI will be emulated
+            return cmds
+
+        units, opp_units = self._get_ai_units()
 
-        for unit in self.state2.units[self.state2.player_id]:
-            opp_unit = func(unit, self.state2, self.state1.player_id)
+        if len(units) == 0 or len(opp_units) == 0:
+            return cmds
 
-            if opp_unit is None:
+        if self.ai_retarget_interval > 0:
+            return self._get_cached_enemy_commands(units, opp_units)
+
+        # Select targets for all units together from one distance matrix
+        distances = utils.get_distance_matrix(units, opp_units)
+        vision = self.unit_types.sight_range[[unit.type for unit in units]]
+        targets = self._get_ai_targets(units, opp_units, distances, vision)
+
+        for idx in np.flatnonzero(targets >= 0):
+            cmds.append([
+                tcc.command_unit_protected, units[idx].id,
+                tcc.unitcommandtypes.Attack_Unit, opp_units[targets[idx]].id
+            ])
+
+        return cmds
+
+    def _get_ai_targets(self, units, opp_units, distances, vision):
+        """Returns index into 'opp_units' of target of each of 'units' picked by
+        'ai_type', -1 for units whose target is out of their 'vision'"""
+        if self.full_vision:
+            return self.ai_target_func(units, opp_units, distances)
+
+        if self.ai_type in VISION_AI_TYPES:
+            return self.ai_target_func(units, opp_units, distances, vision=vision)
+
+        # Check if the our unit is in range of enemy then attack
+        targets = self.ai_target_func(units, opp_units, distances)
+        in_vision = distances[np.arange(len(units)), targets] <= vision
+        return np.where(in_vision, targets, -1)
+
+    def _get_ai_units(self):
+        """Returns units commanded by scripted enemy AI and units they can attack"""
+        return (self.state2.units.get(self.state2.player_id, []),
+                self.state2.units.get(self.state1.player_id, []))
+
+    def _has_extra_units(self, mine_only=False):
+        """Returns true if map has more units than episode has spawned, e.g. units
+        added by map config. With 'mine_only' only our units are counted."""
+        if mine_only:
+            return len(self.state1.units[self.state1.player_id]) > self.nagents
+        return len(self.state1.aliveUnits.values()) > self.nagents + self.nenemies
+
+    def _get_cached_enemy_commands(self, units, opp_units):
+        """Enemy commands with targets kept in 'ai_targets'. Units only get a new
+        target when they have none, their target died or left their vision, or
+        'ai_retarget_interval' steps have passed. Attack is sent again for a
+        kept target only when the unit has gone idle.
+        """
+        cmds = []
+        opp_rows = {unit.id: idx for idx, unit in enumerate(opp_units)}
+        vision = self.unit_types.sight_range[[unit.type for unit in units]]
+
+        # Row in opp_units of kept target of each unit, -1 if there is none
+        cached = np.full(len(units), -1)
+        for idx, unit in enumerate(units):
+            target_id, step = self.ai_targets.get(unit.id, (None, 0))
+            if self.episode_steps - step < self.ai_retarget_interval:
+                cached[idx] = opp_rows.get(target_id, -1)
+
+        # Kept targets are dropped once they leave vision of the unit
+        has_cached = cached >= 0
+        if np.any(has_cached) and not self.full_vision:
+            position = np.array([(unit.x, unit.y) for unit in units], dtype=float)
+            opp_position = np.array([(unit.x, unit.y) for unit in opp_units], dtype=float)
+            rows = np.flatnonzero(has_cached)
+            delta = position[rows] - opp_position[cached[rows]]
+            has_cached[rows] = np.hypot(delta[:, 0], delta[:, 1]) <= vision[rows]
+
+        targets = np.where(has_cached, cached, -1)
+        retarget = np.flatnonzero(~has_cached)
+
+        # Pick new targets only for units which need one
+        if len(retarget):
+            retarget_units = [units[idx] for idx in retarget]
+            distances = utils.get_distance_matrix(retarget_units, opp_units)
+            targets[retarget] = self._get_ai_targets(retarget_units, opp_units,
+                                                     distances, vision[retarget])
+
+        self.ai_target_stats['hits'] += int(np.count_nonzero(has_cached))
+        self.ai_target_stats['misses'] += len(retarget)
+
+        for idx, unit in enumerate(units):
+            if targets[idx] < 0:
+                self.ai_targets.pop(unit.id, None)
+                continue
+
+            if has_cached[idx] and not unit.idle:
                 continue
-            dist = utils.get_distance(opp_unit.x, opp_unit.y, unit.x, unit.y)
-            vision = tcc.staticvalues['sightRange'][unit.type] / DISTANCE_FACTOR
 
-            # Check if the our unit is in range of enemy then attack
-            if (dist <= vision or self.full_vision):
-                cmds.append([
-                    tcc.command_unit_protected, unit.id,
-                    tcc.unitcommandtypes.Attack_Unit, opp_unit.id
-                ])
+            target_id = opp_units[targets[idx]].id
+            if not has_cached[idx]:
+                self.ai_targets[unit.id] = (target_id, self.episode_steps)
+
+            cmds.append([
+                tcc.command_unit_protected, unit.id,
+                tcc.unitcommandtypes.Attack_Unit, target_id
+            ])
 
-        # No-op or empty cmds means in built AI will be emulated
         return cmds
 
     def try_killing(self):
         """Keeps sending commands to server for killing units
         until they don't wipe off the map"""
+        self._run_exchanges(self._kill_exchanges())
 
+    def _kill_exchanges(self):
+        """Exchange generator of 'try_killing', see '_step_exchanges'"""
         if not self.state1:
             return
 
@@ -377,17 +771,25 @@ class StarCraftBaseEnv(gym.Env):
             c1units = self.state1.units[self.state1.player_id]
             c2units = self.state2.units[self.state2.player_id]
 
-            self.client1.send(self.kill_units(c1units))
-            self.state1 = self.client1.recv()
-
-            self.client2.send(self.kill_units(c2units))
-            self.state2 = self.client2.recv()
+            yield self.kill_units(c1units), self.kill_units(c2units)
 
             for _ in range(10):
-                self._empty_step()
+                yield [], []
 
     def _reset(self):
         """Reset after episode end for next episode"""
+        if self.first_reset:
+            self.init_conn()
+            self.first_reset = False
+
+        return self._run_exchanges(self._reset_exchanges())
+
+    def _reset_exchanges(self):
+        """Exchange generator doing the reset of '_reset' once connection is
+        initialized, see '_step_exchanges'"""
+        self._on_reset()
+        self.ai_targets = {}
+
         wins = self.episode_wins
         episodes = self.episodes
 
@@ -398,12 +800,21 @@ class StarCraftBaseEnv(gym.Env):
         self.episodes += 1
         self.episode_steps = 0
 
-        if self.first_reset:
-            self.init_conn()
-            self.first_reset = False
+        if self.recorder is not None:
+            self.recorder.record_reset()
+
+        start_frame = getattr(self.state1, 'frame_from_bwapi', 0)
+        start_round_trips = self.round_trips
+        timer = self.perf_timer
+
+        if timer:
+            reset_start = time.perf_counter()
+            timer.start()
 
-        # Try killing active units
-        self.try_killing()
+        if not self.fast_reset:
+            # Try killing active units
+            yield from self._kill_exchanges()
+        if timer: timer.lap('reset_kill')
 
         c1 = []
         c2 = []
@@ -415,32 +826,226 @@ class StarCraftBaseEnv(gym.Env):
         for unit_pair in self.enemy_unit_pairs:
             c2 += self._get_create_units_command(self.state2.player_id, unit_pair)
 
-        # Send commands to both clients
-        self.client1.send(c1)
-        self.state1 = self.client1.recv()
-        self.client2.send(c2)
-        self.state2 = self.client2.recv()
+        reused = 0
+        if self.fast_reset:
+            reused = yield from self._reuse_exchanges(c1, c2)
+            if reused is None:
+                # Reused units didn't get to their positions, start over from
+                # empty map
+                yield from self._kill_exchanges()
+
+        if not self.fast_reset or reused is None:
+            # Send commands to both clients
+            yield c1, c2
+
+            # Wait for units to appear on the map
+            while not self._has_spawned(len(c1), len(c2)):
+                yield [], []
+
+        if timer: timer.lap('reset_spawn')
+
+        self.reset_stats = {
+            'frames': getattr(self.state1, 'frame_from_bwapi', 0) - start_frame,
+            'round_trips': self.round_trips - start_round_trips,
+            # True if no unit of last episode was reused, e.g. on first reset
+            'respawned': not reused
+        }
+
+        self._init_episode(self._own_units(self.state1), self._own_units(self.state2))
+
+        if timer:
+            timer.lap('reset_observation')
+            timer.add('reset', time.perf_counter() - reset_start)
+
+        return self._return_obs()
 
-        # Wait for units to appear on the map
-        while len(self.state1.units.get(self.state1.player_id, [])) == 0 \
-              and len(self.state2.units.get(self.state2.player_id, [])) == 0:
-            self._empty_step()
+    def _own_units(self, state):
+        """Returns units of the player of 'state' which belong to this env,
+        reset spawns, reuses and starts episodes with them"""
+        return state.units.get(state.player_id, [])
 
+    def _has_spawned(self, count1, count2):
+        """Returns true once units of reset's 'count1' and 'count2' spawn
+        commands of both players are on the map"""
+        # Units of a reset appear together
+        return len(self._own_units(self.state1)) > 0 or len(self._own_units(self.state2)) > 0
+
+    def _init_episode(self, my_units, enemy_units):
+        """Starts episode with spawned 'my_units' and 'enemy_units' (lists of tc.Unit)
+        as agents and enemies, and makes its first observation"""
         # This adds my_units and enemy_units to object.
-        self.my_current_units = self._parse_units_to_unit_dict(self.state1.units[self.state1.player_id])
-        self.enemy_current_units = self._parse_units_to_unit_dict(self.state2.units[self.state2.player_id])
+        self.my_current_units = self._parse_units_to_unit_dict(my_units)
+        self.enemy_current_units = self._parse_units_to_unit_dict(enemy_units)
 
         # This adds my and enemy's units' ids as incrementing list
         self.agent_ids = list(self.my_current_units)
         self.enemy_ids = list(self.enemy_current_units)
         self.stat = {}
 
+        # Rows of unit tables follow order of agent and enemy ids
+        self.my_unit_table = UnitTable(self.agent_ids)
+        self.enemy_unit_table = UnitTable(self.enemy_ids)
+        self._update_unit_tables()
+
         # Create the observation for current step
         self.obs = self._make_observation()
         self.obs_pre = self.obs
 
+    def _on_reset(self):
+        """Called at start of every reset, override to reset episode state
+        of derived environment"""
+        pass
+
+    def _new_observation(self, shape):
+        """Returns a zeroed array of 'shape' to build a new observation in.
+        With 'obs_buffers' it is one of two preallocated float32 buffers, the
+        one which doesn't hold 'obs_pre', otherwise a newly allocated array.
+        """
+        if not self.obs_buffers:
+            return np.zeros(shape)
+
+        pair = self._obs_buffer_pairs.get(shape)
+        if pair is None:
+            pair = (np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.float32))
+            self._obs_buffer_pairs[shape] = pair
+
+        buffer = pair[1] if pair[0] is self.obs_pre else pair[0]
+        buffer.fill(0)
+        return buffer
+
+    def _return_obs(self):
+        if self.copy_obs:
+            return self.obs.copy()
         return self.obs
 
+    def perf_stats(self):
+        """Returns count, mean, p50, p95 and p99 durations in milliseconds of each
+        phase of steps and resets over last runs, empty if 'perf_stats' is off"""
+        if self.perf_timer is None:
+            return {}
+        return self.perf_timer.stats()
+
+    def _reuse_exchanges(self, spawn_cmds1, spawn_cmds2):
+        """Exchange generator of fast reset, see '_reuse_units'. Waits until
+        both players have as many units as spawn commands and all reused units
+        have reached their positions, then heals reused units again as they
+        may have fought on their way.
+
+        Returns:
+            int -- Number of reused units, None if a reused unit died, stopped
+            short of its position or didn't get there in FAST_RESET_MAX_FRAMES
+        """
+        c1, targets1 = self._reuse_units(spawn_cmds1, self._own_units(self.state1))
+        c2, targets2 = self._reuse_units(spawn_cmds2, self._own_units(self.state2))
+        yield c1, c2
+
+        def settled(state, count, targets, first_poll):
+            """Returns true if units have settled, false if not yet and None
+            if a reused unit can't get to its position anymore"""
+            units = self._own_units(state)
+            positions = {unit.id: unit for unit in units}
+
+            for unit_id, (x, y) in targets.items():
+                unit = positions.get(unit_id)
+                if unit is None:
+                    return None
+
+                if math.hypot(unit.x - x, unit.y - y) > ARRIVAL_RADIUS:
+                    # Units may still report idle before their move takes
+                    # effect, later an idle unit has stopped short
+                    if unit.idle and not first_poll:
+                        return None
+                    return False
+
+            return len(units) == count
+
+        frames = 0
+        first_poll = True
+        while True:
+            status1 = settled(self.state1, len(spawn_cmds1), targets1, first_poll)
+            status2 = settled(self.state2, len(spawn_cmds2), targets2, first_poll)
+
+            if status1 is None or status2 is None:
+                return None
+            if status1 and status2:
+                break
+            if frames >= FAST_RESET_MAX_FRAMES:
+                return None
+
+            yield [], []
+            frames += self.server_skip
+            first_poll = False
+
+        if len(targets1) or len(targets2):
+            yield (self._heal_commands(self.state1, targets1),
+                   self._heal_commands(self.state2, targets2))
+
+        return len(targets1) + len(targets2)
+
+    def _heal_commands(self, state, unit_ids):
+        """Returns commands which restore health and shield of units of
+        'state' with ids in 'unit_ids'"""
+        return [cmd for unit in self._own_units(state)
+                if unit.id in unit_ids
+                for cmd in self._heal_unit_commands(unit)]
+
+    def _heal_unit_commands(self, unit):
+        return [
+            [tcc.command_openbw, tcc.openbwcommandtypes.SetUnitHealth,
+             unit.id, unit.max_health],
+            [tcc.command_openbw, tcc.openbwcommandtypes.SetUnitShield,
+             unit.id, unit.max_shield]
+        ]
+
+    def _reuse_units(self, spawn_cmds, units):
+        """Turns spawn commands for an episode into commands which reuse 'units'
+        still alive on the map. A unit of same type as a spawn command is healed
+        and moved to the position of that command instead of spawning a new one,
+        units which are not needed anymore are killed.
+
+        NOTE: TorchCraft can't teleport units, so reused units walk to their new
+        position, '_reuse_exchanges' waits for them to get there.
+
+        Arguments:
+            spawn_cmds {list} -- SpawnUnit commands as returned by create_units
+            units {list} -- Alive units of the player to reuse
+
+        Returns:
+            tuple -- Commands to send instead of 'spawn_cmds' and dict of
+            reused unit id to its (x, y) target in walktiles
+        """
+        survivors = {}
+        for unit in units:
+            survivors.setdefault(unit.type, []).append(unit)
+
+        cmds = []
+        targets = {}
+        for cmd in spawn_cmds:
+            unit_type, x, y = cmd[3:6]
+
+            if len(survivors.get(unit_type, [])) == 0:
+                cmds.append(cmd)
+                continue
+
+            unit = survivors[unit_type].pop()
+            targets[unit.id] = (x // DISTANCE_FACTOR, y // DISTANCE_FACTOR)
+            cmds += self._heal_unit_commands(unit) + [
+                [tcc.command_unit, unit.id, tcc.unitcommandtypes.Move, -1,
+                 x // DISTANCE_FACTOR, y // DISTANCE_FACTOR, -1]
+            ]
+
+        leftovers = [unit for same_type in survivors.values() for unit in same_type]
+        return cmds + self.kill_units(leftovers), targets
+
+    def _update_unit_tables(self):
+        """Update unit tables in place from latest states and refresh
+        'my_current_units' and 'enemy_current_units' dicts of alive units"""
+        self.my_unit_table.update(self.state1.units.get(self.state1.player_id, []))
+        self.enemy_unit_table.update(self.state2.units.get(self.state2.player_id, []))
+
+        self.my_current_units = self.my_unit_table.units
+        self.enemy_current_units = self.enemy_unit_table.units
+
     def _get_create_units_command(self, player_id, unit_pair):
         """Generates command for creating units"""
 
@@ -542,6 +1147,24 @@ class StarCraftBaseEnv(gym.Env):
         actually completed in the game"""
         raise NotImplementedError
 
+    def _track_orders(self, rows, orders, target_x, target_y):
+        """Tracks orders given to agents at 'rows' of 'my_unit_table' in this
+        step for '_poll_step_events', no-op unless 'event_step_completion' is on"""
+        if not self.event_step_completion:
+            return
+
+        self.step_events.add(self.my_unit_table, rows, orders, target_x, target_y,
+                             self.unit_types.get_cooldown(self.my_unit_table))
+
+    def _poll_step_events(self):
+        """Returns true if an order tracked by '_track_orders' has finished or
+        'max_step_frames' have passed, always true unless 'event_step_completion' is on"""
+        if not self.event_step_completion:
+            return True
+
+        return self.step_events.poll(getattr(self.state1, 'frame_from_bwapi', 0),
+                                     self.unit_types.get_cooldown(self.my_unit_table))
+
     def _compute_reward(self):
         """Returns a computed scalar value based on the game state"""
         raise NotImplementedError
@@ -557,23 +1180,30 @@ class StarCraftBaseEnv(gym.Env):
         """Returns true if the episode was ended"""
         # If either of my units or enemy units has a count of 0 or if
         # we have reached max steps then we are finished
-        return (len(self.state1.units[self.state1.player_id]) == 0 or \
-                len(self.state2.units[self.state2.player_id]) == 0 or \
+        my_count, enemy_count = self._count_alive_units()
+        return (my_count == 0 or enemy_count == 0 or \
                 self.episode_steps == self.max_episode_steps)
 
     def _has_won(self):
         # Our units should be more than 0 and enemy units should be 0
-        return (
-            len(self.state1.units[self.state1.player_id]) > 0 and \
-            len(self.state2.units[self.state2.player_id]) == 0
-        )
+        my_count, enemy_count = self._count_alive_units()
+        return my_count > 0 and enemy_count == 0
+
+    def _count_alive_units(self):
+        """Returns number of my and enemy units on the map"""
+        return (len(self.state1.units[self.state1.player_id]),
+                len(self.state2.units[self.state2.player_id]))
 
     def _get_info(self):
         """Returns a dictionary contains debug info"""
-        return {
-            'state1': self.state1,
-            'state2': self.state2
-        }
+        if self.info_mode == 'full':
+            return {
+                'state1': self.state1,
+                'state2': self.state2
+            }
+
+        return step_info.StepInfo(step_info.summarize(self.my_unit_table, self.enemy_unit_table),
+                                  self.state1, self.state2)
 
     def _update_stat(self):
         if self._check_done():
@@ -1,8 +1,9 @@
 import numpy as np
 from gym import spaces
 
-import torchcraft.Constants as tcc
-import gym_starcraft.utils as utils
+from gym_starcraft.torchcraft_constants import tcc
+import gym_starcraft.commands as commands
+from gym_starcraft.spatial_hash import SpatialHash
 import gym_starcraft.envs.starcraft_mvn as sc
 import random
 
@@ -13,9 +14,6 @@ class StarCraftExplore(sc.StarCraftMvN):
     ONPREY_REWARD = 0.05
 
     def __init__(self, args, final_init=True):
-        if args.nenemies != 1:
-            raise RuntimeError('Only 1 enemy allowed in this case')
-
         if args.enemy_unit_type != 34 or args.our_unit_type != 34:
             print("Warning: Only medic can be used as unit in explore mode")
 
@@ -43,6 +41,10 @@ class StarCraftExplore(sc.StarCraftMvN):
 
         self.vision = args.explore_vision
         self.near_enemy = np.zeros(self.nagents)
+        # Index of closest prey in vision of each agent, -1 if none
+        self.near_prey = np.full(self.nagents, -1)
+        # Prey are hashed in cells of vision size, so each agent checks 3 x 3 cells
+        self.prey_hash = SpatialHash(self.vision)
         self.stay_near_enemy = args.stay_near_enemy
         self.step_size = args.step_size
 
@@ -53,115 +55,102 @@ class StarCraftExplore(sc.StarCraftMvN):
         return spaces.MultiDiscrete([self.nactions])
 
     def _observation_space(self):
+        if self.obs_mode == 'grid':
+            return self._grid_observation_space()
+
         # absolute x, absolute y, (relative_x, relative_y, in_vision) * nenemy
         obs_low = [0.0, 0.0] + [-1.0, -1.0, 0.0] * self.nenemies
         obs_high = [1.0, 1.0] + [1.0, 1.0, 1.0] * self.nenemies
 
         return spaces.Box(np.array(obs_low), np.array(obs_high), dtype=np.float32)
 
-    def _has_step_completed(self):
-        return True
-
-
     def _make_commands(self, actions):
         cmds = []
 
         if self.state1 is None or actions is None:
             return cmds
 
-        for idx in range(self.nagents):
-            agent_id = self.agent_ids[idx]
-
-            if agent_id not in self.my_current_units:
-                continue
-
-            my_unit = self.my_current_units[agent_id]
-            action = actions[idx]
-
-            if self.near_enemy[idx] == 1 and self.stay_near_enemy:
-                cmds.append([
-                    tcc.command_unit,
-                    my_unit.id,
-                    tcc.unitcommandtypes.Stop
-                ])
-                continue
-
-            if action >= len(self.move_steps):
-                cmds.append([
-                    tcc.command_unit,
-                    my_unit.id,
-                    tcc.unitcommandtypes.Stop
-                ])
-                continue
+        me = self.my_unit_table
+        actions = np.asarray(actions, dtype=np.int64)[:self.nagents]
+        alive = me.alive[:self.nagents]
 
-            new_x = my_unit.x + self.move_steps[action][0] * self.step_size
-            new_y = my_unit.y + self.move_steps[action][1] * self.step_size
+        # Agents which stay near prey or take an unknown action are stopped
+        stop = (actions >= len(self.move_steps)) | \
+            ((self.near_enemy == 1) & self.stay_near_enemy)
+        is_move = alive & ~stop
 
-            new_x = min(new_x, self.init_range_end)
-            new_y = min(new_y, self.init_range_end)
+        target_x = np.full(self.nagents, -1, dtype=np.int64)
+        target_y = np.full(self.nagents, -1, dtype=np.int64)
+        target_x[is_move], target_y[is_move] = commands.get_move_targets(
+            me.x[:self.nagents][is_move], me.y[:self.nagents][is_move], actions[is_move],
+            self.move_steps, self.step_size, *self._get_move_bounds())
 
-            new_x = max(new_x, self.init_range_start)
-            new_y = max(new_y, self.init_range_start)
+        rows = np.flatnonzero(alive)
+        orders = np.where(is_move, tcc.unitcommandtypes.Move, tcc.unitcommandtypes.Stop)
 
-            cmds.append([
-                tcc.command_unit, my_unit.id,
-                tcc.unitcommandtypes.Move, -1, int(new_x), int(new_y), -1
-            ])
+        cmds = self.command_encoder.encode(me, rows, orders[rows],
+                                           target_x=target_x[rows], target_y=target_y[rows])
+        self._track_orders(rows, orders[rows], target_x[rows], target_y[rows])
 
         self.prev_actions = actions
         return cmds
 
 
-    def _make_observation(self):
-        myself = None
-        enemy = None
+    def _find_prey_in_vision(self, me, enemy):
+        """Finds all pairs of alive agent and prey within vision through spatial
+        hash of prey, and updates 'near_prey' and 'near_enemy' from them
 
+        Returns:
+            tuple -- Arrays of agent index, prey index and distance of each pair
+        """
+        self.prey_hash.update(enemy['x'], enemy['y'], enemy['alive'])
 
-        full_obs = np.zeros((self.nagents,) + self.observation_space.shape)
+        agent_rows = np.flatnonzero(me['alive'])
+        queries, prey, distances = self.prey_hash.query(me['x'][agent_rows], me['y'][agent_rows],
+                                                        self.vision, enemy['x'], enemy['y'])
+        agents = agent_rows[queries]
 
-        for idx in range(self.nagents):
-            agent_id = self.agent_ids[idx]
+        # Farthest pairs are written first so that closest prey wins
+        order = np.argsort(-distances, kind='stable')
+        self.near_prey[:] = -1
+        self.near_prey[agents[order]] = prey[order]
+        self.near_enemy = (self.near_prey >= 0).astype(np.float64)
 
-            if agent_id in self.my_current_units:
-                myself = self.my_current_units[agent_id]
-            else:
-                myself = None
+        return agents, prey, distances
 
-            if myself is None:
-                continue
+    def _make_observation(self):
+        me, enemy = self._get_unit_arrays()
+        agents, prey, _ = self._find_prey_in_vision(me, enemy)
+        self._update_attack_map(me, enemy)
 
-            curr_obs = full_obs[idx]
-            curr_obs[0] = myself.x / self.state1.map_size[0]
-            curr_obs[1] = myself.y / self.state1.map_size[1]
+        if self.obs_mode == 'grid':
+            return self._make_grid_observation(me, enemy)
 
-            for enemy_idx in range(self.nenemies):
-                enemy_id = self.enemy_ids[enemy_idx]
-                if enemy_id in self.enemy_current_units:
-                    enemy = self.enemy_current_units[enemy_id]
-                else:
-                    enemy = None
+        full_obs = self._new_observation((self.nagents,) + self.observation_space.shape)
+        alive = me['alive']
 
-                if enemy is None:
-                    continue
+        full_obs[alive, 0] = me['x'][alive] / self.state1.map_size[0]
+        full_obs[alive, 1] = me['y'][alive] / self.state1.map_size[1]
 
-                if (myself.attacking or myself.starting_attack) and \
-                    self.prev_actions[idx] == enemy_idx + len(self.move_steps):
-                    self.attack_map[idx][enemy_idx] = 1
+        # (nagents, nenemies, 3) view over prey part of observation, alive
+        # prey are marked out of vision unless they are found in vision
+        prey_obs = full_obs[:, 2:].reshape(self.nagents, self.nenemies, 3)
+        prey_obs[..., 2] = alive[:, None] & enemy['alive'][None, :]
 
-                distance = utils.get_distance(myself.x, myself.y, enemy.x, enemy.y)
+        if self.full_vision:
+            agents, prey = np.nonzero(prey_obs[..., 2])
 
-                obs_idx = 2 + enemy_idx * 3
+        prey_obs[agents, prey, 0] = (me['x'][agents] - enemy['x'][prey]) / self.vision
+        prey_obs[agents, prey, 1] = (me['y'][agents] - enemy['y'][prey]) / self.vision
+        prey_obs[agents, prey, 2] = 0
 
-                if distance <= self.vision or self.full_vision:
-                    curr_obs[obs_idx] = (myself.x - enemy.x) / (self.vision)
-                    curr_obs[obs_idx + 1] = (myself.y - enemy.y) / (self.vision)
-                    curr_obs[obs_idx + 2] = 0
-                else:
-                    curr_obs[obs_idx] = 0
-                    curr_obs[obs_idx + 1] = 0
-                    curr_obs[obs_idx + 2] = 1
         return full_obs
 
+    def _make_grid_observation(self, me, enemy):
+        full_obs = self._new_observation((self.nagents,) + self.observation_space.shape)
+        vision = None if self.full_vision else np.full(self.nagents, self.vision)
+        return self._get_rasterizer().rasterize(me, enemy, vision, out=full_obs)
+
     def _get_enemy_commands(self):
         return []
 
@@ -189,32 +178,17 @@ class StarCraftExplore(sc.StarCraftMvN):
 
 
     def _compute_reward(self):
+        # Prey in vision are found while making observation of the step
         reward = np.zeros(self.nagents)
+        alive = self.my_unit_table.alive[:self.nagents]
+        near = self.near_prey >= 0
 
-        enemy_id = self.enemy_ids[0]
-        enemy = self.enemy_current_units[enemy_id]
-
-        for idx in range(self.nagents):
-            if self.agent_ids[idx] not in self.my_current_units:
-                continue
-
-            unit = self.my_current_units[self.agent_ids[idx]]
-
-            dist = utils.get_distance(unit.x, unit.y, enemy.x, enemy.y)
-
-            if dist <= self.vision:
-                self.near_enemy[idx] = 1
-            else:
-                self.near_enemy[idx] = 0
-
-        for idx in range(self.nagents):
-            if self.agent_ids[idx] not in self.my_current_units:
-                continue
+        # Each agent near a prey is rewarded by number of agents near same prey
+        on_prey = np.bincount(self.near_prey[near], minlength=self.nenemies)
+        count = on_prey[self.near_prey[alive & near]].astype(np.float64)
 
-            if self.near_enemy[idx] == 1:
-                reward[idx] += self.ONPREY_REWARD * (np.count_nonzero(self.near_enemy) ** self.prey_exponent)
-            else:
-                reward[idx] += self.TIMESTEP_PENALTY
+        reward[alive & near] = self.ONPREY_REWARD * count ** self.prey_exponent
+        reward[alive & ~near] = self.TIMESTEP_PENALTY
 
         return reward
 
@@ -5,13 +5,17 @@ class StarCraftExploreComm(sc.StarCraftExplore):
     def __init__(self, args, final_init=True):
         if not args.enemy_comm:
             raise RuntimeError('Explore mode comm can only be run with enemy comm')
+        if args.nenemies != 1:
+            raise RuntimeError('Only 1 enemy allowed in this case')
+        if getattr(args, 'obs_mode', 'vector') != 'vector':
+            raise RuntimeError('Explore mode comm only supports vector observations')
         args.nagents -= 1
         super(StarCraftExploreComm, self).__init__(args, final_init)
         args.nagents += 1
         self.nfriendly = args.nfriendly
 
     def _make_observation(self):
-        full_obs = np.zeros((self.nfriendly + 1, ) + self.observation_space.shape)
+        full_obs = self._new_observation((self.nfriendly + 1, ) + self.observation_space.shape)
 
         full_obs[:self.nfriendly] = super()._make_observation()
 
@@ -0,0 +1,285 @@
+'''
+Multi-arena environment which plays several independent scenarios in one
+OpenBW game, so that one pair of TorchCraft servers and clients serves many
+environments. Arenas are copies of the scenario's bounding box
+('init_range_start' to 'init_range_end') laid out on a grid over the map,
+separated by 'arena_gap' walktiles so units of different arenas never see
+each other.
+
+Each arena is an instance of the wrapped environment class which owns its
+units, unit tables, reward and done handling, but no connection. The
+multi-arena env drives their step and reset exchange generators together,
+merging commands of all arenas into each round trip with the game. Its API
+mirrors StarCraftVecEnv, with arenas instead of worker processes.
+'''
+import numpy as np
+
+import gym_starcraft.envs.starcraft_base_env as sc
+
+
+def arena_env(env_class):
+    """Returns a subclass of 'env_class' which plays in one arena of a game
+    shared with other arenas, see StarCraftMultiArena"""
+    class ArenaEnv(env_class):
+        def load_config_options(self):
+            return None
+
+        def start_torchcraft(self, options):
+            # Connection is owned by StarCraftMultiArena
+            self.server_pair = None
+
+        def set_arena(self, offset, margin, owner):
+            """Places arena at 'offset' (x, y) in walktiles from scenario's bounding
+            box. Units within 'margin' of the box belong to the arena unless
+            'owner' (StarCraftMultiArena) says another arena has them."""
+            self.offset = np.asarray(offset)
+            self.margin = margin
+            self.owner = owner
+
+        def create_units(self, player_id, quantity, **kwargs):
+            cmds = super(ArenaEnv, self).create_units(player_id, quantity, **kwargs)
+
+            # Spawn positions are in pixels
+            for cmd in cmds:
+                cmd[4] += int(self.offset[0]) * sc.DISTANCE_FACTOR
+                cmd[5] += int(self.offset[1]) * sc.DISTANCE_FACTOR
+            return cmds
+
+        def _get_move_bounds(self):
+            return (self.init_range_start + self.offset,
+                    self.init_range_end + self.offset)
+
+        def _get_unit_arrays(self):
+            # Observations use positions relative to arena
+            me, enemy = super(ArenaEnv, self)._get_unit_arrays()
+            for arrays in (me, enemy):
+                arrays['x'] = np.where(arrays['alive'], arrays['x'] - self.offset[0], 0)
+                arrays['y'] = np.where(arrays['alive'], arrays['y'] - self.offset[1], 0)
+            return me, enemy
+
+        def _get_ai_units(self):
+            units = [unit for unit in self.state2.units.get(self.state2.player_id, [])
+                     if unit.id in self.enemy_unit_table.index]
+            opp_units = [unit for unit in self.state2.units.get(self.state1.player_id, [])
+                         if unit.id in self.my_unit_table.index]
+            return units, opp_units
+
+        def _has_extra_units(self, mine_only=False):
+            # Other arenas' units are expected on the map
+            return False
+
+        def _count_alive_units(self):
+            # Map has units of all arenas, only count units of this one
+            return (np.count_nonzero(self.my_unit_table.alive),
+                    np.count_nonzero(self.enemy_unit_table.alive))
+
+        def _arena_units(self, state, player_id):
+            """Returns units of 'player_id' in bounds of arena not owned by other arenas"""
+            low = self.init_range_start + self.offset - self.margin
+            high = self.init_range_end + self.offset + self.margin
+
+            return [unit for unit in state.units.get(player_id, [])
+                    if low[0] <= unit.x <= high[0] and low[1] <= unit.y <= high[1]
+                    and not self.owner.is_owned(unit.id, self)]
+
+        def _own_units(self, state):
+            return self._arena_units(state, state.player_id)
+
+        def _has_spawned(self, count1, count2):
+            # Units of other arenas are on the map too, wait for all of this one
+            return len(self._own_units(self.state1)) >= count1 and \
+                len(self._own_units(self.state2)) >= count2
+
+        def _kill_exchanges(self):
+            # Kill units of this arena only
+            while len(self._own_units(self.state1)) or len(self._own_units(self.state2)):
+                yield (self.kill_units(self._own_units(self.state1)),
+                       self.kill_units(self._own_units(self.state2)))
+
+    ArenaEnv.__name__ = 'Arena' + env_class.__name__
+    return ArenaEnv
+
+
+class StarCraftMultiArena(object):
+    def __init__(self, env_class, args, narenas, arena_gap=64):
+        """Plays 'narenas' copies of the scenario of 'env_class(args)' side by side
+        in one game. Steps and resets of arenas share round trips with the game.
+
+        Arguments:
+            env_class {type} -- StarCraftBaseEnv subclass taking (args, final_init),
+            e.g. StarCraftMvN or StarCraftExplore
+            args {argparse.Namespace} -- Arguments of every arena
+            narenas {int} -- Number of arenas
+
+        Keyword Arguments:
+            arena_gap {int} -- Walktiles between bounding boxes of neighbouring
+            arenas, should be more than sight range of units (default: {64})
+        """
+        if narenas < 1:
+            raise RuntimeError('At least one arena is required')
+
+        self.narenas = narenas
+        self.arena_gap = arena_gap
+
+        # Host env only owns the connection, its own units are never spawned
+        self.host = env_class(args, final_init=True)
+        self.arenas = [arena_env(env_class)(args, final_init=True) for _ in range(narenas)]
+
+        self.action_space = self.host.action_space
+        self.observation_space = self.host.observation_space
+        self.nagents = args.nagents
+
+        # Batched arrays are overwritten by next call like in StarCraftVecEnv
+        shape = (narenas, self.nagents)
+        self.buffers = {
+            'obs': np.zeros(shape + self.observation_space.shape, self.observation_space.dtype),
+            'reward': np.zeros(shape),
+            'reward_terminal': np.zeros(shape),
+            'done': np.ones(narenas, dtype=np.bool_),
+            'alive_mask': np.zeros(shape)
+        }
+
+        # 'stat' of last finished episode of each arena
+        self.stats = [{} for _ in range(narenas)]
+
+        self.placed = False
+
+    def _place_arenas(self):
+        """Lays out arenas on a grid over the map starting at its origin, map
+        size is known after connecting"""
+        arena = self.arenas[0]
+        width = arena.init_range_end - arena.init_range_start
+        spacing = width + self.arena_gap
+        map_size = self.host.state1.map_size
+
+        # Last walktile of a box must be on the map
+        per_row = (map_size[0] - 1 - width) // spacing + 1
+        rows = (self.narenas + per_row - 1) // per_row if per_row > 0 else 0
+
+        if per_row < 1 or (rows - 1) * spacing + width >= map_size[1]:
+            raise RuntimeError('Map is too small for %d arenas' % self.narenas)
+
+        for idx, arena in enumerate(self.arenas):
+            # Offsets are from scenario's bounding box, so usually negative
+            # for first arenas
+            offset = ((idx % per_row) * spacing - arena.init_range_start,
+                      (idx // per_row) * spacing - arena.init_range_start)
+            arena.set_arena(offset, self.arena_gap // 2, self)
+
+        self.placed = True
+
+    def is_owned(self, unit_id, arena):
+        """Returns true if an arena other than 'arena' has unit with 'unit_id'"""
+        for other in self.arenas:
+            if other is not arena and (unit_id in other.my_unit_table.index or
+                                       unit_id in other.enemy_unit_table.index):
+                return True
+        return False
+
+    def _run(self, exchanges):
+        """Runs exchange generators of arenas (dict of arena index to generator)
+        together, each round trip sends merged commands of all of them.
+
+        Returns:
+            dict -- Arena index to value returned by its generator
+        """
+        results = {}
+        pending = {}
+
+        for idx, gen in exchanges.items():
+            try:
+                pending[idx] = next(gen)
+            except StopIteration as stop:
+                results[idx] = stop.value
+
+        while len(pending):
+            cmds1 = [cmd for cmds, _ in pending.values() for cmd in cmds]
+            cmds2 = [cmd for _, cmds in pending.values() for cmd in cmds]
+            self.host._send_recv(cmds1, cmds2)
+
+            for arena in self.arenas:
+                arena.state1 = self.host.state1
+                arena.state2 = self.host.state2
+
+            # Round trip is shared by all arenas with pending exchanges
+            for idx in pending:
+                self.arenas[idx].round_trips += 1
+
+            for idx in list(pending):
+                try:
+                    pending[idx] = exchanges[idx].send(None)
+                except StopIteration as stop:
+                    results[idx] = stop.value
+                    del pending[idx]
+
+        return results
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.narenas)
+        return indices
+
+    def reset(self, indices=None):
+        """Resets arenas at 'indices' (all by default) and returns batched
+        observations of shape (narenas, nagents, obs_dim)"""
+        if self.host.first_reset:
+            self.host.init_conn()
+            self.host.first_reset = False
+            # Clear units left on map before arenas own any
+            self.host.try_killing()
+
+        if not self.placed:
+            self._place_arenas()
+
+        for arena in self.arenas:
+            arena.state1 = self.host.state1
+            arena.state2 = self.host.state2
+
+        indices = self._indices(indices)
+        results = self._run({idx: self.arenas[idx]._reset_exchanges() for idx in indices})
+
+        for idx, obs in results.items():
+            self.buffers['obs'][idx] = obs
+            self.buffers['done'][idx] = False
+
+        return self.buffers['obs']
+
+    def step(self, actions):
+        """Steps arenas which are not done with per arena 'actions' of shape
+        (narenas, nagents) and returns batched obs, reward, done and alive mask.
+        Rows of done arenas are left as they are until the arena is reset.
+        """
+        active = np.flatnonzero(~self.buffers['done'])
+        results = self._run({idx: self.arenas[idx]._step_exchanges(actions[idx])
+                             for idx in active})
+
+        self.buffers['reward'][:] = 0
+        for idx, (obs, reward, done, info) in results.items():
+            self.buffers['obs'][idx] = obs
+            self.buffers['reward'][idx] = reward
+            self.buffers['done'][idx] = done
+            self.buffers['alive_mask'][idx] = info.get('alive_mask', 1)
+
+            if done:
+                self.stats[idx] = dict(self.arenas[idx].stat)
+
+        return (self.buffers['obs'], self.buffers['reward'],
+                self.buffers['done'], self.buffers['alive_mask'])
+
+    def reward_terminal(self, indices=None):
+        """Returns terminal rewards of shape (narenas, nagents), only rows
+        at 'indices' (all by default) are updated"""
+        for idx in self._indices(indices):
+            self.buffers['reward_terminal'][idx] = self.arenas[idx].reward_terminal()
+
+        return self.buffers['reward_terminal']
+
+    def get_stats(self):
+        """Returns list of 'stat' dicts of last finished episode of all arenas,
+        empty for arenas which haven't finished one. Unlike StarCraftVecEnv it
+        isn't the current episode's, as done arenas are usually reset before
+        stats are read and reset clears 'stat'."""
+        return [dict(stat) for stat in self.stats]
+
+    def close(self):
+        self.host.close()
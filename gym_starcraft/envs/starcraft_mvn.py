@@ -7,8 +7,10 @@ import numpy as np
 
 from gym import spaces
 
-import torchcraft.Constants as tcc
+from gym_starcraft.torchcraft_constants import tcc
 import gym_starcraft.utils as utils
+import gym_starcraft.raster as raster
+import gym_starcraft.commands as commands
 import gym_starcraft.envs.starcraft_base_env as sc
 
 # NOTE: Initial coordinates are to be given in exact x and y pixels
@@ -17,6 +19,69 @@ import gym_starcraft.envs.starcraft_base_env as sc
 DISTANCE_FACTOR = 8
 
 
+def compute_step_reward(obs, obs_pre, attack_map, alive_mask, timestep_penalty):
+    """Computes step reward of all agents from current and previous observations.
+    Any leading dimensions are treated as batch dimensions, so observations
+    stacked from multiple environments can be passed in a single call.
+
+    Arguments:
+        obs {np.ndarray} -- Observations of shape (..., nagents, 5 + 5 * nenemies)
+        obs_pre {np.ndarray} -- Previous observations of same shape as obs
+        attack_map {np.ndarray} -- Attacked enemies of shape (..., nagents, nenemies)
+        alive_mask {np.ndarray} -- Alive agents of shape (..., nagents)
+        timestep_penalty {float} -- Penalty given to each alive agent
+
+    Returns:
+        np.ndarray -- Reward of shape (..., nagents)
+    """
+    reward = np.where(np.asarray(alive_mask) != 0, timestep_penalty, 0.0)
+
+    # Give own health difference as negative reward
+    reward += obs[..., 2] - obs_pre[..., 2]
+
+    # If the agent has attacked this enemy, then give diff in enemy's health as +ve reward
+    enemy_hp_diff = obs_pre[..., 8::5] - obs[..., 8::5]
+    reward += np.where(attack_map == 1, enemy_hp_diff, 0).sum(axis=-1)
+
+    return reward
+
+
+def compute_terminal_reward(obs_pre, attack_map, has_won, more_alive):
+    """Computes terminal reward of all agents at the end of an episode.
+    Any leading dimensions are treated as batch dimensions like in
+    'compute_step_reward', 'has_won' and 'more_alive' are then per environment.
+
+    Arguments:
+        obs_pre {np.ndarray} -- Last observations of shape (..., nagents, 5 + 5 * nenemies)
+        attack_map {np.ndarray} -- Attacked enemies of shape (..., nagents, nenemies)
+        has_won {bool or np.ndarray} -- Whether we won, shape (...)
+        more_alive {bool or np.ndarray} -- Whether we have more units alive than
+        enemy when number of agents and enemies are same, shape (...)
+
+    Returns:
+        np.ndarray -- Reward of shape (..., nagents)
+    """
+    nenemies = attack_map.shape[-1]
+    own_hp = obs_pre[..., 2]
+    has_won = np.asarray(has_won)[..., None]
+    more_alive = np.asarray(more_alive)[..., None]
+
+    # Give terminal negative reward of each enemies' health
+    # 3 is the best scaling factor we found in our tests
+    reward = -3 * obs_pre[..., 8::5].sum(axis=-1)
+
+    # If the agent has attacked and we have won, give positive reward
+    # which include some scaling factor of number of enemies and remaining health.
+    # Otherwise give some reward in case we have more units alive than enemy
+    # (remove this to ensure agents have a destructive nature) and if it has
+    # finished, give whole agent's own health as negative reward
+    reward += np.where(has_won & attack_map.any(axis=-1),
+                       5 * nenemies + own_hp * 3,
+                       np.where(more_alive, 2, -own_hp * 3))
+
+    return reward
+
+
 # M units vs N units, starcraft environment
 class StarCraftMvN(sc.StarCraftBaseEnv):
     TIMESTEP_PENALTY = -0.01
@@ -32,6 +97,20 @@ class StarCraftMvN(sc.StarCraftBaseEnv):
         self.init_range_start = args.init_range_start
         self.init_range_end = args.init_range_end
 
+        # Observation mode: vector | grid, grid rasterizes units around each
+        # agent ('grid_crop' walktiles wide, 0 for whole map) into
+        # 'grid_size' x 'grid_size' cells, see gym_starcraft.raster
+        self.obs_mode = getattr(args, 'obs_mode', 'vector')
+        self.grid_size = getattr(args, 'grid_size', 32)
+        self.grid_crop = getattr(args, 'grid_crop', 0)
+        self.features = None
+        self.features_pre = None
+        # Two buffers which reward features of grid mode alternate between
+        self.feature_buffers = None
+        self.rasterizer = None
+        self.command_encoder = commands.CommandEncoder(
+            getattr(args, 'suppress_repeated_commands', False))
+
         super(StarCraftMvN, self).__init__(final_init=final_init, **vars(args))
 
         # NOTE: We don't really need to do this, as it is done by kwargs init already in base
@@ -41,8 +120,6 @@ class StarCraftMvN(sc.StarCraftBaseEnv):
         if not final_init:
             return
 
-        # TODO: Get this dynamically to support heterogenuous
-        self.vision = tcc.staticvalues['sightRange'][self.my_unit_pairs[0][0]] / DISTANCE_FACTOR
         self.full_vision = args.full_vision
         self.free_movement = args.free_movement
         self.step_size = args.step_size
@@ -84,195 +161,206 @@ class StarCraftMvN(sc.StarCraftBaseEnv):
         return spaces.MultiDiscrete([self.nactions])
 
     def _observation_space(self):
+        if self.obs_mode == 'grid':
+            return self._grid_observation_space()
+
         # absolute x, absolute y, my_hp, my_cooldown, prev_action, (relative_x, relative_y, in_vision, enemy_hp, enemy_cooldown) * nenemy
         obs_low = [0.0, 0.0, 0.0, 0.0, 0.0] + [-1.0, -1.0, 0.0, 0.0, 0.0] * self.nenemies
         obs_high = [1.0, 1.0, 1.0, 1.0, 1.0] + [1.0, 1.0, 1.0, 1.0, 1.0] * self.nenemies
 
         return spaces.Box(np.array(obs_low), np.array(obs_high), dtype=np.float32)
 
+    def _grid_observation_space(self):
+        # One grid of cells per channel in raster.CHANNELS, counts and sums of units
+        shape = (len(raster.CHANNELS), self.grid_size, self.grid_size)
+        return spaces.Box(0, np.inf, shape, dtype=np.float32)
+
     def _make_commands(self, actions):
         cmds = []
         if self.state1 is None or actions is None:
             return cmds
 
         # Hack for case when map is not purely cleaned for frame
-        if len(self.state1.units[self.state1.player_id]) > self.nagents:
+        if self._has_extra_units(mine_only=True):
             return cmds
 
-        enemy_unit = None
-
-        for idx in range(self.nagents):
-            agent_id = self.agent_ids[idx]
-
-            if agent_id not in self.my_current_units:
-                # Agent is probably dead
-                continue
-
-            my_unit = self.my_current_units[agent_id]
-            action = actions[idx]
-            prev_action = self.prev_actions[idx]
+        me = self.my_unit_table
+        enemy = self.enemy_unit_table
+        actions = np.asarray(actions, dtype=np.int64)[:self.nagents]
+        prev_actions = np.asarray(self.prev_actions)[:self.nagents]
+        alive = me.alive[:self.nagents]
+        nmoves = len(self.move_steps)
 
-            if action < len(self.move_steps):
-                new_x = my_unit.x + self.move_steps[action][0] * self.step_size
-                new_y = my_unit.y + self.move_steps[action][1] * self.step_size
+        # Move commands always override previous commands (required for kiting)
+        is_move = alive & (actions < nmoves)
+        target_x = np.full(self.nagents, -1, dtype=np.int64)
+        target_y = np.full(self.nagents, -1, dtype=np.int64)
+        target_x[is_move], target_y[is_move] = commands.get_move_targets(
+            me.x[:self.nagents][is_move], me.y[:self.nagents][is_move], actions[is_move],
+            self.move_steps, self.step_size, *self._get_move_bounds())
 
-                new_x = min(new_x, self.init_range_end)
-                new_y = min(new_y, self.init_range_end)
+        # Attack only alive enemies which are in attack range
+        enemy_idx = actions - nmoves
+        is_attack = alive & (enemy_idx >= 0) & (enemy_idx < len(enemy))
+        enemy_idx[~is_attack] = 0
+        targets = np.full(self.nagents, -1, dtype=np.int64)
 
-                new_x = max(new_x, self.init_range_start)
-                new_y = max(new_y, self.init_range_start)
+        if len(enemy):
+            is_attack &= enemy.alive[enemy_idx]
 
-                # Move commands always override previous commands (required for kiting)
-                cmds.append([
-                    tcc.command_unit, my_unit.id,
-                    tcc.unitcommandtypes.Move, -1, int(new_x), int(new_y), -1
-                ])
-            else:
-                enemy_id = action - len(self.move_steps)
+            if not self.unlimited_attack_range:
+                distance = np.hypot(me.x[:self.nagents] - enemy.x[enemy_idx],
+                                    me.y[:self.nagents] - enemy.y[enemy_idx])
+                is_attack &= distance <= self.unit_types.get_range(me)[:self.nagents]
 
-                enemy_id = self.enemy_ids[enemy_id]
+            targets[is_attack] = enemy.id[enemy_idx[is_attack]]
 
-                if enemy_id in self.enemy_current_units:
-                    enemy_unit = self.enemy_current_units[enemy_id]
-                else:
-                    enemy_unit = None
+        rows = np.flatnonzero(is_move | is_attack)
+        orders = np.where(is_move, tcc.unitcommandtypes.Move, tcc.unitcommandtypes.Attack_Unit)
 
-                if not enemy_unit:
-                    continue
+        # Send protected command only if previous command was attack
+        protected = is_attack & (prev_actions >= nmoves)
 
-                distance = utils.get_distance(my_unit.x, -my_unit.y,
-                                              enemy_unit.x, -enemy_unit.y)
+        cmds = self.command_encoder.encode(me, rows, orders[rows], targets=targets[rows],
+                                           target_x=target_x[rows], target_y=target_y[rows],
+                                           protected=protected[rows])
+        self._track_orders(rows, orders[rows], target_x[rows], target_y[rows])
 
-                unit_command = tcc.command_unit_protected
-
-                # Send protected command only if previous command was attack
-                if prev_action < len(self.move_steps):
-                    unit_command = tcc.command_unit
-
-                range_attribute = self.unit_attributes[my_unit.type]['rangeAttribute']
-
-                # Should be in attack range to attack
-                if distance <= getattr(my_unit, range_attribute) or self.unlimited_attack_range:
-                    cmds.append([
-                        unit_command, my_unit.id,
-                        tcc.unitcommandtypes.Attack_Unit, enemy_unit.id
-                    ])
         self.prev_actions = actions
         return cmds
 
-    def _make_observation(self):
-        myself = None
-        enemy = None
+    def _get_move_bounds(self):
+        """Returns lowest and highest coordinate of move targets, each either
+        same for both axes or an (x, y) pair"""
+        return self.init_range_start, self.init_range_end
 
-        full_obs = np.zeros((self.nagents,) + self.observation_space.shape)
-
-        for idx in range(self.nagents):
-            agent_id = self.agent_ids[idx]
+    def _get_unit_arrays(self):
+        """Returns arrays of 'utils.get_unit_arrays' for agents and enemies"""
+        me = utils.get_unit_arrays(self.my_unit_table, self.unit_types)
+        enemy = utils.get_unit_arrays(self.enemy_unit_table, self.unit_types)
+        me = {key: value[:self.nagents] for key, value in me.items()}
+        enemy = {key: value[:self.nenemies] for key, value in enemy.items()}
+        return me, enemy
 
-            if agent_id in self.my_current_units:
-                myself = self.my_current_units[agent_id]
-            else:
-                myself = None
-
-            if myself is None:
-                continue
-
-            curr_obs = full_obs[idx]
-            curr_obs[0] = myself.x / self.state1.map_size[0]
-            curr_obs[1] = myself.y / self.state1.map_size[1]
-
-            # To simplify add unit's health and shield points
-            curr_obs[2] = (myself.health + myself.shield) / (myself.max_health + myself.max_shield)
-
-            cd = getattr(myself, self.unit_attributes[myself.type]['cdAttribute'])
-
-            curr_obs[3] = cd / self.unit_attributes[myself.type]['maxCD']
-            curr_obs[4] = self.prev_actions[idx] / self.nactions
-
-            # Get observation for each enemy for each agent
-            for enemy_idx in range(self.nenemies):
-                enemy_id = self.enemy_ids[enemy_idx]
-                if enemy_id in self.enemy_current_units:
-                    enemy = self.enemy_current_units[enemy_id]
-                else:
-                    enemy = None
-
-                if enemy is None:
-                    continue
-
-                if (myself.attacking or myself.starting_attack) and \
-                    self.prev_actions[idx] == enemy_idx + len(self.move_steps):
-                    self.attack_map[idx][enemy_idx] = 1
-
-                distance = utils.get_distance(myself.x, myself.y, enemy.x, enemy.y)
-
-                obs_idx = 5 + enemy_idx * 5
-
-                if distance <= self.vision or self.full_vision:
-                    curr_obs[obs_idx] = (myself.x - enemy.x) / (self.vision)
-                    curr_obs[obs_idx + 1] = (myself.y - enemy.y) / (self.vision)
-                    curr_obs[obs_idx + 2] = 0
-                else:
-                    curr_obs[obs_idx] = 0
-                    curr_obs[obs_idx + 1] = 0
-                    curr_obs[obs_idx + 2] = 1
-
-                curr_obs[obs_idx + 3] = (enemy.health + enemy.shield) / (enemy.max_health + enemy.max_shield)
-                cd = getattr(enemy, self.unit_attributes[enemy.type]['cdAttribute'])
-                curr_obs[obs_idx + 4] =  cd / self.unit_attributes[enemy.type]['maxCD']
+    def _make_observation(self):
+        me, enemy = self._get_unit_arrays()
+
+        if self.obs_mode != 'grid':
+            full_obs = self._new_observation((self.nagents,) + self.observation_space.shape)
+            return self._make_features(full_obs, me, enemy)
+
+        self._make_reward_features(me, enemy)
+
+        full_obs = self._new_observation((self.nagents,) + self.observation_space.shape)
+        vision = None if self.full_vision else me['vision']
+        return self._get_rasterizer().rasterize(me, enemy, vision, out=full_obs)
+
+    def _get_rasterizer(self):
+        """Returns rasterizer of grid observations for map of current game"""
+        map_size = tuple(self.state1.map_size[:2])
+        if self.rasterizer is None or self.rasterizer.map_size != map_size:
+            self.rasterizer = raster.Rasterizer(self.grid_size, self.grid_crop, map_size)
+        return self.rasterizer
+
+    def _make_reward_features(self, me, enemy):
+        """Fills columns of vector features which rewards read, own health and
+        health of enemies, for grid mode where vector features are not observed"""
+        self._update_attack_map(me, enemy)
+
+        shape = (self.nagents, 5 + 5 * self.nenemies)
+        if self.feature_buffers is None or self.feature_buffers[0].shape != shape:
+            self.feature_buffers = (np.zeros(shape), np.zeros(shape))
+
+        # Write into buffer which doesn't hold current features, they become previous
+        features = self.feature_buffers[1 if self.features is self.feature_buffers[0] else 0]
+        pair_alive = me['alive'][:, None] & enemy['alive'][None, :]
+        features[:, 2] = np.where(me['alive'], me['hp'], 0)
+        features[:, 8::5] = np.where(pair_alive, enemy['hp'][None, :], 0)
+
+        self.features_pre = features if self.features is None else self.features
+        self.features = features
+
+    def _update_attack_map(self, me, enemy):
+        """Mark enemies which are being attacked as per previous action"""
+        prev_actions = np.asarray(self.prev_actions, dtype=np.float64)
+        target = prev_actions - len(self.move_steps)
+        attacked = me['alive'] & me['attacking'] & (target >= 0) & (target < self.nenemies)
+        attacked_rows = np.flatnonzero(attacked)
+        attacked_cols = target[attacked].astype(int)
+        attacked_alive = enemy['alive'][attacked_cols]
+        self.attack_map[attacked_rows[attacked_alive], attacked_cols[attacked_alive]] = 1
+
+    def _make_features(self, full_obs, me, enemy):
+        """Fills vector observation 'full_obs' of all agents from unit arrays"""
+        # Read state of all units from unit tables, then build every
+        # (agent, enemy) block together through broadcasting
+        alive = me['alive']
+        prev_actions = np.asarray(self.prev_actions, dtype=np.float64)
+
+        full_obs[alive, 0] = me['x'][alive] / self.state1.map_size[0]
+        full_obs[alive, 1] = me['y'][alive] / self.state1.map_size[1]
+
+        # To simplify add unit's health and shield points
+        full_obs[alive, 2] = me['hp'][alive]
+        full_obs[alive, 3] = me['cd'][alive]
+        full_obs[alive, 4] = prev_actions[alive] / self.nactions
+
+        self._update_attack_map(me, enemy)
+
+        # (nagents, nenemies, 5) view over enemy part of observation
+        enemy_obs = full_obs[:, 5:].reshape(self.nagents, self.nenemies, 5)
+        pair_alive = alive[:, None] & enemy['alive'][None, :]
+
+        rel_x = me['x'][:, None] - enemy['x'][None, :]
+        rel_y = me['y'][:, None] - enemy['y'][None, :]
+
+        # Vision depends on type of each agent
+        vision = me['vision'][:, None]
+        in_vision = np.hypot(rel_x, rel_y) <= vision
+        if self.full_vision:
+            in_vision[:] = True
+
+        visible = pair_alive & in_vision
+        enemy_obs[..., 0] = np.where(visible, rel_x / vision, 0)
+        enemy_obs[..., 1] = np.where(visible, rel_y / vision, 0)
+        enemy_obs[..., 2] = pair_alive & ~in_vision
+        enemy_obs[..., 3] = np.where(pair_alive, enemy['hp'][None, :], 0)
+        enemy_obs[..., 4] = np.where(pair_alive, enemy['cd'][None, :], 0)
 
         return full_obs
 
-    def _compute_reward(self):
-        reward = np.zeros(self.nagents)
+    def _get_features(self):
+        """Returns current and previous vector observations, used for rewards"""
+        if self.obs_mode == 'grid':
+            return self.features, self.features_pre
+        return self.obs, self.obs_pre
 
-        for idx in range(self.nagents):
-            if self.agent_ids[idx] in self.my_current_units:
-                reward[idx] += self.TIMESTEP_PENALTY
-            # Give own health difference as negative reward
-            reward[idx] += self.obs[idx][2] - self.obs_pre[idx][2]
-
-            for enemy_idx in range(self.nenemies):
-                obs_idx = 5 + enemy_idx * 5
-                # If the agent has attacked this enemy, then give diff in enemy's health as +ve reward
-                if self.attack_map[idx][enemy_idx] == 1:
-                    reward[idx] += self.obs_pre[idx][obs_idx + 3] - self.obs[idx][obs_idx + 3]
-
-        return reward
+    def _compute_reward(self):
+        features, features_pre = self._get_features()
+        return compute_step_reward(features, features_pre, self.attack_map,
+                                   self._get_alive_mask(), self.TIMESTEP_PENALTY)
 
     def reward_terminal(self):
         # Terminal reward based on whether we won or not
-        reward = np.zeros(self.nagents)
+        has_won = self._has_won() == 1
+        more_alive = self.nagents == self.nenemies and \
+            len(self.my_current_units) > len(self.enemy_current_units)
 
-        for idx in range(self.nagents):
-            # Give terminal negative reward of each enemies' health
-            for enemy_idx in range(self.nenemies):
-                obs_idx = 5 + enemy_idx * 5
-                # 3 is the best scaling factor we found in our tests
-                reward[idx] += 0 - self.obs_pre[idx][obs_idx + 3] * 3
-
-            # If the agent has attacked and we have won, give positive reward
-            # which include some scaling factor of number of enemies and remaining health
-            if self._has_won() == 1 and self.attack_map[idx].any():
-                reward[idx] += +5 * self.nenemies + self.obs_pre[idx][2] * 3
-            elif self.nagents == self.nenemies and len(self.my_current_units) > len(self.enemy_current_units):
-                # Give some reward in case we didn't won but we have more units alive than enemy
-                # Remove this to ensure agents have a destructive nature
-                reward[idx] += 2
-            else:
-                # If it has finished, give whole agent's own health as negative reward
-                reward[idx] += 0 - self.obs_pre[idx][2] * 3
-
-        if self._has_won() == 1:
+        # Last features, as 'obs_pre' is current observation after a step
+        features = self.features if self.obs_mode == 'grid' else self.obs_pre
+        reward = compute_terminal_reward(features, self.attack_map,
+                                         has_won, more_alive)
+
+        if has_won:
             self.episode_wins += 1
 
         return reward
 
     def _has_step_completed(self):
-        return True
+        return self._poll_step_events()
 
-    def _get_info(self):
-        # Add alive mask to info for use by downstream trainer
+    def _get_alive_mask(self):
+        """Returns 1 for agents which are still alive and 0 otherwise"""
         alive_mask = np.ones(self.nagents)
 
         for idx in range(self.nagents):
@@ -281,8 +369,12 @@ class StarCraftMvN(sc.StarCraftBaseEnv):
             if agent_id not in self.my_current_units:
                 alive_mask[idx] = 0
 
-        info = {'alive_mask': alive_mask}
-        info.update(super()._get_info())
+        return alive_mask
+
+    def _get_info(self):
+        # Add alive mask to info for use by downstream trainer
+        info = super()._get_info()
+        info['alive_mask'] = self._get_alive_mask()
 
         return info
 
@@ -290,6 +382,10 @@ class StarCraftMvN(sc.StarCraftBaseEnv):
         return self._step(action)
 
     def reset(self):
+        return self._reset()
+
+    def _on_reset(self):
         # Reset the environment for next step
         self.attack_map = np.zeros((self.nagents, self.nenemies))
-        return self._reset()
+        self.features = None
+        self.command_encoder.reset(self.nagents)
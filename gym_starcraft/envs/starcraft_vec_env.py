@@ -0,0 +1,278 @@
+'''
+Vectorized environment which runs multiple StarCraft environments in worker
+processes. Each worker owns its env (and so its TorchCraft servers and clients)
+and writes observations, rewards, done flags and alive masks directly into
+shared memory arrays, so the trainer gets batched arrays back without any
+pickling of step results.
+'''
+import ctypes
+import multiprocessing as mp
+
+import numpy as np
+
+
+def _shared_array(ctx, shape, dtype):
+    """Allocates a shared memory block and returns it with a numpy view over it"""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    raw = ctx.RawArray(ctypes.c_byte, max(nbytes, 1))
+    return raw, _as_array(raw, shape, dtype)
+
+
+def _as_array(raw, shape, dtype):
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    return np.frombuffer(raw, dtype=dtype, count=count).reshape(shape)
+
+
+def _worker(remote, parent_remote, env_class, args, index, raw_buffers, specs):
+    """Runs a single env and writes its results into row 'index' of the shared buffers"""
+    parent_remote.close()
+
+    buffers = {}
+    for key, raw in raw_buffers.items():
+        shape, dtype = specs[key]
+        buffers[key] = _as_array(raw, shape, dtype)
+
+    # Parent waits for construction, errors of it are sent like errors of commands
+    try:
+        env = env_class(args, final_init=True)
+    except Exception as err:
+        remote.send(err)
+        remote.close()
+        return
+
+    remote.send(None)
+
+    while True:
+        try:
+            cmd, data = remote.recv()
+        except EOFError:
+            break
+
+        try:
+            if cmd == 'step':
+                obs, reward, done, info = env.step(data)
+                buffers['obs'][index] = obs
+                buffers['reward'][index] = reward
+                buffers['done'][index] = done
+                buffers['alive_mask'][index] = info.get('alive_mask', 1)
+                remote.send(None)
+            elif cmd == 'reset':
+                buffers['obs'][index] = env.reset()
+                buffers['reward'][index] = 0
+                buffers['done'][index] = False
+                buffers['alive_mask'][index] = 1
+                remote.send(None)
+            elif cmd == 'reward_terminal':
+                buffers['reward_terminal'][index] = env.reward_terminal()
+                remote.send(None)
+            elif cmd == 'stat':
+                remote.send(dict(env.stat))
+            elif cmd == 'close':
+                env.close()
+                remote.send(None)
+                break
+            else:
+                raise NotImplementedError('Unknown command ' + str(cmd))
+        except Exception as err:
+            remote.send(err)
+
+    remote.close()
+
+
+class StarCraftVecEnv(object):
+    def __init__(self, env_class, args_list, start_method=None):
+        """Starts one worker process per entry of 'args_list', each running
+        'env_class(args, final_init=True)'. Works with any env taking (args, final_init)
+        like StarCraftMvN, StarCraftExplore or StarCraftExploreComm. Returns once
+        every worker has built its env, errors of building them are raised here.
+
+        Arrays returned by 'reset', 'step_wait' and 'reward_terminal' are views
+        over shared memory and are overwritten by next call, copy them if needed.
+
+        Arguments:
+            env_class {type} -- StarCraftBaseEnv subclass to instantiate in workers
+            args_list {list} -- List of argparse namespaces, one per environment
+
+        Keyword Arguments:
+            start_method {str} -- multiprocessing start method (default: {None})
+        """
+        self.nenvs = len(args_list)
+
+        if self.nenvs == 0:
+            raise RuntimeError('At least one environment is required')
+
+        # Build env with final_init=False just for spaces, nothing is started
+        template = env_class(args_list[0], final_init=False)
+        self.action_space = template.action_space
+        self.observation_space = template.observation_space
+
+        # args.nagents is number of observation rows for every env type
+        self.nagents = args_list[0].nagents
+        for args in args_list:
+            if args.nagents != self.nagents:
+                raise RuntimeError('All environments should have same number of agents')
+
+        shape = (self.nenvs, self.nagents)
+        specs = {
+            'obs': (shape + self.observation_space.shape, self.observation_space.dtype),
+            'reward': (shape, np.float64),
+            'reward_terminal': (shape, np.float64),
+            'done': ((self.nenvs,), np.bool_),
+            'alive_mask': (shape, np.float64)
+        }
+
+        ctx = mp.get_context(start_method)
+        raw_buffers = {}
+        self.buffers = {}
+        for key, (buffer_shape, dtype) in specs.items():
+            raw_buffers[key], self.buffers[key] = _shared_array(ctx, buffer_shape, dtype)
+
+        self.remotes = []
+        self.processes = []
+
+        for index, args in enumerate(args_list):
+            # Pipe of each worker is created just before it starts, so that
+            # forked workers don't hold worker ends of other pipes open and
+            # exit of a worker is seen as end of file of its pipe
+            remote, work_remote = ctx.Pipe()
+            process = ctx.Process(target=_worker,
+                                  args=(work_remote, remote, env_class, args,
+                                        index, raw_buffers, specs))
+            process.daemon = True
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        self.waiting = False
+        self.closed = False
+
+        self._wait_started()
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.nenvs)
+        return indices
+
+    def _exit_error(self, idx):
+        self.processes[idx].join(1)
+        return RuntimeError('StarCraft worker %d exited with code %s' %
+                            (idx, self.processes[idx].exitcode))
+
+    def _send(self, idx, cmd, data=None):
+        try:
+            self.remotes[idx].send((cmd, data))
+        except BrokenPipeError:
+            raise self._exit_error(idx)
+
+    def _recv(self, idx):
+        """Returns reply of worker 'idx', or RuntimeError if the worker has exited"""
+        try:
+            return self.remotes[idx].recv()
+        except EOFError:
+            return self._exit_error(idx)
+
+    def _wait(self, indices):
+        results = [self._recv(idx) for idx in indices]
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise RuntimeError('Error in StarCraft worker: ' + repr(result))
+
+        return results
+
+    def _wait_started(self):
+        """Waits for all workers to build their env. If any of them fails, the
+        others are closed and the error is raised."""
+        results = [self._recv(idx) for idx in range(self.nenvs)]
+        errors = [result for result in results if isinstance(result, Exception)]
+
+        if len(errors) == 0:
+            return
+
+        for idx, result in enumerate(results):
+            if result is None:
+                self._send(idx, 'close')
+        for idx, result in enumerate(results):
+            if result is None:
+                self._recv(idx)
+
+        for process in self.processes:
+            process.join()
+
+        self.closed = True
+        raise RuntimeError('Error in StarCraft worker: ' + repr(errors[0]))
+
+    def reset(self, indices=None):
+        """Resets environments at 'indices' (all by default) and returns batched
+        observations of shape (nenvs, nagents, obs_dim)"""
+        indices = self._indices(indices)
+
+        for idx in indices:
+            self._send(idx, 'reset')
+        self._wait(indices)
+
+        return self.buffers['obs']
+
+    def step_async(self, actions):
+        """Sends per environment 'actions' of shape (nenvs, nagents) to workers"""
+        for idx, action in enumerate(actions):
+            self._send(idx, 'step', action)
+        self.waiting = True
+
+    def step_wait(self):
+        """Waits for workers to finish their step and returns batched obs,
+        reward, done and alive mask"""
+        self._wait(range(self.nenvs))
+        self.waiting = False
+
+        return (self.buffers['obs'], self.buffers['reward'],
+                self.buffers['done'], self.buffers['alive_mask'])
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def reward_terminal(self, indices=None):
+        """Returns terminal rewards of shape (nenvs, nagents), only rows
+        at 'indices' (all by default) are updated"""
+        indices = self._indices(indices)
+
+        for idx in indices:
+            self._send(idx, 'reward_terminal')
+        self._wait(indices)
+
+        return self.buffers['reward_terminal']
+
+    def get_stats(self):
+        """Returns list of 'stat' dicts of all environments"""
+        for idx in range(self.nenvs):
+            self._send(idx, 'stat')
+        return self._wait(range(self.nenvs))
+
+    def close(self):
+        if self.closed:
+            return
+
+        if self.waiting:
+            self._wait(range(self.nenvs))
+
+        for remote in self.remotes:
+            # Workers which have exited can't be told to close
+            try:
+                remote.send(('close', None))
+            except BrokenPipeError:
+                pass
+
+        for remote in self.remotes:
+            try:
+                remote.recv()
+            except EOFError:
+                pass
+
+        for process in self.processes:
+            process.join()
+
+        self.closed = True
@@ -28,7 +28,7 @@ class StarCraftWrapperEnv(gym.Env):
         env.add_argument('--server_port', type=int, default=11111,
                          help='Port of the server')
         env.add_argument('--ai_type', type=str, default='builtin',
-                         help='Type of AI, builtin|attack_closest|attack_weakest')
+                         help='Type of AI, builtin|attack_closest|attack_weakest|attack_weakest_in_vision')
         env.add_argument('--speed', type=int, default=0,
                          help='Speed')
         env.add_argument('--init_range_start', type=int, default=100,
@@ -57,6 +57,36 @@ class StarCraftWrapperEnv(gym.Env):
                          help='Test for enemy communication')
         env.add_argument('--step_size', type=int, default=8,
                          help="Step of the agent, Default: 8")
+        env.add_argument('--concurrent_io', action='store_true', default=False,
+                         help="Send to both TorchCraft clients before waiting on replies")
+        env.add_argument('--server_frame_skip', action='store_true', default=False,
+                         help="Skip frames on TorchCraft server instead of empty steps")
+        env.add_argument('--fast_reset', action='store_true', default=False,
+                         help="Reuse alive units on reset instead of respawning all")
+        env.add_argument('--perf_stats', action='store_true', default=False,
+                         help="Time step and reset phases, see perf_stats()")
+        env.add_argument('--obs_buffers', action='store_true', default=False,
+                         help="Build observations in two reused float32 buffers")
+        env.add_argument('--copy_obs', action='store_true', default=False,
+                         help="Return copies of observations, safe with --obs_buffers")
+        env.add_argument('--obs_mode', type=str, default='vector',
+                         help="Observation mode: vector | grid")
+        env.add_argument('--grid_size', type=int, default=32,
+                         help="Number of cells along each side of grid observations")
+        env.add_argument('--grid_crop', type=int, default=0,
+                         help="Side of grid observation window around each agent in walktiles, 0 for whole map")
+        env.add_argument('--suppress_repeated_commands', action='store_true', default=False,
+                         help="Skip commands repeating the last one of a unit still executing it")
+        env.add_argument('--ai_retarget_interval', type=int, default=0,
+                         help="Steps scripted enemy AI keeps its targets, 0 to pick every step")
+        env.add_argument('--event_step_completion', action='store_true', default=False,
+                         help="End steps when an order of an agent finishes instead of after frame_skip frames")
+        env.add_argument('--max_step_frames', type=int, default=24,
+                         help="Max frames of a step with --event_step_completion")
+        env.add_argument('--info_mode', type=str, default='slim',
+                         help="Info returned by step: slim (summary of units, raw states not pickled) | full (raw states)")
+        env.add_argument('--launcher_timeout', type=float, default=120,
+                         help="Seconds to wait for TorchCraft servers to start")
 
 
         # Explore args
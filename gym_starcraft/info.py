@@ -0,0 +1,56 @@
+'''
+Compact step info. By default environments return a small summary of unit
+tables in info instead of only the TorchCraft states, so info is cheap to
+keep and to send between processes. Raw states of the step are kept by
+reference under 'state1' and 'state2' and are left out when info is pickled.
+'''
+import numpy as np
+
+
+# Keys of info holding raw states, not pickled
+RAW_STATE_KEYS = ('state1', 'state2')
+
+
+class StepInfo(dict):
+    def __init__(self, summary, state1=None, state2=None):
+        """Info dict holding 'summary' and references to raw states of the step
+
+        Arguments:
+            summary {dict} -- Items of info
+
+        Keyword Arguments:
+            state1 {tc.State} -- State of first client at the step (default: {None})
+            state2 {tc.State} -- State of second client at the step (default: {None})
+        """
+        super(StepInfo, self).__init__(summary)
+
+        # States are taken when info is built, so they belong to the step
+        # which returned the info even when looked up later
+        if state1 is not None:
+            self['state1'] = state1
+        if state2 is not None:
+            self['state2'] = state2
+
+    def __reduce__(self):
+        # Pickled as a plain dict of summary, states are not shipped
+        summary = {key: value for key, value in self.items() if key not in RAW_STATE_KEYS}
+        return dict, (summary,)
+
+
+def summarize(my_table, enemy_table):
+    """Returns summary of unit tables with alive masks, counts and total
+    health plus shield of alive units of both players
+
+    Arguments:
+        my_table {UnitTable} -- Unit table of agents
+        enemy_table {UnitTable} -- Unit table of enemies
+    """
+    summary = {}
+
+    for prefix, table in (('my', my_table), ('enemy', enemy_table)):
+        alive = table.alive.copy()
+        summary[prefix + '_alive'] = alive
+        summary[prefix + '_count'] = int(np.count_nonzero(alive))
+        summary[prefix + '_hp'] = float(np.sum(table.health[alive] + table.shield[alive]))
+
+    return summary
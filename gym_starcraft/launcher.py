@@ -0,0 +1,341 @@
+'''
+Helpers for starting BWAPILauncher processes running TorchCraft servers and
+a pool which keeps warm server pairs ready to be handed to environments.
+'''
+import atexit
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+
+PORT_MATCH_STR = b"TorchCraft server listening on port "
+# Number of last output lines kept per launcher process
+LOG_LINES = 1000
+# Seconds to wait for TorchCraft servers to print their port
+STARTUP_TIMEOUT = 120
+
+# Parsed config files by path, with modification time they were parsed at
+_config_cache = {}
+
+
+def _parse_config(config_path):
+    """Returns parsed yml config at 'config_path', parsed again only when
+    the file changes. Returned dict is shared, don't modify it."""
+    config_path = os.path.abspath(config_path)
+    mtime = os.path.getmtime(config_path)
+
+    cached = _config_cache.get(config_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    # Import yaml only when a config is actually read
+    import yaml
+
+    with open(config_path, 'r') as f:
+        try:
+            config = yaml.safe_load(f)
+        except yaml.YAMLError as err:
+            print('Config yaml error', err)
+            sys.exit(0)
+
+    _config_cache[config_path] = (mtime, config)
+    return config
+
+
+def load_launcher_config(config_path):
+    """Load config options from config file and environment
+
+    Arguments:
+        config_path {str} -- Path for configuration yml file
+
+    Returns:
+        tuple -- Path to BWAPILauncher binary and environment options for it
+    """
+    config = _parse_config(config_path)
+    launcher_path = config['options']['BWAPI_INSTALL_PREFIX']
+
+    # Check if environment contains BWAPI_INSTALL path
+    if 'BWAPI_INSTALL_PREFIX' in os.environ:
+        launcher_path = os.environ['BWAPI_INSTALL_PREFIX']
+
+    launcher_path = os.path.join(launcher_path, 'bin', 'BWAPILauncher')
+
+    # Set environment variables to be passed directly to BWAPI
+    options = dict(os.environ)
+    for key, val in config['options'].items():
+        options[key] = str(val)
+
+    options['BWAPI_CONFIG_AUTO_MENU__GAME_TYPE'] = "USE MAP SETTINGS"
+    options['BWAPI_CONFIG_AUTO_MENU__AUTO_RESTART'] = "ON"
+    # Use LAN and Local mode to start a self-play kind of mode
+    options['BWAPI_CONFIG_AUTO_MENU__AUTO_MENU'] = "LAN"
+    options['OPENBW_LAN_MODE'] = "LOCAL"
+    options['OPENBW_LOCAL_PATH'] = new_local_path()
+    options['BWAPI_CONFIG_AUTO_MENU__MAP'] = os.path.abspath(options['BWAPI_CONFIG_AUTO_MENU__MAP'])
+
+    return launcher_path, options
+
+
+def new_local_path():
+    """Returns a new path through which two OpenBW instances of a pair talk"""
+    return os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+
+
+class ServerProcess(object):
+    def __init__(self, launcher_path, torchcraft_dir, options, log_lines=LOG_LINES):
+        """Starts a BWAPILauncher process, it is killed when python exits.
+        A background thread keeps reading its output into a ring buffer of
+        last 'log_lines' lines, so the process never blocks on a full pipe.
+        Output is printed until the TorchCraft server prints its port.
+
+        Arguments:
+            launcher_path {str} -- Path to BWAPILauncher binary
+            torchcraft_dir {str} -- Directory of TorchCraft repository
+            options {dict} -- Environment of the process
+
+        Keyword Arguments:
+            log_lines {int} -- Number of last output lines to keep (default: {LOG_LINES})
+        """
+        self.proc = subprocess.Popen([os.path.expanduser(launcher_path)],
+                                     cwd=os.path.expanduser(torchcraft_dir),
+                                     env=options,
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT)
+        atexit.register(self.proc.kill)
+
+        self.port = None
+        self.log = deque(maxlen=log_lines)
+        self.log_lock = threading.Lock()
+        self.started = threading.Event()
+
+        self.drain_thread = threading.Thread(target=self._drain)
+        self.drain_thread.daemon = True
+        self.drain_thread.start()
+
+    def _drain(self):
+        # Output is bytes, readline returns b'' only at end of file
+        for line in iter(self.proc.stdout.readline, b''):
+            text = line.rstrip().decode('utf-8', 'replace')
+            with self.log_lock:
+                self.log.append(text)
+
+            if self.port is not None:
+                continue
+
+            print(text)
+            if line[:len(PORT_MATCH_STR)] == PORT_MATCH_STR:
+                self.port = int(line[len(PORT_MATCH_STR):].strip())
+                self.started.set()
+
+        self.proc.stdout.close()
+
+        # Output ends when the process exits, give it a moment to report its code
+        try:
+            self.proc.wait(1)
+        except subprocess.TimeoutExpired:
+            pass
+
+        # Wake up waiters of a process which exited without a port
+        self.started.set()
+
+    def wait_port(self, timeout=None):
+        """Waits until TorchCraft server prints its port and returns it
+
+        Keyword Arguments:
+            timeout {float} -- Seconds to wait, forever if None (default: {None})
+        """
+        if not self.started.wait(timeout):
+            raise RuntimeError('TorchCraft server did not start in time:\n%s' %
+                               self.format_logs())
+
+        if self.port is None:
+            raise RuntimeError('BWAPILauncher exited with code %s before TorchCraft '
+                               'server started:\n%s' % (self.proc.poll(), self.format_logs()))
+
+        return self.port
+
+    def logs(self):
+        """Returns last lines of output of the process"""
+        with self.log_lock:
+            return list(self.log)
+
+    def format_logs(self, count=20):
+        return '\n'.join(self.logs()[-count:])
+
+    def poll(self):
+        return self.proc.poll()
+
+    def kill(self):
+        self.proc.kill()
+
+
+def start_server(launcher_path, torchcraft_dir, options):
+    """Starts a BWAPILauncher process, see ServerProcess"""
+    return ServerProcess(launcher_path, torchcraft_dir, options)
+
+
+class ServerPair(object):
+    """Two TorchCraft servers playing in the same OpenBW LAN game"""
+    def __init__(self, procs, ports):
+        self.procs = procs
+        self.ports = ports
+
+    def is_alive(self):
+        return all(proc.poll() is None for proc in self.procs)
+
+    def kill(self):
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.kill()
+
+    def logs(self):
+        """Returns last output lines of both launcher processes, for post-mortems"""
+        return [proc.logs() for proc in self.procs]
+
+
+def start_server_pairs(launcher_path, torchcraft_dir, options, count=1,
+                       timeout=STARTUP_TIMEOUT):
+    """Starts 'count' server pairs. All processes are started before waiting
+    for any of them, so their startup happens in parallel. If any server
+    fails to start within 'timeout' seconds, all started processes are killed
+    and RuntimeError is raised with output of the failed one.
+
+    Returns:
+        list -- List of started ServerPair
+    """
+    procs = []
+
+    try:
+        for _ in range(count):
+            # Each pair needs its own local path for its LAN game
+            pair_options = dict(options)
+            pair_options['OPENBW_LOCAL_PATH'] = new_local_path()
+
+            procs.append((start_server(launcher_path, torchcraft_dir, pair_options),
+                          start_server(launcher_path, torchcraft_dir, pair_options)))
+
+        # One deadline for all servers as they start together
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pairs = []
+        for pair_procs in procs:
+            ports = [proc.wait_port(None if deadline is None else
+                                    max(deadline - time.monotonic(), 0))
+                     for proc in pair_procs]
+            pairs.append(ServerPair(pair_procs, ports))
+    except BaseException:
+        for pair_procs in procs:
+            for proc in pair_procs:
+                if proc.poll() is None:
+                    proc.kill()
+        raise
+
+    return pairs
+
+
+class LauncherPool(object):
+    def __init__(self, config_path, torchcraft_dir='~/TorchCraft', size=1,
+                 startup_timeout=STARTUP_TIMEOUT):
+        """Pool of warm TorchCraft server pairs. Pairs are started in parallel
+        in advance and handed to environments through 'acquire', environments
+        return them on 'close' so that next env doesn't pay the startup cost.
+        Pass it to environments through 'launcher_pool' keyword argument.
+
+        NOTE: Reusing a pair relies on TorchCraft server accepting a new
+        client once the previous one has disconnected. Pool only checks that
+        processes of a pair are alive, probing a server which serves a single
+        client could take its place. An env which can't connect to a pooled
+        pair kills it and takes another one, see StarCraftBaseEnv.init_conn.
+
+        Arguments:
+            config_path {str} -- Path for configuration yml file
+
+        Keyword Arguments:
+            torchcraft_dir {str} -- Directory of TorchCraft repository (default: {'~/TorchCraft'})
+            size {int} -- Number of idle pairs to keep ready (default: {1})
+            startup_timeout {float} -- Seconds to wait for servers of new pairs
+            to start (default: {STARTUP_TIMEOUT})
+        """
+        self.launcher_path, self.options = load_launcher_config(config_path)
+        self.torchcraft_dir = torchcraft_dir
+        self.size = size
+        self.startup_timeout = startup_timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.refill_thread = None
+        self.closed = False
+
+        self.fill()
+
+    def _drop_dead(self):
+        alive = [pair for pair in self.idle if pair.is_alive()]
+        for pair in self.idle:
+            if pair not in alive:
+                pair.kill()
+        self.idle = alive
+
+    def fill(self):
+        """Start pairs until there are 'size' alive idle pairs"""
+        with self.lock:
+            if self.closed:
+                return
+            self._drop_dead()
+            missing = self.size - len(self.idle)
+
+        if missing <= 0:
+            return
+
+        pairs = start_server_pairs(self.launcher_path, self.torchcraft_dir,
+                                   self.options, missing, self.startup_timeout)
+
+        with self.lock:
+            # Pool may have been closed while pairs were starting
+            if not self.closed:
+                self.idle += pairs
+                return
+
+        for pair in pairs:
+            pair.kill()
+
+    def _refill_in_background(self):
+        if self.refill_thread is not None and self.refill_thread.is_alive():
+            return
+
+        self.refill_thread = threading.Thread(target=self.fill)
+        self.refill_thread.daemon = True
+        self.refill_thread.start()
+
+    def acquire(self):
+        """Returns an alive ServerPair, starting one only if none is idle"""
+        with self.lock:
+            if self.closed:
+                raise RuntimeError('LauncherPool is closed')
+            self._drop_dead()
+            pair = self.idle.pop() if len(self.idle) else None
+
+        if pair is None:
+            pair = start_server_pairs(self.launcher_path, self.torchcraft_dir,
+                                      self.options, timeout=self.startup_timeout)[0]
+
+        self._refill_in_background()
+        return pair
+
+    def release(self, pair):
+        """Returns a pair back to pool, extra or dead pairs are killed"""
+        with self.lock:
+            if not self.closed and pair.is_alive() and len(self.idle) < self.size:
+                self.idle.append(pair)
+                return
+
+        pair.kill()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            for pair in self.idle:
+                pair.kill()
+            self.idle = []
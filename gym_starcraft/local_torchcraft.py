@@ -0,0 +1,352 @@
+'''
+Deterministic in-process stand-in for TorchCraft and OpenBW. It implements
+the parts of `torchcraft.Client` (connect, init, send, recv, close) and
+`torchcraft.Constants` used by the environments, and simulates the game with
+simple kinematics: units move in straight lines and attack when the target
+is in range and cooldown is over.
+
+It is meant for benchmarking and debugging the Python side of environments
+without a StarCraft installation. Call `install()` before importing the
+environment modules so that `import torchcraft` resolves to this module,
+and wrap environment classes with `local_env` so they connect to a local
+game instead of starting BWAPILauncher processes:
+
+    import gym_starcraft.local_torchcraft as local_torchcraft
+    local_torchcraft.install()
+
+    from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+    env = local_torchcraft.local_env(StarCraftMvN)(args)
+
+`uninstall()` puts back the modules it replaced, e.g. at end of a test.
+'''
+import copy
+import itertools
+import math
+import sys
+import types
+
+from gym_starcraft.torchcraft_constants import tcc
+
+
+MAP_SIZE = 256
+NUM_UNIT_TYPES = 234
+# Sight range in pixels, 7 tiles for all types
+DEFAULT_SIGHT_RANGE = 224
+
+# max_health, max_shield, range (walktiles), cooldown, damage, speed (walktiles per frame)
+UNIT_STATS = {
+    0: (40, 0, 16, 15, 6, 0.5),       # Marine
+    2: (80, 0, 20, 30, 20, 1.6),      # Vulture
+    8: (120, 0, 20, 22, 8, 0.84),     # Wraith
+    34: (60, 0, 0, 1, 0, 0.5),        # Medic
+    37: (35, 0, 1, 8, 5, 0.7),        # Zergling
+    43: (120, 0, 12, 30, 9, 0.84),    # Mutalisk
+    60: (100, 80, 20, 8, 5, 1.3),     # Corsair
+    65: (100, 60, 1, 22, 16, 0.5)     # Zealot
+}
+DEFAULT_UNIT_STATS = UNIT_STATS[0]
+
+
+def _make_constants():
+    constants = types.ModuleType('torchcraft.Constants')
+    constants.staticvalues = {
+        'sightRange': [DEFAULT_SIGHT_RANGE] * NUM_UNIT_TYPES
+    }
+
+    for value, name in enumerate(['set_speed', 'set_gui', 'set_frameskip', 'set_cmd_optim',
+                                  'set_combine_frames', 'command_unit',
+                                  'command_unit_protected', 'command_openbw']):
+        setattr(constants, name, value)
+
+    constants.unitcommandtypes = types.SimpleNamespace(
+        Stop=1, Move=6, Attack_Unit=10)
+    constants.openbwcommandtypes = types.SimpleNamespace(
+        KillUnit=0, SpawnUnit=1, SetUnitHealth=2, SetUnitShield=3)
+
+    return constants
+
+
+Constants = _make_constants()
+
+
+class Unit(object):
+    """Subset of tc.Unit attributes used by environments"""
+    def __init__(self, unit_id, player_id, unit_type, x, y):
+        max_health, max_shield, attack_range, _, _, _ = \
+            UNIT_STATS.get(unit_type, DEFAULT_UNIT_STATS)
+
+        self.id = unit_id
+        self.player_id = player_id
+        self.type = unit_type
+        self.x = x
+        self.y = y
+        self.pos_x = float(x)
+        self.pos_y = float(y)
+        self.health = max_health
+        self.max_health = max_health
+        self.shield = max_shield
+        self.max_shield = max_shield
+        self.groundCD = 0
+        self.airCD = 0
+        self.groundRange = attack_range
+        self.airRange = attack_range
+        self.attacking = False
+        self.starting_attack = False
+        self.idle = True
+
+        # Current order as (command type, target id, target x, target y)
+        self.order = None
+
+
+class State(object):
+    """Subset of tc.State attributes used by environments"""
+    def __init__(self, player_id):
+        self.player_id = player_id
+        self.map_size = [MAP_SIZE, MAP_SIZE]
+        self.frame_from_bwapi = 0
+        self.units = {}
+        self.aliveUnits = {}
+
+
+class LocalGame(object):
+    def __init__(self):
+        """A game between player 0 and player 1. Each player advances its own
+        frame count on every exchange and the game simulates frames until it
+        reaches the furthest player, like two OpenBW instances in lockstep."""
+        self.frame = 0
+        self.units = {}
+        self.next_id = itertools.count()
+        self.player_frames = [0, 0]
+        self.frame_skip = [1, 1]
+
+    def apply(self, player_id, cmds):
+        """Executes commands of a player, called when they are sent"""
+        for cmd in cmds:
+            self._apply(player_id, cmd)
+
+    def advance(self, player_id):
+        """Advances frame count of a player by its frame skip, simulating
+        frames as needed, and returns new state of the player"""
+        self.player_frames[player_id] += self.frame_skip[player_id]
+
+        while self.frame < max(self.player_frames):
+            self._tick()
+
+        return self._state(player_id)
+
+    def _state(self, player_id):
+        state = State(player_id)
+        state.frame_from_bwapi = self.frame
+        state.units = {0: [], 1: []}
+
+        for unit in self.units.values():
+            state.units[unit.player_id].append(copy.copy(unit))
+            state.aliveUnits[unit.id] = unit.type
+
+        return state
+
+    def _apply(self, player_id, cmd):
+        tcc = Constants
+
+        if cmd[0] == tcc.set_frameskip:
+            self.frame_skip[player_id] = max(int(cmd[1]), 1)
+        elif cmd[0] == tcc.command_openbw:
+            self._apply_openbw(cmd)
+        elif cmd[0] in (tcc.command_unit, tcc.command_unit_protected):
+            unit = self.units.get(cmd[1])
+
+            # Players can only command their own units
+            if unit is None or unit.player_id != player_id:
+                return
+
+            if cmd[2] == tcc.unitcommandtypes.Move:
+                unit.order = (cmd[2], -1, cmd[4], cmd[5])
+            elif cmd[2] == tcc.unitcommandtypes.Attack_Unit:
+                unit.order = (cmd[2], cmd[3], -1, -1)
+            else:
+                unit.order = None
+            unit.idle = unit.order is None
+
+    def _apply_openbw(self, cmd):
+        openbw = Constants.openbwcommandtypes
+
+        if cmd[1] == openbw.SpawnUnit:
+            _, _, player_id, unit_type, x, y = cmd[:6]
+            unit_id = next(self.next_id)
+            # Spawn position is in pixels, units live in walktiles
+            self.units[unit_id] = Unit(unit_id, player_id, unit_type, x // 8, y // 8)
+        elif cmd[1] == openbw.KillUnit:
+            self.units.pop(cmd[2], None)
+        elif cmd[1] == openbw.SetUnitHealth and cmd[2] in self.units:
+            self.units[cmd[2]].health = cmd[3]
+        elif cmd[1] == openbw.SetUnitShield and cmd[2] in self.units:
+            self.units[cmd[2]].shield = cmd[3]
+
+    def _move_towards(self, unit, x, y, speed):
+        dx = x - unit.pos_x
+        dy = y - unit.pos_y
+        dist = math.hypot(dx, dy)
+
+        if dist <= speed:
+            unit.pos_x, unit.pos_y = x, y
+            arrived = True
+        else:
+            unit.pos_x += dx / dist * speed
+            unit.pos_y += dy / dist * speed
+            arrived = False
+
+        # Exact position is kept separately, units report walktiles
+        unit.x = int(round(unit.pos_x))
+        unit.y = int(round(unit.pos_y))
+        return arrived
+
+    def _tick(self):
+        self.frame += 1
+
+        for unit_id in sorted(self.units):
+            unit = self.units.get(unit_id)
+            if unit is None:
+                continue
+
+            _, _, attack_range, cooldown, damage, speed = \
+                UNIT_STATS.get(unit.type, DEFAULT_UNIT_STATS)
+
+            unit.groundCD = max(unit.groundCD - 1, 0)
+            unit.airCD = max(unit.airCD - 1, 0)
+            unit.starting_attack = False
+
+            if unit.order is None:
+                unit.attacking = False
+                continue
+
+            command, target_id, x, y = unit.order
+
+            if command == Constants.unitcommandtypes.Move:
+                unit.attacking = False
+                if self._move_towards(unit, x, y, speed):
+                    unit.order = None
+                    unit.idle = True
+                continue
+
+            target = self.units.get(target_id)
+            if target is None or damage == 0:
+                unit.order = None
+                unit.idle = True
+                unit.attacking = False
+                continue
+
+            # Melee units need to be adjacent
+            if math.hypot(target.x - unit.x, target.y - unit.y) > max(attack_range, 1):
+                unit.attacking = False
+                self._move_towards(unit, target.x, target.y, speed)
+                continue
+
+            unit.attacking = True
+            if unit.groundCD == 0:
+                unit.starting_attack = True
+                unit.groundCD = unit.airCD = cooldown
+
+                shield_damage = min(target.shield, damage)
+                target.shield -= shield_damage
+                target.health -= damage - shield_damage
+
+                if target.health <= 0:
+                    del self.units[target.id]
+
+
+# Games by port of the players connecting to them
+_games = {}
+_ports = itertools.count(10000, 2)
+
+# Modules replaced by install, restored by uninstall
+MODULE_NAMES = ('torchcraft', 'torchcraft.Constants')
+_saved_modules = None
+
+
+def create_game():
+    """Creates a new local game and returns ports for its two players"""
+    port = next(_ports)
+    game = LocalGame()
+    _games[port] = (game, 0)
+    _games[port + 1] = (game, 1)
+    return port, port + 1
+
+
+class Client(object):
+    def __init__(self):
+        self.game = None
+        self.player_id = None
+        self.state = None
+
+    def connect(self, hostname, port):
+        if port not in _games:
+            raise RuntimeError('No local game is listening on port ' + str(port))
+
+        self.game, self.player_id = _games[port]
+        return True
+
+    def init(self, *args, **kwargs):
+        self.state = self.game.advance(self.player_id)
+        return self.state
+
+    def send(self, cmds):
+        self.game.apply(self.player_id, cmds)
+        return True
+
+    def poll(self, timeout=-1):
+        # Local game simulates frames on recv, so a reply is always ready
+        return True
+
+    def recv(self):
+        self.state = self.game.advance(self.player_id)
+        return self.state
+
+    def close(self):
+        self.game = None
+
+
+def install():
+    """Makes `import torchcraft` and `import torchcraft.Constants` resolve to
+    this stand-in. Must be called before environments use TorchCraft."""
+    global _saved_modules
+    if _saved_modules is None:
+        _saved_modules = {name: sys.modules.get(name) for name in MODULE_NAMES}
+
+    module = types.ModuleType('torchcraft')
+    module.Client = Client
+    module.Constants = Constants
+
+    sys.modules['torchcraft'] = module
+    sys.modules['torchcraft.Constants'] = Constants
+    tcc._clear()
+
+
+def uninstall():
+    """Restores TorchCraft modules replaced by 'install'"""
+    global _saved_modules
+    if _saved_modules is None:
+        return
+
+    for name, module in _saved_modules.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+
+    _saved_modules = None
+    tcc._clear()
+
+
+def local_env(env_class):
+    """Returns a subclass of 'env_class' which plays in a local game
+    instead of starting TorchCraft servers"""
+    class LocalEnv(env_class):
+        def load_config_options(self):
+            return None
+
+        def start_torchcraft(self, options):
+            self.server_pair = None
+            self.server_port1, self.server_port2 = create_game()
+
+    LocalEnv.__name__ = 'Local' + env_class.__name__
+    return LocalEnv
@@ -0,0 +1,58 @@
+'''
+Low overhead timers for phases of environment steps and resets.
+'''
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PhaseTimer(object):
+    def __init__(self, window=1000):
+        """Keeps durations of last 'window' runs of each phase
+
+        Keyword Arguments:
+            window {int} -- Number of last samples kept per phase (default: {1000})
+        """
+        self.window = window
+        self.samples = {}
+        self.last = {}
+        self.lap_start = None
+
+    def start(self):
+        """Start timing, next 'lap' measures time from here"""
+        self.lap_start = time.perf_counter()
+
+    def lap(self, phase):
+        """Record time since last 'start' or 'lap' as a run of 'phase'"""
+        now = time.perf_counter()
+        self.add(phase, now - self.lap_start)
+        self.lap_start = now
+
+    def add(self, phase, seconds):
+        if phase not in self.samples:
+            self.samples[phase] = deque(maxlen=self.window)
+
+        self.samples[phase].append(seconds)
+        self.last[phase] = seconds
+
+    def stats(self):
+        """Returns dict of phase to count, mean, p50, p95 and p99 in milliseconds"""
+        stats = {}
+
+        for phase, samples in self.samples.items():
+            values = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stats[phase] = {
+                'count': len(values),
+                'mean': float(values.mean()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99)
+            }
+
+        return stats
+
+    def reset(self):
+        self.samples = {}
+        self.last = {}
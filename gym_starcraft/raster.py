@@ -0,0 +1,137 @@
+'''
+Rasterization of unit arrays into per agent multi-channel grids, used by the
+'grid' observation mode of environments. Units are scattered once per step
+into a grid over the whole map, and the window of every agent is cropped out
+of it, so the cost depends on the number of units plus the size of the
+observation and not on the number of (agent, unit) pairs.
+
+Windows are aligned to cells of the map grid, with the cell of the agent at
+the center of its window. Enemy channels only keep cells whose center is
+within vision of the agent.
+'''
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Channels of a grid observation, in order
+CHANNELS = (
+    'self',         # Cell of the agent itself
+    'friendly',     # Number of friendly units, agent included
+    'friendly_hp',  # Sum of health + shield ratio of friendly units
+    'friendly_cd',  # Sum of cooldown ratio of friendly units
+    'enemy',        # Number of visible enemy units
+    'enemy_hp',     # Sum of health + shield ratio of visible enemy units
+    'enemy_cd'      # Sum of cooldown ratio of visible enemy units
+)
+
+# First channel of friendly and of enemy units, channels of the map grid
+# are CHANNELS without 'self'
+FRIENDLY_CHANNEL = 1
+ENEMY_CHANNEL = 4
+
+
+class Rasterizer(object):
+    def __init__(self, grid_size, crop_size, map_size):
+        """Rasterizes units into 'grid_size' x 'grid_size' grids of agents.
+        Keeps the map grid between calls, only cells which got units are
+        cleared after each call.
+
+        Arguments:
+            grid_size {int} -- Number of cells along each side of grid
+            crop_size {int} -- Side of window around each agent in walktiles,
+            0 for a window over the whole map
+            map_size {list} -- Width and height of map in walktiles
+        """
+        self.grid_size = grid_size
+        self.crop_size = crop_size
+        self.map_size = tuple(map_size[:2])
+
+        if crop_size > 0:
+            # Cells of the window size, map grid is padded so that windows of
+            # agents at the border of the map stay inside of it
+            self.cell_size = np.full(2, crop_size / grid_size)
+            self.ncells = np.ceil(np.asarray(self.map_size) / self.cell_size).astype(np.int64)
+            self.pad = grid_size
+        else:
+            self.cell_size = np.asarray(self.map_size, dtype=np.float64) / grid_size
+            self.ncells = np.full(2, grid_size, dtype=np.int64)
+            self.pad = 0
+
+        nchannels = len(CHANNELS) - 1
+        self.map_grid = np.zeros((nchannels, self.ncells[1] + 2 * self.pad,
+                                  self.ncells[0] + 2 * self.pad))
+        self.offsets = np.arange(grid_size)
+        # (channels, rows, cols, grid_size, grid_size) view of windows by first cell
+        self.windows = sliding_window_view(self.map_grid, (grid_size, grid_size), axis=(1, 2))
+
+    def get_cells(self, x, y):
+        """Returns column and row of the padded map grid of positions in walktiles"""
+        col = np.clip(np.floor(x / self.cell_size[0]).astype(np.int64), 0, self.ncells[0] - 1)
+        row = np.clip(np.floor(y / self.cell_size[1]).astype(np.int64), 0, self.ncells[1] - 1)
+        return col + self.pad, row + self.pad
+
+    def get_windows(self, col, row):
+        """Returns first column and row of the windows of agents in cells 'col', 'row'"""
+        if self.crop_size > 0:
+            half = self.grid_size // 2
+            return col - half, row - half
+
+        zeros = np.zeros(len(col), dtype=np.int64)
+        return zeros, zeros
+
+    def _scatter(self, units, channel):
+        alive = units['alive']
+        col, row = self.get_cells(units['x'][alive], units['y'][alive])
+        for offset, values in enumerate((np.ones(len(col)), units['hp'][alive],
+                                         units['cd'][alive])):
+            np.add.at(self.map_grid[channel - 1 + offset], (row, col), values)
+        return col, row
+
+    def rasterize(self, me, enemy, vision=None, out=None):
+        """Rasterizes friendly and enemy units into a grid for every agent
+
+        Arguments:
+            me {dict} -- Arrays of 'utils.get_unit_arrays' for agents, one row per agent
+            enemy {dict} -- Arrays of 'utils.get_unit_arrays' for enemies
+
+        Keyword Arguments:
+            vision {np.ndarray} -- Vision of each agent in walktiles, all enemies
+            are visible if None (default: {None})
+            out {np.ndarray} -- Array to write grids into (default: {None})
+
+        Returns:
+            np.ndarray -- Grids of shape (nagents, len(CHANNELS), grid_size, grid_size),
+            zero for dead agents
+        """
+        nagents = len(me['alive'])
+        shape = (nagents, len(CHANNELS), self.grid_size, self.grid_size)
+        if out is None:
+            out = np.empty(shape)
+
+        friendly_cells = self._scatter(me, FRIENDLY_CHANNEL)
+        enemy_cells = self._scatter(enemy, ENEMY_CHANNEL)
+
+        col, row = self.get_cells(me['x'], me['y'])
+        first_col, first_row = self.get_windows(col, row)
+
+        # Windows of all agents are views of the map grid, copied once into out
+        out.transpose(1, 0, 2, 3)[1:] = self.windows[:, first_row, first_col]
+
+        if vision is not None:
+            # Squared distances of agents to centers of cells of their windows
+            dx = (first_col[:, None] + self.offsets - self.pad + 0.5) * self.cell_size[0]
+            dy = (first_row[:, None] + self.offsets - self.pad + 0.5) * self.cell_size[1]
+            dx = (dx - me['x'][:, None]) ** 2
+            dy = (dy - me['y'][:, None]) ** 2
+            in_vision = dy[:, :, None] + dx[:, None, :] <= np.square(vision)[:, None, None]
+            out[:, ENEMY_CHANNEL:] *= in_vision[:, None]
+
+        out[:, 0] = 0
+        out[np.arange(nagents), 0, row - first_row, col - first_col] = 1
+        out[~me['alive']] = 0
+
+        # Clear cells which got units for next call
+        for cells in (friendly_cells, enemy_cells):
+            self.map_grid[:, cells[1], cells[0]] = 0
+
+        return out
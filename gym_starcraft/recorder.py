@@ -0,0 +1,177 @@
+'''
+Streaming recorder of trajectories from StarCraft environments.
+
+Records are written from a background thread into a columnar store on disk,
+one memory mapped .npy file per column per chunk of 'chunk_size' steps:
+
+    path/meta.json             -- chunk size, number of steps, column shapes and dtypes
+    path/episodes.npy          -- (num_episodes, 2) array of episode start step and length
+    path/<column>_<chunk>.npy  -- rows of a column, e.g. obs_00000.npy
+
+Each step row holds the observation the action was taken on ('obs'), the
+'action', step 'reward', 'done' flag and 'alive_mask' after the step.
+'''
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+
+META_FILE = 'meta.json'
+EPISODES_FILE = 'episodes.npy'
+
+
+def chunk_file(path, column, chunk):
+    return os.path.join(path, '%s_%05d.npy' % (column, chunk))
+
+
+class TrajectoryRecorder(object):
+    def __init__(self, path, chunk_size=10000, queue_size=1000):
+        """Creates a recorder writing into directory 'path', attach it to an
+        env with 'attach' and 'close' it to flush everything to disk.
+
+        Arguments:
+            path {str} -- Directory of the store, created if not present
+
+        Keyword Arguments:
+            chunk_size {int} -- Number of steps per chunk file (default: {10000})
+            queue_size {int} -- Max steps waiting for writer thread, step
+            blocks when it is full (default: {1000})
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.obs_dtype = np.float32
+
+        os.makedirs(path, exist_ok=True)
+
+        self.columns = None
+        self.chunks = {}
+        self.chunk = -1
+        self.num_steps = 0
+        self.episodes = []
+        self.episode_start = None
+        self.error = None
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = threading.Thread(target=self._write_loop)
+        self.writer.daemon = True
+        self.writer.start()
+
+    def attach(self, env):
+        """Start recording steps and resets of 'env' (a StarCraftBaseEnv)"""
+        self.obs_dtype = env.observation_space.dtype
+        env.recorder = self
+        return env
+
+    def record_reset(self):
+        """Marks start of a new episode"""
+        self._raise_error()
+        self.queue.put(('reset', None))
+
+    def record_step(self, obs, action, reward, done, alive_mask):
+        """Queues a step for writing, arrays are copied so they can be reused by caller"""
+        self._raise_error()
+        record = {
+            'obs': np.array(obs, dtype=self.obs_dtype),
+            'action': np.array(action, dtype=np.int64),
+            'reward': np.array(reward, dtype=np.float32),
+            'done': np.array(done, dtype=np.bool_),
+            'alive_mask': np.array(alive_mask, dtype=np.float32)
+        }
+        self.queue.put(('step', record))
+
+    def _write_loop(self):
+        while True:
+            kind, record = self.queue.get()
+
+            if kind == 'close':
+                break
+
+            # Keep draining after a failure so that callers never block on put
+            if self.error is not None:
+                continue
+
+            try:
+                if kind == 'reset':
+                    self._end_episode()
+                    self.episode_start = self.num_steps
+                else:
+                    self._write_step(record)
+            except Exception as error:
+                self.error = error
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError('Trajectory writer failed: %s' % self.error) from self.error
+
+    def _write_step(self, record):
+        if self.columns is None:
+            self.columns = {name: (value.shape, value.dtype) for name, value in record.items()}
+
+        row = self.num_steps % self.chunk_size
+        if row == 0:
+            self._open_chunk(self.num_steps // self.chunk_size)
+
+        for name, value in record.items():
+            self.chunks[name][row] = value
+
+        self.num_steps += 1
+
+        if self.episode_start is None:
+            self.episode_start = self.num_steps - 1
+
+    def _open_chunk(self, chunk):
+        for memmap in self.chunks.values():
+            memmap.flush()
+
+        self.chunk = chunk
+        self.chunks = {}
+        for name, (shape, dtype) in self.columns.items():
+            self.chunks[name] = np.lib.format.open_memmap(
+                chunk_file(self.path, name, chunk), mode='w+',
+                dtype=dtype, shape=(self.chunk_size,) + shape)
+
+        # Keep index readable while recording is in progress
+        self._write_index()
+
+    def _end_episode(self):
+        if self.episode_start is not None and self.num_steps > self.episode_start:
+            self.episodes.append((self.episode_start, self.num_steps - self.episode_start))
+        self.episode_start = None
+
+    def _write_index(self):
+        columns = {}
+        if self.columns is not None:
+            for name, (shape, dtype) in self.columns.items():
+                columns[name] = {'shape': list(shape), 'dtype': np.dtype(dtype).str}
+
+        meta = {
+            'chunk_size': self.chunk_size,
+            'num_steps': self.num_steps,
+            'num_chunks': self.chunk + 1,
+            'columns': columns
+        }
+
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+        episodes = np.array(self.episodes, dtype=np.int64).reshape(-1, 2)
+        np.save(os.path.join(self.path, EPISODES_FILE), episodes)
+
+    def close(self):
+        """Waits for all queued steps to be written and writes the index, raises
+        RuntimeError if the writer thread failed"""
+        if self.writer.is_alive():
+            self.queue.put(('close', None))
+            self.writer.join()
+
+            # Index covers steps written before a failure too
+            self._end_episode()
+            for memmap in self.chunks.values():
+                memmap.flush()
+            self.chunks = {}
+            self._write_index()
+
+        self._raise_error()
@@ -0,0 +1,96 @@
+'''
+Uniform grid spatial hash over rows of a unit table, used to find units near
+many query points without computing all pairwise distances. Rows are only
+moved between buckets when their cell changes, so updating it every frame
+costs in proportion to the number of units crossing cell borders.
+'''
+import math
+
+import numpy as np
+
+
+class SpatialHash(object):
+    def __init__(self, cell_size):
+        """Creates an empty hash
+
+        Arguments:
+            cell_size {float} -- Side of a cell in walktiles, queries are
+            cheapest when it is close to the query radius
+        """
+        self.cell_size = cell_size
+        self.clear()
+
+    def clear(self):
+        # Dict of (cell x, cell y) to set of rows in that cell
+        self.cells = {}
+        self.cell_x = np.zeros(0, dtype=np.int64)
+        self.cell_y = np.zeros(0, dtype=np.int64)
+        self.present = np.zeros(0, dtype=bool)
+
+    def update(self, x, y, alive):
+        """Updates cells of rows to positions 'x', 'y', rows which are not
+        'alive' are removed. Hash is cleared if number of rows changes.
+        """
+        if len(x) != len(self.present):
+            self.clear()
+            self.cell_x = np.zeros(len(x), dtype=np.int64)
+            self.cell_y = np.zeros(len(x), dtype=np.int64)
+            self.present = np.zeros(len(x), dtype=bool)
+
+        cell_x = np.floor(np.asarray(x) / self.cell_size).astype(np.int64)
+        cell_y = np.floor(np.asarray(y) / self.cell_size).astype(np.int64)
+        alive = np.array(alive, dtype=bool)
+
+        moved = (alive != self.present) | \
+            (alive & ((cell_x != self.cell_x) | (cell_y != self.cell_y)))
+
+        for row in np.flatnonzero(moved):
+            if self.present[row]:
+                key = (int(self.cell_x[row]), int(self.cell_y[row]))
+                self.cells[key].discard(int(row))
+                if len(self.cells[key]) == 0:
+                    del self.cells[key]
+
+            if alive[row]:
+                self.cells.setdefault((int(cell_x[row]), int(cell_y[row])), set()).add(int(row))
+
+        self.cell_x = cell_x
+        self.cell_y = cell_y
+        self.present = alive
+
+    def query(self, qx, qy, radius, x, y):
+        """Finds rows within 'radius' of every query point
+
+        Arguments:
+            qx {np.ndarray} -- X of query points
+            qy {np.ndarray} -- Y of query points
+            radius {float} -- Max distance, inclusive
+            x {np.ndarray} -- X of rows, same as passed to last 'update'
+            y {np.ndarray} -- Y of rows, same as passed to last 'update'
+
+        Returns:
+            tuple -- Arrays of query index, row and distance of every pair in radius
+        """
+        reach = int(math.ceil(radius / self.cell_size))
+        queries = []
+        rows = []
+
+        for idx in range(len(qx)):
+            cell_x = int(math.floor(qx[idx] / self.cell_size))
+            cell_y = int(math.floor(qy[idx] / self.cell_size))
+
+            for cx in range(cell_x - reach, cell_x + reach + 1):
+                for cy in range(cell_y - reach, cell_y + reach + 1):
+                    bucket = self.cells.get((cx, cy))
+                    if bucket:
+                        rows.extend(bucket)
+                        queries.extend([idx] * len(bucket))
+
+        queries = np.array(queries, dtype=np.int64)
+        rows = np.array(rows, dtype=np.int64)
+
+        distances = np.hypot(np.asarray(x)[rows] - np.asarray(qx)[queries],
+                             np.asarray(y)[rows] - np.asarray(qy)[queries])
+        near = distances <= radius
+
+        return queries[near], rows[near], distances[near]
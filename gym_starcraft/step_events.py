@@ -0,0 +1,110 @@
+'''
+Event based step completion. Orders given to units in a step are tracked
+until they finish: a move when the unit arrives at its target, an attack
+when the weapon fires and its cooldown resets, and any order when the unit
+goes idle or dies. Stop orders and moves to where the unit already is are
+not tracked, as nothing is left to wait for.
+
+A step completes as soon as a tracked order of ANY agent finishes, so all
+agents act again once one of them needs a new action, or when a max number
+of frames has passed. A step without tracked orders lasts the max frames.
+'''
+import numpy as np
+
+from gym_starcraft.torchcraft_constants import tcc
+
+
+# Walktiles from move target at which a unit counts as arrived
+ARRIVAL_RADIUS = 1
+
+
+class StepEvents(object):
+    def __init__(self, max_frames):
+        """Creates tracker without pending orders
+
+        Arguments:
+            max_frames {int} -- Frames after which a step completes even if
+            no order has finished
+        """
+        self.max_frames = max_frames
+        self.frames = 0
+        self.start(0)
+
+    def start(self, frame):
+        """Starts a step at game frame 'frame', forgetting orders of last step"""
+        self.start_frame = frame
+        self.polls = 0
+        self.table = None
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.orders = np.zeros(0, dtype=np.int64)
+        self.target_x = np.zeros(0)
+        self.target_y = np.zeros(0)
+        self.cooldown = np.zeros(0)
+
+    def add(self, table, rows, orders, target_x, target_y, cooldown):
+        """Tracks orders given to units at 'rows' of 'table' (UnitTable) in this step
+
+        Arguments:
+            table {UnitTable} -- Unit table of commanded units
+            rows {np.ndarray} -- Rows of commanded units
+            orders {np.ndarray} -- tcc.unitcommandtypes order of each row
+            target_x {np.ndarray} -- Target x of Move orders
+            target_y {np.ndarray} -- Target y of Move orders
+            cooldown {np.ndarray} -- Current cooldown of every row of 'table'
+        """
+        orders = np.asarray(orders)
+        rows = np.asarray(rows, dtype=np.int64)
+
+        # Stop is finished as soon as it is sent, so is a move to where the
+        # unit already is, e.g. staying or a target clamped at bounds
+        at_target = (orders == tcc.unitcommandtypes.Move) & \
+            (np.hypot(table.x[rows] - target_x, table.y[rows] - target_y) <= ARRIVAL_RADIUS)
+        tracked = (orders != tcc.unitcommandtypes.Stop) & ~at_target
+        rows = rows[tracked]
+
+        self.table = table
+        self.rows = rows
+        self.orders = orders[tracked]
+        self.target_x = np.asarray(target_x)[tracked]
+        self.target_y = np.asarray(target_y)[tracked]
+        self.cooldown = np.asarray(cooldown)[rows]
+
+    def poll(self, frame, cooldown):
+        """Returns true if a tracked order has finished or max frames have
+        passed at game frame 'frame'
+
+        Arguments:
+            frame {int} -- Current game frame
+            cooldown {np.ndarray} -- Current cooldown of every row of tracked table
+        """
+        self.frames = frame - self.start_frame
+        self.polls += 1
+
+        if self.frames >= self.max_frames:
+            return True
+
+        if len(self.rows) == 0:
+            return False
+
+        table = self.table
+        rows = self.rows
+        cooldown = np.asarray(cooldown)[rows]
+
+        finished = ~table.alive[rows]
+
+        # Units may still report idle on the first frame before orders of
+        # this step take effect
+        if self.polls > 1:
+            finished |= table.idle[rows]
+
+        is_move = self.orders == tcc.unitcommandtypes.Move
+        arrived = np.hypot(table.x[rows] - self.target_x,
+                           table.y[rows] - self.target_y) <= ARRIVAL_RADIUS
+        finished |= is_move & arrived
+
+        # Cooldown only goes up when weapon fires
+        fired = cooldown > self.cooldown
+        finished |= ~is_move & fired
+        self.cooldown = cooldown
+
+        return bool(np.any(finished))
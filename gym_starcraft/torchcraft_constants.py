@@ -0,0 +1,35 @@
+'''
+Lazy stand-in for `torchcraft.Constants`. Modules use `tcc` from here, which
+imports TorchCraft on first attribute access, so that importing environments
+and building their spaces works in processes without TorchCraft installed.
+'''
+import importlib
+
+
+class LazyConstants(object):
+    def __init__(self, module_name='torchcraft.Constants'):
+        self._module_name = module_name
+        self._module = None
+
+    def __getattr__(self, name):
+        # Only called for attributes not yet cached on the instance
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+
+        value = getattr(self._module, name)
+        setattr(self, name, value)
+        return value
+
+    def _clear(self):
+        """Forgets the module and cached constants, e.g. after `torchcraft`
+        in sys.modules was replaced"""
+        module_name = self._module_name
+        self.__dict__.clear()
+        self._module_name = module_name
+        self._module = None
+
+
+tcc = LazyConstants()
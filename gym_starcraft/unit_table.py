@@ -0,0 +1,72 @@
+'''
+Struct of arrays storage for unit state of one player. Each unit id gets a
+stable row at the start of an episode and its columns are updated in place
+from TorchCraft units, so consumers can read contiguous numpy arrays instead
+of calling getattr on TorchCraft unit objects.
+'''
+import numpy as np
+
+
+class UnitTable(object):
+    # Numeric columns and TorchCraft unit attribute each is read from
+    COLUMNS = (
+        ('type', 'type', np.int32),
+        ('x', 'x', np.float64),
+        ('y', 'y', np.float64),
+        ('health', 'health', np.float64),
+        ('shield', 'shield', np.float64),
+        ('max_health', 'max_health', np.float64),
+        ('max_shield', 'max_shield', np.float64),
+        ('ground_cd', 'groundCD', np.float64),
+        ('air_cd', 'airCD', np.float64),
+        ('ground_range', 'groundRange', np.float64),
+        ('air_range', 'airRange', np.float64)
+    )
+
+    def __init__(self, unit_ids):
+        """Creates table with one row per id in 'unit_ids', in that order
+
+        Arguments:
+            unit_ids {list} -- Ids of units, e.g. agent_ids at reset
+        """
+        count = len(unit_ids)
+
+        self.id = np.array(unit_ids, dtype=np.int64).reshape(count)
+        self.index = {unit_id: row for row, unit_id in enumerate(unit_ids)}
+        self.alive = np.zeros(count, dtype=bool)
+        self.attacking = np.zeros(count, dtype=bool)
+        self.idle = np.zeros(count, dtype=bool)
+
+        for name, _, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(count, dtype=dtype))
+
+        # Dict of id to tc.Unit for alive units, kept for code which
+        # still needs the unit objects
+        self.units = {}
+
+    def __len__(self):
+        return len(self.id)
+
+    def update(self, units):
+        """Updates columns in place from 'units' (list of tc.Unit of the player).
+        Rows of units which are not present are marked as not alive and keep
+        their last values. Units without a row are ignored.
+        """
+        self.alive[:] = False
+        self.units = {}
+
+        columns = [(getattr(self, name), attribute) for name, attribute, _ in self.COLUMNS]
+
+        for unit in units:
+            row = self.index.get(unit.id)
+
+            if row is None:
+                continue
+
+            self.alive[row] = True
+            self.attacking[row] = unit.attacking or unit.starting_attack
+            self.idle[row] = unit.idle
+            for column, attribute in columns:
+                column[row] = getattr(unit, attribute)
+
+            self.units[unit.id] = unit
@@ -0,0 +1,122 @@
+'''
+Lookup arrays of static attributes indexed by unit type. They are built once
+from `tcc.staticvalues` and the unit attributes of the environment, so that
+per unit vision, range and cooldown normalisation are gathers over unit
+type columns of a `UnitTable` instead of dict lookups and getattr calls.
+'''
+import numpy as np
+
+
+# Array name and key of tcc.staticvalues it is read from when present
+STATIC_KEYS = (
+    ('sight_range', 'sightRange'),
+    ('max_health', 'maxHitPoints'),
+    ('max_shield', 'maxShields')
+)
+
+# Damage cooldown in frames of ground and air weapon of unit types from BWAPI
+# WeaponType::damageCooldown, 0 if the type has no such weapon. Used as max
+# cooldown of types without unit attributes, tcc.staticvalues has no weapons.
+WEAPON_COOLDOWNS = {
+    0: (15, 15),    # Terran Marine
+    1: (22, 22),    # Terran Ghost
+    2: (30, 0),     # Terran Vulture
+    3: (22, 22),    # Terran Goliath
+    5: (37, 0),     # Terran Siege Tank (tank mode)
+    7: (15, 0),     # Terran SCV
+    8: (30, 22),    # Terran Wraith
+    12: (30, 30),   # Terran Battlecruiser
+    30: (75, 0),    # Terran Siege Tank (siege mode)
+    32: (22, 0),    # Terran Firebat
+    37: (8, 0),     # Zerg Zergling
+    38: (15, 15),   # Zerg Hydralisk
+    39: (15, 0),    # Zerg Ultralisk
+    41: (22, 0),    # Zerg Drone
+    43: (30, 30),   # Zerg Mutalisk
+    44: (30, 0),    # Zerg Guardian
+    58: (0, 64),    # Terran Valkyrie
+    60: (0, 8),     # Protoss Corsair
+    61: (30, 0),    # Protoss Dark Templar
+    62: (0, 100),   # Zerg Devourer
+    64: (22, 0),    # Protoss Probe
+    65: (22, 0),    # Protoss Zealot
+    66: (30, 30),   # Protoss Dragoon
+    68: (20, 20),   # Protoss Archon
+    70: (30, 22),   # Protoss Scout
+    71: (45, 45),   # Protoss Arbiter
+    103: (37, 0)    # Zerg Lurker
+}
+
+# Max cooldown of types neither in unit attributes nor in WEAPON_COOLDOWNS,
+# longest weapon cooldown above, ratios are clipped to 1 for them
+DEFAULT_MAX_CD = 100
+
+
+class UnitTypeTable(object):
+    def __init__(self, staticvalues, unit_attributes, distance_factor=8):
+        """Builds lookup arrays with one entry per unit type
+
+        Arguments:
+            staticvalues {dict} -- tcc.staticvalues, map of name to list of values per type
+            unit_attributes {dict} -- Map of unit type to 'cdAttribute', 'maxCD'
+            and 'rangeAttribute', see StarCraftBaseEnv._set_unit_attributes
+
+        Keyword Arguments:
+            distance_factor {int} -- Pixels per walktile, sight range is
+            converted to walktiles like unit positions (default: {8})
+        """
+        count = max([len(values) for values in staticvalues.values()] +
+                    [unit_type + 1 for unit_type in unit_attributes] +
+                    [unit_type + 1 for unit_type in WEAPON_COOLDOWNS])
+
+        # Max values of 0 mean unknown, per unit values are used for them
+        for name, key in STATIC_KEYS:
+            values = np.zeros(count)
+            if key in staticvalues:
+                values[:len(staticvalues[key])] = staticvalues[key]
+            setattr(self, name, values)
+
+        self.sight_range /= distance_factor
+
+        # Max cooldowns are fixed here so that a cooldown always has the same
+        # ratio. Types without attributes use ground columns unless they only
+        # have an air weapon.
+        self.max_cd = np.full(count, float(DEFAULT_MAX_CD))
+        self.air_cd = np.zeros(count, dtype=bool)
+        self.air_range = np.zeros(count, dtype=bool)
+
+        for unit_type, (ground_cd, air_cd) in WEAPON_COOLDOWNS.items():
+            self.max_cd[unit_type] = ground_cd or air_cd
+            self.air_cd[unit_type] = ground_cd == 0
+
+        for unit_type, attributes in unit_attributes.items():
+            self.max_cd[unit_type] = attributes['maxCD']
+            self.air_cd[unit_type] = attributes['cdAttribute'] == 'airCD'
+            self.air_range[unit_type] = attributes['rangeAttribute'] == 'airRange'
+
+    def __len__(self):
+        return len(self.max_cd)
+
+    def get_cooldown(self, table):
+        """Returns cooldown of every row of 'table' (UnitTable) from the
+        cooldown column of its type"""
+        return np.where(self.air_cd[table.type], table.air_cd, table.ground_cd)
+
+    def get_cooldown_ratio(self, table):
+        """Returns cooldown of every row of 'table' over max cooldown of its
+        type, clipped to [0, 1]"""
+        return np.minimum(self.get_cooldown(table) / self.max_cd[table.type], 1)
+
+    def get_range(self, table):
+        """Returns attack range of every row of 'table' from the range column of its type"""
+        return np.where(self.air_range[table.type], table.air_range, table.ground_range)
+
+    def get_max_hp(self, table):
+        """Returns max health plus shield of every row of 'table'"""
+        max_health = self.max_health[table.type]
+        max_shield = self.max_shield[table.type]
+
+        max_health = np.where(max_health > 0, max_health, table.max_health)
+        max_shield = np.where(max_shield > 0, max_shield, table.max_shield)
+
+        return max_health + max_shield
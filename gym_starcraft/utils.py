@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 def get_distance(x1, y1, x2, y2):
     return math.hypot(x2 - x1, y2 - y1)
@@ -34,4 +35,99 @@ def get_weakest(unit, state, player_id):
         if mini > health:
             weakest = opp_unit
             mini = health
-    return weakest
\ No newline at end of file
+    return weakest
+
+def get_unit_arrays(table, unit_types):
+    """Get normalized state arrays of units in 'table', one entry per row.
+    Values of dead units are zeroed.
+
+    Arguments:
+        table {UnitTable} -- Unit table of the player
+        unit_types {UnitTypeTable} -- Lookup arrays of unit type attributes
+
+    Returns:
+        dict -- Arrays for 'alive', 'x', 'y', 'hp' (health + shield ratio),
+        'cd' (cooldown ratio), 'attacking', 'range' and 'vision' (in walktiles)
+    """
+    alive = table.alive
+    max_hp = np.where(alive, unit_types.get_max_hp(table), 1)
+
+    return {
+        'alive': alive,
+        'x': np.where(alive, table.x, 0),
+        'y': np.where(alive, table.y, 0),
+        'hp': np.where(alive, table.health + table.shield, 0) / max_hp,
+        'cd': np.where(alive, unit_types.get_cooldown_ratio(table), 0),
+        'attacking': alive & table.attacking,
+        'range': unit_types.get_range(table),
+        'vision': unit_types.sight_range[table.type]
+    }
+
+
+def get_distance_matrix(units, opp_units):
+    """Get distances between every pair of 'units' and 'opp_units' in one go
+
+    Arguments:
+        units {list} -- List of tc.Unit, rows of the matrix
+        opp_units {list} -- List of tc.Unit, columns of the matrix
+
+    Returns:
+        np.ndarray -- Distances of shape (len(units), len(opp_units))
+    """
+    positions = np.array([(unit.x, unit.y) for unit in units], dtype=float).reshape(-1, 2)
+    opp_positions = np.array([(unit.x, unit.y) for unit in opp_units], dtype=float).reshape(-1, 2)
+
+    diff = opp_positions[None, :, :] - positions[:, None, :]
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+
+def get_closest_targets(units, opp_units, distances=None):
+    """Batched version of 'get_closest', finds closest of 'opp_units' for each of 'units'
+
+    Arguments:
+        units {list} -- List of tc.Unit for which closest units are to be found
+        opp_units {list} -- List of tc.Unit to be scanned, must not be empty
+
+    Keyword Arguments:
+        distances {np.ndarray} -- Precomputed 'get_distance_matrix' of units (default: {None})
+
+    Returns:
+        np.ndarray -- Index into 'opp_units' of closest unit for each unit
+    """
+    if distances is None:
+        distances = get_distance_matrix(units, opp_units)
+
+    return distances.argmin(axis=1)
+
+
+def get_weakest_targets(units, opp_units, distances=None, vision=None):
+    """Batched version of 'get_weakest', finds weakest of 'opp_units' for each of 'units'.
+    If 'vision' is passed, only opp units within vision of each unit are considered
+    and -1 is returned for units which don't see any.
+
+    Arguments:
+        units {list} -- List of tc.Unit for which weakest units are to be found
+        opp_units {list} -- List of tc.Unit to be scanned, must not be empty
+
+    Keyword Arguments:
+        distances {np.ndarray} -- Precomputed 'get_distance_matrix' of units (default: {None})
+        vision {float or np.ndarray} -- Vision range, scalar or one per unit (default: {None})
+
+    Returns:
+        np.ndarray -- Index into 'opp_units' of weakest unit for each unit
+    """
+    # This need to be absolute hitpoints not relative
+    health = np.array([unit.health + unit.shield for unit in opp_units], dtype=float)
+
+    if vision is None:
+        return np.full(len(units), health.argmin(), dtype=int)
+
+    if distances is None:
+        distances = get_distance_matrix(units, opp_units)
+
+    in_vision = distances <= np.reshape(vision, (-1, 1))
+    health = np.where(in_vision, health[None, :], math.inf)
+    targets = health.argmin(axis=1)
+    targets[~in_vision.any(axis=1)] = -1
+
+    return targets
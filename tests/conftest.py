@@ -0,0 +1,112 @@
+'''
+Shared fixtures of tests, which run against the local TorchCraft stand-in.
+'''
+import argparse
+import os
+import random
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+import gym_starcraft.local_torchcraft as local_torchcraft
+from gym_starcraft.envs.starcraft_wrapper_env import StarCraftWrapperEnv
+
+
+@pytest.fixture
+def local_tc():
+    """Installs the local TorchCraft stand-in for one test"""
+    local_torchcraft.install()
+    yield local_torchcraft
+    local_torchcraft.uninstall()
+
+
+@pytest.fixture
+def make_args():
+    """Returns factory of env arguments, parsed from command line 'flags' as
+    by the examples and then overridden by keyword arguments"""
+    def make(flags=(), **overrides):
+        parser = argparse.ArgumentParser()
+        StarCraftWrapperEnv().init_args(parser)
+        args = parser.parse_args(['--ai_type', 'attack_closest'] + list(flags))
+
+        args.nagents = 3
+        args.nenemies = 3
+        args.max_steps = 20
+        for name, value in overrides.items():
+            setattr(args, name, value)
+        return args
+
+    return make
+
+
+@pytest.fixture
+def make_env(local_tc, make_args):
+    """Returns factory of local envs of 'env_class' taking the arguments of
+    'make_args', envs are closed at end of the test"""
+    envs = []
+
+    def make(env_class, flags=(), **overrides):
+        env = local_tc.local_env(env_class)(make_args(flags, **overrides))
+        envs.append(env)
+        return env
+
+    yield make
+
+    for env in envs:
+        env.close()
+
+
+@pytest.fixture
+def make_arenas(local_tc, make_args):
+    """Returns factory of StarCraftMultiArena with 'narenas' local arenas of
+    'env_class', closed at end of the test"""
+    from gym_starcraft.envs.starcraft_multi_arena import StarCraftMultiArena
+    envs = []
+
+    def make(env_class, narenas, flags=(), **overrides):
+        env = StarCraftMultiArena(local_tc.local_env(env_class),
+                                  make_args(flags, **overrides), narenas)
+        envs.append(env)
+        return env
+
+    yield make
+
+    for env in envs:
+        env.close()
+
+
+@pytest.fixture
+def seed():
+    """Seeds the random modules used by envs and returns a RandomState for actions"""
+    random.seed(0)
+    np.random.seed(0)
+    return np.random.RandomState(0)
+
+
+FAKE_LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_launcher.py')
+
+
+@pytest.fixture
+def fake_launcher_config(tmp_path, monkeypatch):
+    """Returns factory of yml configs whose BWAPILauncher is tests/fake_launcher.py
+    running in 'mode' and printing its port after 'delay' seconds"""
+    monkeypatch.delenv('BWAPI_INSTALL_PREFIX', raising=False)
+
+    launcher_path = tmp_path / 'bin' / 'BWAPILauncher'
+    launcher_path.parent.mkdir()
+    launcher_path.write_text('#!/bin/sh\nexec "%s" "%s"\n' % (sys.executable, FAKE_LAUNCHER))
+    launcher_path.chmod(launcher_path.stat().st_mode | stat.S_IEXEC)
+
+    def make(mode='ok', delay=0):
+        config_path = tmp_path / ('config_%s.yml' % mode)
+        config_path.write_text(
+            'options:\n'
+            '  BWAPI_INSTALL_PREFIX: "%s"\n'
+            '  BWAPI_CONFIG_AUTO_MENU__MAP: "%s"\n'
+            '  FAKE_LAUNCHER_MODE: "%s"\n'
+            '  FAKE_LAUNCHER_DELAY: "%s"\n' % (tmp_path, tmp_path / 'map.scm', mode, delay))
+        return str(config_path)
+
+    return make
@@ -0,0 +1,30 @@
+'''
+Stand-in for BWAPILauncher used by launcher tests. Behaviour is chosen by
+FAKE_LAUNCHER_MODE in its environment:
+    ok   -- prints TorchCraft port after FAKE_LAUNCHER_DELAY seconds and waits
+    exit -- prints a line and exits with code 3 without a port
+    hang -- prints a line and waits without a port
+'''
+import os
+import sys
+import time
+
+
+def main():
+    mode = os.environ.get('FAKE_LAUNCHER_MODE', 'ok')
+    print('fake BWAPILauncher starting', flush=True)
+
+    if mode == 'exit':
+        sys.exit(3)
+
+    if mode == 'ok':
+        time.sleep(float(os.environ.get('FAKE_LAUNCHER_DELAY', '0')))
+        print('TorchCraft server listening on port %d' % (20000 + os.getpid() % 40000),
+              flush=True)
+
+    while True:
+        time.sleep(60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+'''
+With 'ai_retarget_interval' enemy AI keeps targets of its units between
+steps. Kept targets must be counted as hits and only be dropped when the
+interval passes, the target dies or leaves vision. Runs against the local
+TorchCraft stand-in.
+'''
+import types
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+VISION = 50
+
+
+def make_unit(unit_id, x, y, health=40, idle=False):
+    return types.SimpleNamespace(id=unit_id, type=0, x=x, y=y, health=health, shield=0,
+                                 idle=idle)
+
+
+def make_ai_env(make_env, interval=3):
+    env = make_env(StarCraftMvN, ai_retarget_interval=interval, ai_type='attack_closest')
+    env.reset()
+    env.unit_types.sight_range[0] = VISION
+    env.episode_steps = 0
+    return env
+
+
+def targets_of(cmds):
+    return {cmd[1]: cmd[3] for cmd in cmds}
+
+
+def test_cache_hits_and_misses(make_env):
+    env = make_ai_env(make_env)
+    stats = env.ai_target_stats
+    units = [make_unit(1, 0, 0), make_unit(2, 100, 0)]
+    opp_units = [make_unit(10, 10, 0), make_unit(11, 90, 0), make_unit(12, 60, 0)]
+
+    # New targets are picked like without cache
+    cmds = env._get_cached_enemy_commands(units, opp_units)
+    assert targets_of(cmds) == {1: 10, 2: 11}
+    assert stats == {'hits': 0, 'misses': 2}
+    assert env.ai_targets == {1: (10, 0), 2: (11, 0)}
+
+    # Units busy with kept targets get no commands, even if another is closer now
+    env.episode_steps = 1
+    opp_units[2].x = 99
+    assert env._get_cached_enemy_commands(units, opp_units) == []
+    assert stats == {'hits': 2, 'misses': 2}
+
+    # Idle unit is sent its kept target again, time it was picked stays
+    env.episode_steps = 2
+    units[1].idle = True
+    assert targets_of(env._get_cached_enemy_commands(units, opp_units)) == {2: 11}
+    assert stats == {'hits': 4, 'misses': 2}
+    assert env.ai_targets[2] == (11, 0)
+
+    # Interval has passed, both pick again and unit 2 takes closer target
+    env.episode_steps = 3
+    units[1].idle = False
+    assert targets_of(env._get_cached_enemy_commands(units, opp_units)) == {1: 10, 2: 12}
+    assert stats == {'hits': 4, 'misses': 4}
+    assert env.ai_targets == {1: (10, 3), 2: (12, 3)}
+
+
+def test_dead_target_is_replaced(make_env):
+    env = make_ai_env(make_env)
+    units = [make_unit(1, 0, 0), make_unit(2, 100, 0)]
+    opp_units = [make_unit(10, 10, 0), make_unit(11, 90, 0), make_unit(12, 30, 0)]
+    env._get_cached_enemy_commands(units, opp_units)
+
+    # Target of unit 1 died, unit 2 keeps its target
+    env.episode_steps = 1
+    cmds = env._get_cached_enemy_commands(units, [opp_units[1], opp_units[2]])
+
+    assert targets_of(cmds) == {1: 12}
+    assert env.ai_target_stats == {'hits': 1, 'misses': 3}
+    assert env.ai_targets == {1: (12, 1), 2: (11, 0)}
+
+
+def test_target_out_of_vision_is_dropped(make_env):
+    env = make_ai_env(make_env)
+    units = [make_unit(1, 0, 0)]
+    opp_units = [make_unit(10, 10, 0)]
+    env._get_cached_enemy_commands(units, opp_units)
+
+    # Target ran away out of vision, no other target is visible
+    env.episode_steps = 1
+    opp_units[0].x = VISION + 10
+    assert env._get_cached_enemy_commands(units, opp_units) == []
+    assert env.ai_target_stats == {'hits': 0, 'misses': 2}
+    assert env.ai_targets == {}
+
+
+def test_cached_targets_match_uncached_on_first_pick(make_env, seed):
+    units = [make_unit(idx, x, y) for idx, (x, y) in enumerate(seed.uniform(0, 200, (8, 2)))]
+    opp_units = [make_unit(100 + idx, x, y)
+                 for idx, (x, y) in enumerate(seed.uniform(0, 200, (12, 2)))]
+
+    cached_env = make_ai_env(make_env)
+    env = make_ai_env(make_env, interval=0)
+    env._get_ai_units = lambda: (units, opp_units)
+
+    cached = targets_of(cached_env._get_cached_enemy_commands(units, opp_units))
+    assert cached == targets_of(env._get_enemy_commands())
+    assert len(cached) > 0
@@ -0,0 +1,94 @@
+'''
+Async API must play same episodes as blocking API, let one event loop step
+several environments and bind steps to the loop they are started on. Runs
+against the local TorchCraft stand-in.
+'''
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+
+def actions_of(env, steps):
+    rng = np.random.RandomState(1)
+    return [rng.randint(0, env.nactions, env.nagents) for _ in range(steps)]
+
+
+def play_sync(env, actions):
+    results = [env.reset()]
+    for action in actions:
+        obs, reward, done, _ = env.step(action)
+        results.append((obs, reward, done))
+    return results
+
+
+async def play_async(env, actions):
+    results = [await env.async_reset()]
+    for action in actions:
+        env.step_async(action)
+        obs, reward, done, _ = await env.step_wait()
+        results.append((obs, reward, done))
+    return results
+
+
+def reseed():
+    random.seed(0)
+    np.random.seed(0)
+
+
+def assert_same_results(expected, results):
+    np.testing.assert_allclose(expected[0], results[0])
+    for (obs1, reward1, done1), (obs2, reward2, done2) in zip(expected[1:], results[1:]):
+        np.testing.assert_allclose(obs1, obs2)
+        np.testing.assert_allclose(reward1, reward2)
+        assert done1 == done2
+
+
+def test_async_steps_match_sync_steps(make_env):
+    # Async round trips send to both clients before waiting on either
+    reseed()
+    env = make_env(StarCraftMvN, ['--concurrent_io'])
+    actions = actions_of(env, 5)
+    expected = play_sync(env, actions)
+
+    reseed()
+    env = make_env(StarCraftMvN, ['--concurrent_io'])
+    results = asyncio.run(play_async(env, actions))
+
+    assert_same_results(expected, results)
+
+
+def test_one_loop_steps_many_envs(make_env, seed):
+    envs = [make_env(StarCraftMvN) for _ in range(3)]
+    actions = actions_of(envs[0], 5)
+
+    async def play_all():
+        return await asyncio.gather(*[play_async(env, actions) for env in envs])
+
+    results = asyncio.run(play_all())
+
+    for env, env_results in zip(envs, results):
+        assert len(env_results) == len(actions) + 1
+        assert env.round_trips > len(actions)
+
+
+def test_step_async_needs_a_loop(make_env, seed):
+    env = make_env(StarCraftMvN)
+    env.reset()
+    action = actions_of(env, 1)[0]
+
+    # No loop is running here
+    with pytest.raises(RuntimeError):
+        env.step_async(action)
+
+    loop = asyncio.new_event_loop()
+    try:
+        env.step_async(action, loop=loop)
+        obs, _, _, _ = loop.run_until_complete(env.step_wait())
+    finally:
+        loop.close()
+
+    assert obs.shape[0] == env.nagents
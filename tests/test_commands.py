@@ -0,0 +1,101 @@
+'''
+CommandEncoder must encode orders like per unit code did and, with
+suppression on, only drop commands repeating the last command of a unit
+which is still executing it. Uses constants of the local TorchCraft stand-in.
+'''
+import numpy as np
+import pytest
+
+from gym_starcraft.commands import CommandEncoder
+from gym_starcraft.torchcraft_constants import tcc
+from gym_starcraft.unit_table import UnitTable
+
+pytestmark = pytest.mark.usefixtures('local_tc')
+
+
+def make_table(idle):
+    table = UnitTable([10, 11, 12])
+    table.idle[:] = idle
+    return table
+
+
+def encode_moves(encoder, table, target_x):
+    rows = np.arange(len(table))
+    return encoder.encode(table, rows, tcc.unitcommandtypes.Move,
+                          target_x=np.asarray(target_x), target_y=np.full(len(rows), 7))
+
+
+def test_encodes_orders():
+    encoder = CommandEncoder()
+    table = make_table([False] * 3)
+    orders = np.array([tcc.unitcommandtypes.Move, tcc.unitcommandtypes.Attack_Unit,
+                       tcc.unitcommandtypes.Stop])
+
+    cmds = encoder.encode(table, [0, 1, 2], orders, targets=np.array([-1, 99, -1]),
+                          target_x=np.array([5, -1, -1]), target_y=np.array([6, -1, -1]),
+                          protected=np.array([False, True, False]))
+
+    assert cmds == [
+        [tcc.command_unit, 10, tcc.unitcommandtypes.Move, -1, 5, 6, -1],
+        [tcc.command_unit_protected, 11, tcc.unitcommandtypes.Attack_Unit, 99],
+        [tcc.command_unit, 12, tcc.unitcommandtypes.Stop]
+    ]
+
+
+def test_repeated_commands_are_sent_without_suppression():
+    encoder = CommandEncoder()
+    table = make_table([False] * 3)
+
+    for _ in range(3):
+        assert len(encode_moves(encoder, table, [1, 2, 3])) == 3
+    assert encoder.suppressed == 0
+
+
+def test_suppresses_repeats_of_executing_units():
+    encoder = CommandEncoder(suppress_repeated=True)
+    table = make_table([False] * 3)
+
+    assert len(encode_moves(encoder, table, [1, 2, 3])) == 3
+
+    # Same orders while all units still move
+    assert encode_moves(encoder, table, [1, 2, 3]) == []
+    assert encoder.suppressed == 3
+
+    # Unit 11 got a new target, unit 12 arrived and is idle
+    table.idle[2] = True
+    cmds = encode_moves(encoder, table, [1, 4, 3])
+    assert [cmd[1] for cmd in cmds] == [11, 12]
+    assert cmds[0][4] == 4
+    assert encoder.suppressed == 4
+
+
+def test_repeated_stop_is_suppressed_while_idle():
+    encoder = CommandEncoder(suppress_repeated=True)
+    table = make_table([False] * 3)
+    stop = tcc.unitcommandtypes.Stop
+
+    assert len(encoder.encode(table, [0], stop)) == 1
+
+    # Unit stopped, repeating Stop does nothing
+    table.idle[0] = True
+    assert encoder.encode(table, [0], stop) == []
+
+    # Unit was moved by something else, Stop is needed again
+    table.idle[0] = False
+    assert len(encoder.encode(table, [0], stop)) == 1
+
+
+def test_reset_forgets_last_commands():
+    encoder = CommandEncoder(suppress_repeated=True)
+    table = make_table([False] * 3)
+    encode_moves(encoder, table, [1, 2, 3])
+
+    encoder.reset(3)
+    assert len(encode_moves(encoder, table, [1, 2, 3])) == 3
+
+    # New table of other size, e.g. after a reset of the env
+    table = UnitTable([20, 21])
+    rows = np.arange(2)
+    cmds = encoder.encode(table, rows, tcc.unitcommandtypes.Move,
+                          target_x=np.array([1, 2]), target_y=np.array([7, 7]))
+    assert [cmd[1] for cmd in cmds] == [20, 21]
@@ -0,0 +1,123 @@
+'''
+Episodes written by TrajectoryRecorder must read back the same through
+EpisodeDataset, also across chunk files, and sampled windows must stay
+within single episodes.
+'''
+import numpy as np
+import pytest
+
+from gym_starcraft.dataset import EpisodeDataset
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+from gym_starcraft.recorder import TrajectoryRecorder
+
+# Lengths of recorded episodes, with chunks of 4 steps they cross chunk files
+EPISODE_LENGTHS = (5, 2, 7)
+CHUNK_SIZE = 4
+
+
+def record_episodes(path, lengths=EPISODE_LENGTHS):
+    """Records episodes whose observations hold their global step number"""
+    recorder = TrajectoryRecorder(str(path), chunk_size=CHUNK_SIZE)
+    step = 0
+    for length in lengths:
+        recorder.record_reset()
+        for idx in range(length):
+            done = idx == length - 1
+            recorder.record_step(np.full((2, 3), step), [step, -step], step / 10,
+                                 done, [1, 0])
+            step += 1
+    recorder.close()
+    return step
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    record_episodes(tmp_path)
+    return EpisodeDataset(str(tmp_path))
+
+
+def test_episodes_read_back(dataset):
+    assert len(dataset) == sum(EPISODE_LENGTHS)
+    assert dataset.num_episodes == len(EPISODE_LENGTHS)
+    np.testing.assert_array_equal(dataset.episodes[:, 1], EPISODE_LENGTHS)
+
+    start = 0
+    for idx, length in enumerate(EPISODE_LENGTHS):
+        episode = dataset.get_episode(idx)
+        steps = np.arange(start, start + length)
+
+        np.testing.assert_array_equal(episode['obs'][:, 0, 0], steps)
+        assert episode['obs'].shape == (length, 2, 3)
+        np.testing.assert_array_equal(episode['action'], np.stack([steps, -steps], 1))
+        np.testing.assert_allclose(episode['reward'], steps / 10, rtol=1e-6)
+        np.testing.assert_array_equal(episode['done'], np.arange(length) == length - 1)
+        np.testing.assert_array_equal(episode['alive_mask'], [[1, 0]] * length)
+        start += length
+
+
+def test_rows_and_gather_across_chunks(dataset):
+    np.testing.assert_array_equal(dataset.get_rows('obs', 2, 11)[:, 0, 0], np.arange(2, 11))
+    np.testing.assert_array_equal(dataset.gather('obs', [13, 0, 4, 3])[:, 0, 0],
+                                  [13, 0, 4, 3])
+
+
+def test_sample_next_obs(dataset):
+    batch = dataset.sample(200, np.random.RandomState(0))
+    steps = batch['obs'][:, 0, 0].astype(np.int64)
+    ends = np.cumsum(EPISODE_LENGTHS)
+
+    np.testing.assert_array_equal(batch['action'][:, 0], steps)
+    # Next observation stays on the last step of an episode
+    expected = np.where(np.isin(steps + 1, ends), steps, steps + 1)
+    np.testing.assert_array_equal(batch['next_obs'][:, 0, 0], expected)
+
+
+def test_sample_windows_bounds(dataset):
+    length = 3
+    windows = dataset.sample_windows(500, length, np.random.RandomState(0))
+    starts = np.cumsum((0,) + EPISODE_LENGTHS)
+
+    seen = set()
+    for window in windows:
+        steps = window['obs'][:, 0, 0].astype(np.int64)
+        assert len(steps) == length
+        np.testing.assert_array_equal(steps, np.arange(steps[0], steps[0] + length))
+
+        # Window is within one episode, which is long enough for it
+        episode = np.searchsorted(starts, steps[0], side='right') - 1
+        assert steps[-1] < starts[episode + 1]
+        assert EPISODE_LENGTHS[episode] >= length
+        assert not window['done'][:-1].any()
+        seen.add(steps[0])
+
+    # Every valid start is sampled, 3 in first and 5 in last episode
+    assert seen == {0, 1, 2} | {7, 8, 9, 10, 11}
+
+
+def test_sample_windows_longer_than_episodes(dataset):
+    with pytest.raises(RuntimeError):
+        dataset.sample_windows(1, max(EPISODE_LENGTHS) + 1)
+
+
+def test_env_episodes_read_back(make_env, seed, tmp_path):
+    env = make_env(StarCraftMvN, max_steps=6)
+    recorder = TrajectoryRecorder(str(tmp_path), chunk_size=CHUNK_SIZE)
+    recorder.attach(env)
+
+    observations = []
+    actions = []
+    for _ in range(2):
+        obs = env.reset()
+        done = False
+        while not done:
+            action = seed.randint(0, env.nactions, env.nagents)
+            observations.append(obs.copy())
+            actions.append(action)
+            obs, _, done, _ = env.step(action)
+    recorder.close()
+
+    dataset = EpisodeDataset(str(tmp_path))
+    assert dataset.num_episodes == 2
+    assert len(dataset) == len(observations)
+    np.testing.assert_allclose(dataset.get_rows('obs', 0, len(dataset)), observations)
+    np.testing.assert_array_equal(dataset.get_rows('action', 0, len(dataset)), actions)
@@ -0,0 +1,75 @@
+'''
+Batched target selection of scripted enemy AI must match the per unit
+functions in utils, and weakest-in-vision must only pick visible targets.
+'''
+import types
+
+import numpy as np
+
+from gym_starcraft import utils
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+
+def make_units(positions, health=None, first_id=0):
+    health = health if health is not None else [40] * len(positions)
+    return [types.SimpleNamespace(id=first_id + idx, type=0, x=x, y=y, health=hp, shield=0)
+            for idx, ((x, y), hp) in enumerate(zip(positions, health))]
+
+
+def random_units(rng, count, first_id=0):
+    positions = rng.uniform(0, 100, (count, 2))
+    health = rng.randint(1, 40, count)
+    return make_units(positions, health, first_id)
+
+
+def test_batched_targets_match_loop():
+    rng = np.random.RandomState(0)
+    units = random_units(rng, 20)
+    opp_units = random_units(rng, 30, first_id=100)
+    state = types.SimpleNamespace(units={1: opp_units})
+
+    closest = utils.get_closest_targets(units, opp_units)
+    weakest = utils.get_weakest_targets(units, opp_units)
+
+    for idx, unit in enumerate(units):
+        assert opp_units[closest[idx]] is utils.get_closest(unit, state, 1)
+        assert opp_units[weakest[idx]] is utils.get_weakest(unit, state, 1)
+
+
+def test_weakest_in_vision_matches_brute_force():
+    rng = np.random.RandomState(1)
+    units = random_units(rng, 20)
+    opp_units = random_units(rng, 30, first_id=100)
+    vision = rng.uniform(5, 40, len(units))
+
+    targets = utils.get_weakest_targets(units, opp_units, vision=vision)
+
+    for idx, unit in enumerate(units):
+        visible = [opp for opp in opp_units
+                   if utils.get_distance(unit.x, unit.y, opp.x, opp.y) <= vision[idx]]
+        if len(visible) == 0:
+            assert targets[idx] == -1
+        else:
+            weakest = min(opp.health + opp.shield for opp in visible)
+            assert opp_units[targets[idx]] in visible
+            assert opp_units[targets[idx]].health == weakest
+
+
+def test_ai_types_only_attack_visible_targets(make_env):
+    units = make_units([(0, 0), (100, 100)])
+    # Weakest unit is only seen by second unit
+    opp_units = make_units([(5, 0), (100, 110)], health=[30, 10], first_id=100)
+    distances = utils.get_distance_matrix(units, opp_units)
+    vision = np.array([20, 20])
+
+    env = make_env(StarCraftMvN, ai_type='attack_weakest')
+    targets = env._get_ai_targets(units, opp_units, distances, vision)
+    assert targets.tolist() == [-1, 1]
+
+    env = make_env(StarCraftMvN, ai_type='attack_weakest_in_vision')
+    targets = env._get_ai_targets(units, opp_units, distances, vision)
+    assert targets.tolist() == [0, 1]
+
+    env = make_env(StarCraftMvN, ai_type='attack_weakest_in_vision', full_vision=True)
+    targets = env._get_ai_targets(units, opp_units, distances, vision)
+    assert targets.tolist() == [1, 1]
@@ -0,0 +1,147 @@
+'''
+Fast reset must start episodes with reused units healed at their new
+positions, and fall back to killing and respawning all units when they
+don't get there. Runs against the local TorchCraft stand-in.
+'''
+import numpy as np
+
+import gym_starcraft.envs.starcraft_base_env as sc
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+
+class RecordingMvN(StarCraftMvN):
+    """MvN keeping targets of reused units of last reset"""
+    def _reuse_units(self, spawn_cmds, units):
+        cmds, targets = super(RecordingMvN, self)._reuse_units(spawn_cmds, units)
+        self.targets.update(targets)
+        return cmds, targets
+
+    def _on_reset(self):
+        super(RecordingMvN, self)._on_reset()
+        self.targets = {}
+
+
+class ReuseCommandMvN(RecordingMvN):
+    """MvN which sends 'extra_commands' for reused units after the reuse commands"""
+    def extra_commands(self, unit_id):
+        return []
+
+    def _reuse_units(self, spawn_cmds, units):
+        cmds, targets = super(ReuseCommandMvN, self)._reuse_units(spawn_cmds, units)
+        for unit_id in targets:
+            cmds += self.extra_commands(unit_id)
+        return cmds, targets
+
+
+class WoundedReuseMvN(ReuseCommandMvN):
+    """Reused units are hurt on their way, like in a fight"""
+    def extra_commands(self, unit_id):
+        return [[sc.tcc.command_openbw, sc.tcc.openbwcommandtypes.SetUnitHealth, unit_id, 1]]
+
+
+class DyingReuseMvN(ReuseCommandMvN):
+    """First reused unit of each reset is killed on its way"""
+    def extra_commands(self, unit_id):
+        if unit_id != min(self.targets):
+            return []
+        return [[sc.tcc.command_openbw, sc.tcc.openbwcommandtypes.KillUnit, unit_id]]
+
+
+class StoppingReuseMvN(ReuseCommandMvN):
+    """First reused unit of each reset stops before its position"""
+    def extra_commands(self, unit_id):
+        if unit_id != min(self.targets):
+            return []
+        return [[sc.tcc.command_unit, unit_id, sc.tcc.unitcommandtypes.Stop]]
+
+
+FLAGS = ['--frame_skip', '4', '--init_range_start', '100', '--init_range_end', '140',
+         '--fast_reset']
+
+
+def play_episode(env, rng):
+    """Plays an episode and returns true if a unit got hurt"""
+    done = False
+    hurt = False
+    while not done:
+        _, _, done, _ = env.step(rng.randint(0, env.nactions, env.nagents))
+        for table in (env.my_unit_table, env.enemy_unit_table):
+            hurt |= bool(np.any(table.alive & (table.health < table.max_health)))
+    return hurt
+
+
+def assert_fresh_units(env):
+    for table in (env.my_unit_table, env.enemy_unit_table):
+        assert np.all(table.alive)
+        np.testing.assert_array_equal(table.health, table.max_health)
+        np.testing.assert_array_equal(table.shield, table.max_shield)
+
+
+def assert_at_targets(env):
+    assert len(env.targets) > 0
+    for table in (env.my_unit_table, env.enemy_unit_table):
+        for unit_id, row in table.index.items():
+            if unit_id in env.targets:
+                x, y = env.targets[unit_id]
+                assert np.hypot(table.x[row] - x, table.y[row] - y) <= sc.ARRIVAL_RADIUS
+
+
+def test_reused_units_reach_new_positions(make_env, seed):
+    env = make_env(RecordingMvN, FLAGS, nagents=4, max_steps=10)
+    env.reset()
+
+    # Nothing to reuse on first reset
+    assert env.reset_stats['respawned']
+
+    hurt = False
+    for _ in range(3):
+        hurt |= play_episode(env, seed)
+        env.reset()
+
+        assert not env.reset_stats['respawned']
+        assert env.reset_stats['frames'] > 1
+        assert_fresh_units(env)
+        assert_at_targets(env)
+
+    # Units fought before they were reused
+    assert hurt
+
+
+def test_reused_units_are_healed_after_their_way(make_env, seed):
+    env = make_env(WoundedReuseMvN, FLAGS, nagents=4, max_steps=10)
+    env.reset()
+
+    play_episode(env, seed)
+    env.reset()
+
+    assert not env.reset_stats['respawned']
+    assert_fresh_units(env)
+    assert_at_targets(env)
+
+
+def test_falls_back_to_respawn_when_reused_unit_dies(make_env, seed):
+    env = make_env(DyingReuseMvN, FLAGS, nagents=4, max_steps=10)
+    env.reset()
+
+    play_episode(env, seed)
+    env.reset()
+
+    assert env.reset_stats['respawned']
+    assert len(env.my_unit_table) == env.nagents
+    assert len(env.enemy_unit_table) == env.nenemies
+    assert_fresh_units(env)
+
+
+def test_falls_back_to_respawn_when_reused_unit_stops(make_env, seed):
+    env = make_env(StoppingReuseMvN, FLAGS, nagents=4, max_steps=10)
+    env.reset()
+
+    play_episode(env, seed)
+    env.reset()
+
+    # Stopped unit is found idle on first poll after it was reused
+    assert env.reset_stats['respawned']
+    assert env.reset_stats['frames'] < sc.FAST_RESET_MAX_FRAMES
+    assert len(env.my_unit_table) == env.nagents
+    assert len(env.enemy_unit_table) == env.nenemies
+    assert_fresh_units(env)
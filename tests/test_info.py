@@ -0,0 +1,59 @@
+'''
+Step info must have the same keys on every return path of a step, keep
+raw states of its own step and leave them out when pickled.
+Runs against the local TorchCraft stand-in.
+'''
+import pickle
+
+import numpy as np
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+from gym_starcraft.info import RAW_STATE_KEYS
+
+
+class ExtraUnitsMvN(StarCraftMvN):
+    """MvN which sees units of a map config after reset"""
+    def _has_extra_units(self, mine_only=False):
+        return self.episode_steps > 0
+
+
+def test_info_on_extra_units(make_env, seed):
+    env = make_env(ExtraUnitsMvN, nagents=2, nenemies=2, max_steps=10)
+
+    env.reset()
+    _, _, done, info = env.step(np.zeros(env.nagents, dtype=np.int64))
+    assert not done
+    assert info['my_count'] == env.nagents
+
+    _, _, done, info = env.step(np.zeros(env.nagents, dtype=np.int64))
+    assert done
+    assert info['my_count'] == 0
+    assert info['enemy_count'] == env.nenemies
+
+
+
+def test_info_keeps_states_of_its_step(make_env, seed):
+    env = make_env(StarCraftMvN)
+    env.reset()
+
+    _, _, _, info = env.step(seed.randint(0, env.nactions, env.nagents))
+    frame = info['state1'].frame_from_bwapi
+    env.step(seed.randint(0, env.nactions, env.nagents))
+
+    assert env.state1.frame_from_bwapi > frame
+    assert info['state1'].frame_from_bwapi == frame
+    assert 'state1' in info and 'state2' in info
+    assert set(RAW_STATE_KEYS) <= set(info.keys())
+
+
+def test_info_pickles_without_states(make_env, seed):
+    env = make_env(StarCraftMvN)
+    env.reset()
+    _, _, _, info = env.step(seed.randint(0, env.nactions, env.nagents))
+
+    restored = pickle.loads(pickle.dumps(info))
+
+    assert type(restored) is dict
+    assert set(restored) == set(info) - set(RAW_STATE_KEYS)
+    for key, value in restored.items():
+        np.testing.assert_array_equal(value, info[key])
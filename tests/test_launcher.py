@@ -0,0 +1,138 @@
+'''
+LauncherPool must never leave live server pairs behind once it is closed,
+and hands out or keeps only pairs whose processes are alive. Envs given a
+pooled pair they can't connect to replace it once. Launchers are played by
+tests/fake_launcher.py.
+'''
+import subprocess
+
+import pytest
+
+import gym_starcraft.launcher as launcher
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+
+@pytest.fixture
+def started_pairs(monkeypatch):
+    """Records every pair started through start_server_pairs"""
+    pairs = []
+    start_server_pairs = launcher.start_server_pairs
+
+    def start(*args, **kwargs):
+        started = start_server_pairs(*args, **kwargs)
+        pairs.extend(started)
+        return started
+
+    monkeypatch.setattr(launcher, 'start_server_pairs', start)
+    yield pairs
+
+    for pair in pairs:
+        pair.kill()
+
+
+def exited(pair, timeout=5):
+    """Returns true if both processes of 'pair' exit within 'timeout' seconds"""
+    try:
+        for proc in pair.procs:
+            proc.proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        return False
+    return True
+
+
+def make_pool(config_path, tmp_path, **kwargs):
+    return launcher.LauncherPool(config_path, torchcraft_dir=str(tmp_path),
+                                 startup_timeout=10, **kwargs)
+
+
+def test_pool_closed_during_refill_leaves_no_live_pairs(fake_launcher_config, tmp_path,
+                                                        started_pairs):
+    pool = make_pool(fake_launcher_config(delay=0.5), tmp_path)
+    pair = pool.acquire()
+
+    # Refill started by acquire is still waiting for its servers
+    pool.close()
+    pool.refill_thread.join(10)
+
+    assert len(started_pairs) == 2
+    assert pool.idle == []
+    assert pair.is_alive()
+    assert all(exited(other) for other in started_pairs if other is not pair)
+
+    pool.release(pair)
+    assert exited(pair)
+
+
+def test_acquire_after_close_raises(fake_launcher_config, tmp_path, started_pairs):
+    pool = make_pool(fake_launcher_config(), tmp_path)
+    pool.close()
+
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+    assert len(started_pairs) == 1
+    assert exited(started_pairs[0])
+
+
+def test_dead_pairs_are_not_handed_out_or_kept(fake_launcher_config, tmp_path, started_pairs):
+    pool = make_pool(fake_launcher_config(), tmp_path)
+
+    # Idle pair died while waiting in the pool
+    dead = pool.idle[0]
+    dead.procs[0].kill()
+    dead.procs[0].proc.wait()
+
+    pair = pool.acquire()
+    assert pair is not dead
+    assert pair.is_alive()
+    pool.refill_thread.join(10)
+
+    pair.procs[1].kill()
+    pair.procs[1].proc.wait()
+    pool.release(pair)
+    assert pair not in pool.idle
+    assert exited(pair)
+
+    pool.close()
+
+
+class FakePair(object):
+    def __init__(self, ports):
+        self.ports = ports
+        self.killed = False
+
+    def is_alive(self):
+        return not self.killed
+
+    def kill(self):
+        self.killed = True
+
+
+class FakePool(object):
+    """Hands out 'pairs' in order and keeps released ones"""
+    def __init__(self, pairs):
+        self.pairs = list(pairs)
+        self.released = []
+
+    def acquire(self):
+        return self.pairs.pop(0)
+
+    def release(self, pair):
+        self.released.append(pair)
+
+
+def test_env_replaces_pooled_pair_it_cannot_connect_to(local_tc, make_args):
+    # First pair doesn't serve a game anymore, second one does
+    stale = FakePair((1, 2))
+    fresh = FakePair(local_tc.create_game())
+    pool = FakePool([stale, fresh])
+
+    env = StarCraftMvN(make_args(launcher_pool=pool))
+    env.reset()
+
+    assert stale.killed
+    assert env.server_pair is fresh
+    assert (env.server_port1, env.server_port2) == fresh.ports
+
+    env.close()
+    assert pool.released == [fresh]
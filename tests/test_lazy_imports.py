@@ -0,0 +1,50 @@
+'''
+Importing the package and its modules must not import TorchCraft or yaml,
+they are only loaded once an env connects or reads its config. Checked in a
+fresh interpreter where importing them fails.
+'''
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = (
+    'gym_starcraft',
+    'gym_starcraft.envs.starcraft_base_env',
+    'gym_starcraft.envs.starcraft_mvn',
+    'gym_starcraft.envs.starcraft_explore',
+    'gym_starcraft.envs.starcraft_explore_comm',
+    'gym_starcraft.envs.starcraft_multi_arena',
+    'gym_starcraft.envs.starcraft_vec_env',
+    'gym_starcraft.envs.starcraft_wrapper_env',
+    'gym_starcraft.commands',
+    'gym_starcraft.dataset',
+    'gym_starcraft.launcher',
+    'gym_starcraft.raster',
+    'gym_starcraft.recorder',
+)
+
+SCRIPT = '''
+import importlib
+import sys
+
+class BlockImports(object):
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] in ('torchcraft', 'yaml'):
+            raise ImportError(name + ' imported at import time')
+
+sys.meta_path.insert(0, BlockImports())
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+
+# Constants are only loaded on first attribute access
+import gym_starcraft.torchcraft_constants
+'''
+
+
+def test_package_import_does_not_load_torchcraft():
+    result = subprocess.run([sys.executable, '-c', SCRIPT] + list(MODULES), cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    assert result.returncode == 0, result.stdout.decode()
@@ -0,0 +1,77 @@
+'''
+Arenas must fit on the map with the default scenario bounding box, keep
+their units inside their own boxes and reset like single envs, including
+fast reset, reset stats and phase timing. Runs against the local TorchCraft
+stand-in.
+'''
+import numpy as np
+import pytest
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+
+@pytest.mark.parametrize('narenas', [2, 4])
+def test_arenas_fit_default_range(make_arenas, seed, narenas):
+    env = make_arenas(StarCraftMvN, narenas)
+    env.reset()
+
+    map_size = env.host.state1.map_size
+    for arena in env.arenas:
+        low, high = arena._get_move_bounds()
+        assert np.all(low >= 0) and np.all(high < map_size)
+
+        for table in (arena.my_unit_table, arena.enemy_unit_table):
+            assert np.all((table.x >= low[0]) & (table.x <= high[0]))
+            assert np.all((table.y >= low[1]) & (table.y <= high[1]))
+
+
+def test_too_many_arenas_raise(make_arenas):
+    env = make_arenas(StarCraftMvN, 5)
+
+    with pytest.raises(RuntimeError):
+        env.reset()
+
+
+def play(env, rng, episodes):
+    """Steps arenas with random actions and resets done ones until
+    'episodes' episodes have finished"""
+    finished = 0
+    while finished < episodes:
+        actions = rng.randint(0, env.arenas[0].nactions, (env.narenas, env.nagents))
+        _, _, done, _ = env.step(actions)
+        if done.any():
+            indices = np.flatnonzero(done)
+            finished += len(indices)
+            env.reset(indices)
+
+
+def test_fast_reset_reuses_units_of_each_arena(make_arenas, seed):
+    env = make_arenas(StarCraftMvN, 2, ['--fast_reset', '--perf_stats'], max_steps=10)
+    env.reset()
+    assert all(arena.reset_stats['respawned'] for arena in env.arenas)
+
+    play(env, seed, 4)
+
+    for arena in env.arenas:
+        assert not arena.reset_stats['respawned']
+        assert arena.reset_stats['round_trips'] > 0
+        assert arena.perf_stats()['reset']['count'] > 1
+
+        low, high = arena._get_move_bounds()
+        for table in (arena.my_unit_table, arena.enemy_unit_table):
+            assert np.all(table.alive)
+            np.testing.assert_array_equal(table.health, table.max_health)
+            assert np.all((table.x >= low[0] - 1) & (table.x <= high[0] + 1))
+            assert np.all((table.y >= low[1] - 1) & (table.y <= high[1] + 1))
+
+
+def test_stats_of_last_finished_episode(make_arenas, seed):
+    env = make_arenas(StarCraftMvN, 2, max_steps=10)
+    env.reset()
+    assert env.get_stats() == [{}, {}]
+
+    play(env, seed, 4)
+
+    for stat in env.get_stats():
+        assert stat['success'] in (0, 1)
+        assert 0 < stat['steps_taken'] <= 10
@@ -0,0 +1,126 @@
+'''
+Vectorized observations of StarCraftMvN must match the per unit loop they
+replaced on fixed unit tables, including attack map updates. Runs against
+the local TorchCraft stand-in.
+'''
+import types
+
+import numpy as np
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+from gym_starcraft.unit_table import UnitTable
+
+NAGENTS = 4
+NENEMIES = 5
+
+
+def make_unit(unit_id, unit_type, x, y, health, shield=0, cd=0, attacking=False):
+    return types.SimpleNamespace(
+        id=unit_id, type=unit_type, x=x, y=y, health=health, shield=shield,
+        max_health=40, max_shield=60 if shield else 0, groundCD=cd, airCD=cd,
+        groundRange=4, airRange=4, attacking=attacking, starting_attack=False, idle=False)
+
+
+# Agent 2 and enemy 13 are dead, marines (0) and zealots (65) with shields
+AGENTS = [
+    make_unit(0, 0, 100, 100, 30, cd=5, attacking=True),
+    make_unit(1, 65, 110, 130, 80, shield=20, cd=12, attacking=True),
+    make_unit(3, 0, 180, 100, 40),
+]
+ENEMIES = [
+    make_unit(10, 0, 104, 103, 20, cd=15),
+    make_unit(11, 65, 150, 140, 100, shield=60, cd=3),
+    make_unit(12, 0, 250, 10, 40, cd=30),
+    make_unit(14, 65, 112, 128, 50, shield=0, cd=22),
+]
+
+
+def set_units(env, agents, enemies, prev_actions):
+    """Puts fixed units into unit tables of 'env' like a step would"""
+    env.agent_ids = [0, 1, 2, 3]
+    env.enemy_ids = [10, 11, 12, 13, 14]
+    env.my_unit_table = UnitTable(env.agent_ids)
+    env.enemy_unit_table = UnitTable(env.enemy_ids)
+    env.my_unit_table.update(agents)
+    env.enemy_unit_table.update(enemies)
+    env.my_current_units = env.my_unit_table.units
+    env.enemy_current_units = env.enemy_unit_table.units
+    env.prev_actions = np.asarray(prev_actions)
+    env.attack_map = np.zeros((env.nagents, env.nenemies))
+
+
+def loop_observation(env):
+    """Per unit loop building observations and attack map as before vectorization,
+    with vision, max health and max cooldown taken from unit type table"""
+    unit_types = env.unit_types
+    full_obs = np.zeros((env.nagents, 5 + 5 * env.nenemies))
+    attack_map = np.zeros((env.nagents, env.nenemies))
+
+    def hp(unit):
+        max_health = unit_types.max_health[unit.type] or unit.max_health
+        max_shield = unit_types.max_shield[unit.type] or unit.max_shield
+        return (unit.health + unit.shield) / (max_health + max_shield)
+
+    def cd(unit):
+        value = unit.airCD if unit_types.air_cd[unit.type] else unit.groundCD
+        return min(value / unit_types.max_cd[unit.type], 1)
+
+    for idx, agent_id in enumerate(env.agent_ids):
+        myself = env.my_current_units.get(agent_id)
+        if myself is None:
+            continue
+
+        vision = unit_types.sight_range[myself.type]
+        curr_obs = full_obs[idx]
+        curr_obs[0] = myself.x / env.state1.map_size[0]
+        curr_obs[1] = myself.y / env.state1.map_size[1]
+        curr_obs[2] = hp(myself)
+        curr_obs[3] = cd(myself)
+        curr_obs[4] = env.prev_actions[idx] / env.nactions
+
+        for enemy_idx, enemy_id in enumerate(env.enemy_ids):
+            enemy = env.enemy_current_units.get(enemy_id)
+            if enemy is None:
+                continue
+
+            if (myself.attacking or myself.starting_attack) and \
+                    env.prev_actions[idx] == enemy_idx + len(env.move_steps):
+                attack_map[idx][enemy_idx] = 1
+
+            obs_idx = 5 + enemy_idx * 5
+            if np.hypot(myself.x - enemy.x, myself.y - enemy.y) <= vision or env.full_vision:
+                curr_obs[obs_idx] = (myself.x - enemy.x) / vision
+                curr_obs[obs_idx + 1] = (myself.y - enemy.y) / vision
+            else:
+                curr_obs[obs_idx + 2] = 1
+
+            curr_obs[obs_idx + 3] = hp(enemy)
+            curr_obs[obs_idx + 4] = cd(enemy)
+
+    return full_obs, attack_map
+
+
+def make_mvn(make_env, **overrides):
+    env = make_env(StarCraftMvN, nagents=NAGENTS, nenemies=NENEMIES, **overrides)
+    env.reset()
+    # Vision differs per type, zealots see less than marines
+    env.unit_types.sight_range[0] = 30
+    env.unit_types.sight_range[65] = 10
+    return env
+
+
+def test_observation_matches_loop(make_env):
+    for full_vision in (False, True):
+        env = make_mvn(make_env, full_vision=full_vision)
+        nmoves = len(env.move_steps)
+        set_units(env, AGENTS, ENEMIES, [nmoves, nmoves + 3, 2, nmoves + 4])
+
+        obs = env._make_observation()
+        expected_obs, expected_attack_map = loop_observation(env)
+
+        np.testing.assert_allclose(obs, expected_obs)
+        np.testing.assert_array_equal(env.attack_map, expected_attack_map)
+        # Fixed units cover seen, unseen, dead and attacked pairs
+        assert expected_attack_map.sum() == 1
+        if not full_vision:
+            assert expected_obs[:, 7::5].any()
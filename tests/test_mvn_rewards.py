@@ -0,0 +1,97 @@
+'''
+Vectorized step and terminal rewards of StarCraftMvN must match the per
+agent loops they replaced, also for batches of environments stacked along
+leading dimensions.
+'''
+import numpy as np
+
+from gym_starcraft.envs import starcraft_mvn
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+NAGENTS = 4
+NENEMIES = 5
+
+
+def loop_step_reward(obs, obs_pre, attack_map, alive_mask, timestep_penalty):
+    reward = np.zeros(len(obs))
+    for idx in range(len(obs)):
+        if alive_mask[idx]:
+            reward[idx] += timestep_penalty
+        reward[idx] += obs[idx][2] - obs_pre[idx][2]
+
+        for enemy_idx in range(attack_map.shape[1]):
+            obs_idx = 5 + enemy_idx * 5
+            if attack_map[idx][enemy_idx] == 1:
+                reward[idx] += obs_pre[idx][obs_idx + 3] - obs[idx][obs_idx + 3]
+    return reward
+
+
+def loop_terminal_reward(obs_pre, attack_map, has_won, more_alive):
+    nenemies = attack_map.shape[1]
+    reward = np.zeros(len(obs_pre))
+    for idx in range(len(obs_pre)):
+        for enemy_idx in range(nenemies):
+            reward[idx] += 0 - obs_pre[idx][5 + enemy_idx * 5 + 3] * 3
+
+        if has_won and attack_map[idx].any():
+            reward[idx] += 5 * nenemies + obs_pre[idx][2] * 3
+        elif more_alive:
+            reward[idx] += 2
+        else:
+            reward[idx] += 0 - obs_pre[idx][2] * 3
+    return reward
+
+
+def random_rewards_inputs(rng, batch=()):
+    shape = batch + (NAGENTS, 5 + 5 * NENEMIES)
+    obs = rng.rand(*shape)
+    obs_pre = rng.rand(*shape)
+    attack_map = (rng.rand(*(batch + (NAGENTS, NENEMIES))) < 0.3).astype(np.float64)
+    alive_mask = (rng.rand(*(batch + (NAGENTS,))) < 0.7).astype(np.float64)
+    return obs, obs_pre, attack_map, alive_mask
+
+
+def test_rewards_match_loop():
+    rng = np.random.RandomState(0)
+    penalty = StarCraftMvN.TIMESTEP_PENALTY
+
+    for _ in range(10):
+        obs, obs_pre, attack_map, alive_mask = random_rewards_inputs(rng)
+
+        np.testing.assert_allclose(
+            starcraft_mvn.compute_step_reward(obs, obs_pre, attack_map, alive_mask, penalty),
+            loop_step_reward(obs, obs_pre, attack_map, alive_mask, penalty))
+
+        for has_won in (False, True):
+            for more_alive in (False, True):
+                np.testing.assert_allclose(
+                    starcraft_mvn.compute_terminal_reward(obs_pre, attack_map,
+                                                          has_won, more_alive),
+                    loop_terminal_reward(obs_pre, attack_map, has_won, more_alive))
+
+
+def test_rewards_of_batched_envs():
+    rng = np.random.RandomState(1)
+    penalty = StarCraftMvN.TIMESTEP_PENALTY
+    batch = (3, 2)
+    obs, obs_pre, attack_map, alive_mask = random_rewards_inputs(rng, batch)
+    has_won = rng.rand(*batch) < 0.5
+    more_alive = rng.rand(*batch) < 0.5
+
+    step_reward = starcraft_mvn.compute_step_reward(obs, obs_pre, attack_map,
+                                                    alive_mask, penalty)
+    terminal_reward = starcraft_mvn.compute_terminal_reward(obs_pre, attack_map,
+                                                            has_won, more_alive)
+
+    assert step_reward.shape == batch + (NAGENTS,)
+    assert terminal_reward.shape == batch + (NAGENTS,)
+
+    for index in np.ndindex(*batch):
+        np.testing.assert_allclose(
+            step_reward[index],
+            loop_step_reward(obs[index], obs_pre[index], attack_map[index],
+                             alive_mask[index], penalty))
+        np.testing.assert_allclose(
+            terminal_reward[index],
+            loop_terminal_reward(obs_pre[index], attack_map[index],
+                                 has_won[index], more_alive[index]))
@@ -0,0 +1,121 @@
+'''
+Grids cropped from the map grid must match a per agent, per unit loop over
+windows, and grid mode must give same rewards as vector mode. Env tests run
+against the local TorchCraft stand-in.
+'''
+import random
+
+import numpy as np
+import pytest
+
+import gym_starcraft.raster as raster
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+MAP_SIZE = (256, 256)
+
+
+def random_units(rng, count):
+    alive = rng.rand(count) < 0.8
+    return {
+        'alive': alive,
+        'x': np.where(alive, rng.uniform(0, MAP_SIZE[0], count), 0),
+        'y': np.where(alive, rng.uniform(0, MAP_SIZE[1], count), 0),
+        'hp': np.where(alive, rng.rand(count), 0),
+        'cd': np.where(alive, rng.rand(count), 0),
+    }
+
+
+def loop_rasterize(me, enemy, vision, grid_size, crop_size):
+    """Rasterizes every (agent, unit) pair on its own"""
+    if crop_size > 0:
+        cell = np.full(2, crop_size / grid_size)
+    else:
+        cell = np.asarray(MAP_SIZE, dtype=float) / grid_size
+    ncells = np.ceil(np.asarray(MAP_SIZE) / cell).astype(int)
+
+    def cell_of(x, y):
+        return (min(int(np.floor(x / cell[0])), ncells[0] - 1),
+                min(int(np.floor(y / cell[1])), ncells[1] - 1))
+
+    grids = np.zeros((len(me['alive']), len(raster.CHANNELS), grid_size, grid_size))
+    for agent in np.flatnonzero(me['alive']):
+        agent_col, agent_row = cell_of(me['x'][agent], me['y'][agent])
+        first_col = agent_col - grid_size // 2 if crop_size > 0 else 0
+        first_row = agent_row - grid_size // 2 if crop_size > 0 else 0
+        grids[agent, 0, agent_row - first_row, agent_col - first_col] = 1
+
+        for units, channel, is_enemy in ((me, 1, False), (enemy, 4, True)):
+            for idx in np.flatnonzero(units['alive']):
+                col, row = cell_of(units['x'][idx], units['y'][idx])
+                col, row = col - first_col, row - first_row
+                if not (0 <= col < grid_size and 0 <= row < grid_size):
+                    continue
+
+                if is_enemy and vision is not None:
+                    center_x = (col + first_col + 0.5) * cell[0]
+                    center_y = (row + first_row + 0.5) * cell[1]
+                    if np.hypot(center_x - me['x'][agent],
+                                center_y - me['y'][agent]) > vision[agent]:
+                        continue
+
+                grids[agent, channel, row, col] += 1
+                grids[agent, channel + 1, row, col] += units['hp'][idx]
+                grids[agent, channel + 2, row, col] += units['cd'][idx]
+
+    return grids
+
+
+@pytest.mark.parametrize('crop_size', [0, 24, 64])
+@pytest.mark.parametrize('full_vision', [False, True])
+def test_rasterize_matches_loop(crop_size, full_vision):
+    rng = np.random.RandomState(0)
+    rasterizer = raster.Rasterizer(16, crop_size, MAP_SIZE)
+
+    # Map grid is reused, every call must only see its own units
+    for _ in range(3):
+        me = random_units(rng, 12)
+        enemy = random_units(rng, 40)
+        # Crowd some units into cells of agents
+        enemy['x'][:10] = me['x'][:10] + rng.uniform(-4, 4, 10)
+        enemy['y'][:10] = me['y'][:10] + rng.uniform(-4, 4, 10)
+        enemy['x'] = np.clip(enemy['x'], 0, MAP_SIZE[0] - 1)
+        enemy['y'] = np.clip(enemy['y'], 0, MAP_SIZE[1] - 1)
+        vision = None if full_vision else rng.uniform(8, 64, 12)
+
+        grids = rasterizer.rasterize(me, enemy, vision)
+        expected = loop_rasterize(me, enemy, vision, 16, crop_size)
+
+        np.testing.assert_allclose(grids, expected)
+
+
+def reseed():
+    random.seed(0)
+    np.random.seed(0)
+
+
+def play(env, actions):
+    env.reset()
+    rewards = []
+    for action in actions:
+        _, reward, done, _ = env.step(action)
+        rewards.append(reward)
+        if done:
+            break
+    return rewards
+
+
+@pytest.mark.parametrize('crop', [0, 32])
+def test_grid_mode_rewards_match_vector_mode(make_env, crop):
+    rng = np.random.RandomState(1)
+    actions = [rng.randint(0, 9 + 3, 3) for _ in range(20)]
+
+    reseed()
+    vector_rewards = play(make_env(StarCraftMvN), actions)
+
+    reseed()
+    env = make_env(StarCraftMvN, obs_mode='grid', grid_crop=crop)
+    grid_rewards = play(env, actions)
+
+    assert env.observation_space.shape == (len(raster.CHANNELS), 32, 32)
+    assert len(grid_rewards) == len(vector_rewards)
+    np.testing.assert_allclose(grid_rewards, vector_rewards)
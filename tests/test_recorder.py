@@ -0,0 +1,47 @@
+'''
+Failures of the recorder's writer thread must reach the caller instead of
+blocking steps or leaving a stale index behind.
+'''
+import json
+import os
+
+import numpy as np
+import pytest
+
+from gym_starcraft.recorder import TrajectoryRecorder, META_FILE
+
+
+def record(recorder, obs_shape):
+    recorder.record_step(np.zeros(obs_shape), [0, 1], 1.0, False, [1, 1])
+
+
+def test_writer_failure_is_raised(tmp_path):
+    recorder = TrajectoryRecorder(str(tmp_path), chunk_size=4, queue_size=2)
+    recorder.record_reset()
+    record(recorder, (2, 3))
+
+    # Observation of another shape can't be written to the open chunk, later
+    # steps must raise rather than block on the full queue
+    with pytest.raises(RuntimeError):
+        for _ in range(1000):
+            record(recorder, (4, 5))
+
+    with pytest.raises(RuntimeError):
+        recorder.close()
+
+    # Index still covers the step written before the failure
+    with open(os.path.join(str(tmp_path), META_FILE)) as f:
+        assert json.load(f)['num_steps'] == 1
+
+
+def test_close_writes_index(tmp_path):
+    recorder = TrajectoryRecorder(str(tmp_path), chunk_size=4)
+    recorder.record_reset()
+    for _ in range(6):
+        record(recorder, (2, 3))
+    recorder.close()
+
+    with open(os.path.join(str(tmp_path), META_FILE)) as f:
+        meta = json.load(f)
+    assert meta['num_steps'] == 6
+    assert meta['num_chunks'] == 2
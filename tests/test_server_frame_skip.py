@@ -0,0 +1,81 @@
+'''
+Observations with 'server_frame_skip' must match the client side frame skip,
+including polls of '_has_step_completed' which stay one frame apart.
+Runs against the local TorchCraft stand-in with 'concurrent_io', so that
+commands of both clients reach the game before it advances in both modes.
+Frames are compared from start of each episode, as waits of reset advance
+the server by 'frame_skip' + 1 frames per exchange.
+'''
+import random
+
+import numpy as np
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+
+
+class PollingMvN(StarCraftMvN):
+    """MvN whose steps complete after 'POLLS' polls, recording frames of polls"""
+    POLLS = 3
+
+    def _make_commands(self, actions):
+        self.polls = []
+        return super(PollingMvN, self)._make_commands(actions)
+
+    def _has_step_completed(self):
+        self.polls.append(self.state1.frame_from_bwapi)
+        return len(self.polls) >= self.POLLS
+
+
+FLAGS = ['--frame_skip', '8', '--init_range_start', '100', '--init_range_end', '130',
+         '--step_size', '4', '--concurrent_io']
+
+
+def run_episodes(make_env, env_class, server_frame_skip, episodes=3, seed=0):
+    random.seed(seed)
+    rng = np.random.RandomState(seed)
+    env = make_env(env_class, FLAGS, nagents=4, max_steps=40,
+                   server_frame_skip=server_frame_skip)
+
+    trace = []
+    for _ in range(episodes):
+        obs = env.reset()
+        start = env.state1.frame_from_bwapi
+        trace.append(('reset', obs.copy(), 0))
+        done = False
+
+        while not done:
+            obs, reward, done, _ = env.step(rng.randint(0, env.nactions, env.nagents))
+            polls = [frame - start for frame in getattr(env, 'polls', [])]
+            trace.append(('step', obs.copy(), env.state1.frame_from_bwapi - start,
+                          reward.copy(), polls))
+
+    env.close()
+    return trace, env.round_trips
+
+
+def assert_same_trace(trace, expected):
+    assert len(trace) == len(expected)
+
+    for record, expected_record in zip(trace, expected):
+        assert record[0] == expected_record[0]
+        np.testing.assert_allclose(record[1], expected_record[1])
+        for value, expected_value in zip(record[2:], expected_record[2:]):
+            np.testing.assert_allclose(value, expected_value)
+
+
+def test_observations_match_client_frame_skip(make_env):
+    client_trace, client_round_trips = run_episodes(make_env, StarCraftMvN, False)
+    server_trace, server_round_trips = run_episodes(make_env, StarCraftMvN, True)
+
+    assert_same_trace(server_trace, client_trace)
+    assert server_round_trips < client_round_trips
+
+
+def test_polls_stay_one_frame_apart(make_env):
+    client_trace, _ = run_episodes(make_env, PollingMvN, False)
+    server_trace, _ = run_episodes(make_env, PollingMvN, True)
+
+    assert_same_trace(server_trace, client_trace)
+
+    polls = [record[4] for record in server_trace if record[0] == 'step']
+    assert all(np.all(np.diff(step_polls) == 1) for step_polls in polls if len(step_polls) > 1)
@@ -0,0 +1,82 @@
+'''
+SpatialHash queries must find exactly the pairs a brute force distance
+check finds, also after units move, die, come back and the row count changes.
+'''
+import numpy as np
+import pytest
+
+from gym_starcraft.spatial_hash import SpatialHash
+
+
+def brute_force(qx, qy, radius, x, y, alive):
+    distances = np.hypot(x[None, :] - qx[:, None], y[None, :] - qy[:, None])
+    queries, rows = np.nonzero((distances <= radius) & alive[None, :])
+    return set(zip(queries.tolist(), rows.tolist())), distances
+
+
+def assert_matches_brute_force(spatial_hash, qx, qy, radius, x, y, alive):
+    queries, rows, distances = spatial_hash.query(qx, qy, radius, x, y)
+    expected, expected_distances = brute_force(qx, qy, radius, x, y, alive)
+
+    pairs = list(zip(queries.tolist(), rows.tolist()))
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == expected
+    np.testing.assert_allclose(distances, expected_distances[queries, rows])
+
+
+@pytest.mark.parametrize('cell_size,radius', [(10, 10), (10, 25), (30, 7)])
+def test_query_matches_brute_force(cell_size, radius):
+    rng = np.random.RandomState(0)
+    count = 200
+    spatial_hash = SpatialHash(cell_size)
+    x = rng.uniform(0, 256, count)
+    y = rng.uniform(0, 256, count)
+    alive = rng.rand(count) < 0.9
+
+    for _ in range(20):
+        spatial_hash.update(x, y, alive)
+        qx = rng.uniform(-10, 266, 30)
+        qy = rng.uniform(-10, 266, 30)
+        assert_matches_brute_force(spatial_hash, qx, qy, radius, x, y, alive)
+
+        # Units move a little, some across cell borders, some die or come back
+        x = np.clip(x + rng.uniform(-3, 3, count), 0, 256)
+        y = np.clip(y + rng.uniform(-3, 3, count), 0, 256)
+        flip = rng.rand(count) < 0.05
+        alive = alive ^ flip
+
+
+def test_points_on_radius_and_cell_borders():
+    spatial_hash = SpatialHash(8)
+    x = np.array([8., 16., 0., 24., 13.])
+    y = np.array([0., 8., 8., 8., 4.])
+    alive = np.ones(len(x), dtype=bool)
+    spatial_hash.update(x, y, alive)
+
+    # Radius is inclusive, units exactly at radius 8 are found
+    assert_matches_brute_force(spatial_hash, np.array([8.]), np.array([8.]), 8, x, y, alive)
+    _, rows, _ = spatial_hash.query(np.array([8.]), np.array([8.]), 8, x, y)
+    assert set(rows.tolist()) == {0, 1, 2, 4}
+
+
+def test_row_count_change_clears_hash():
+    rng = np.random.RandomState(1)
+    spatial_hash = SpatialHash(10)
+    spatial_hash.update(rng.uniform(0, 100, 50), rng.uniform(0, 100, 50), np.ones(50, dtype=bool))
+
+    x = rng.uniform(0, 100, 20)
+    y = rng.uniform(0, 100, 20)
+    alive = np.ones(20, dtype=bool)
+    spatial_hash.update(x, y, alive)
+
+    assert sum(len(rows) for rows in spatial_hash.cells.values()) == 20
+    assert_matches_brute_force(spatial_hash, x, y, 15, x, y, alive)
+
+
+def test_empty_query():
+    spatial_hash = SpatialHash(10)
+    spatial_hash.update(np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool))
+    queries, rows, distances = spatial_hash.query(np.array([5.]), np.array([5.]), 10,
+                                                  np.zeros(0), np.zeros(0))
+
+    assert len(queries) == len(rows) == len(distances) == 0
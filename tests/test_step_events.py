@@ -0,0 +1,69 @@
+'''
+Steps with event based completion must only end when a tracked order
+really finishes, or after max frames.
+'''
+import numpy as np
+import pytest
+
+from gym_starcraft.step_events import StepEvents
+from gym_starcraft.torchcraft_constants import tcc
+from gym_starcraft.unit_table import UnitTable
+
+
+MAX_FRAMES = 24
+
+# Order types come from TorchCraft constants
+pytestmark = pytest.mark.usefixtures('local_tc')
+
+
+def make_table(x, y):
+    table = UnitTable(list(range(len(x))))
+    table.x[:] = x
+    table.y[:] = y
+    table.alive[:] = True
+    table.idle[:] = True
+    return table
+
+
+def start_moves(table, target_x, target_y):
+    events = StepEvents(MAX_FRAMES)
+    events.start(0)
+    rows = np.arange(len(table))
+    orders = np.full(len(table), tcc.unitcommandtypes.Move)
+    events.add(table, rows, orders, np.asarray(target_x), np.asarray(target_y),
+               np.zeros(len(table)))
+    return events
+
+
+def test_move_to_current_position_is_not_tracked():
+    table = make_table([10, 20], [10, 20])
+    events = start_moves(table, [10, 20], [10, 20])
+
+    assert len(events.rows) == 0
+    assert not events.poll(1, np.zeros(2))
+    assert events.poll(MAX_FRAMES, np.zeros(2))
+
+
+def test_idle_is_ignored_on_first_poll():
+    table = make_table([10, 20], [10, 20])
+    events = start_moves(table, [10, 30], [10, 20])
+
+    # Second unit hasn't picked up its order yet
+    assert not events.poll(1, np.zeros(2))
+
+    table.idle[1] = False
+    assert not events.poll(2, np.zeros(2))
+
+    table.idle[1] = True
+    assert events.poll(3, np.zeros(2))
+
+
+def test_arrival_ends_step():
+    table = make_table([10, 20], [10, 20])
+    events = start_moves(table, [30, 40], [10, 20])
+    table.idle[:] = False
+
+    assert not events.poll(1, np.zeros(2))
+
+    table.x[1] = 40
+    assert events.poll(2, np.zeros(2))
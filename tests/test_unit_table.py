@@ -0,0 +1,68 @@
+'''
+UnitTable must keep a stable row per unit id, mark units missing from an
+update as dead with their last values and ignore units without a row.
+'''
+import types
+
+import numpy as np
+
+from gym_starcraft.unit_table import UnitTable
+
+
+def make_unit(unit_id, x, health, **kwargs):
+    attributes = dict(id=unit_id, type=0, x=x, y=2 * x, health=health, shield=0,
+                      max_health=40, max_shield=0, groundCD=0, airCD=0,
+                      groundRange=4, airRange=4, attacking=False,
+                      starting_attack=False, idle=True)
+    attributes.update(kwargs)
+    return types.SimpleNamespace(**attributes)
+
+
+def test_update_adds_and_removes_units():
+    table = UnitTable([5, 3, 9])
+    assert len(table) == 3
+    assert not table.alive.any()
+
+    # Order of units doesn't matter, rows follow ids given at creation
+    units = [make_unit(9, 30, 10, groundCD=4), make_unit(5, 10, 40, starting_attack=True),
+             make_unit(3, 20, 25, idle=False)]
+    table.update(units)
+
+    np.testing.assert_array_equal(table.id, [5, 3, 9])
+    np.testing.assert_array_equal(table.alive, [True, True, True])
+    np.testing.assert_array_equal(table.x, [10, 20, 30])
+    np.testing.assert_array_equal(table.y, [20, 40, 60])
+    np.testing.assert_array_equal(table.health, [40, 25, 10])
+    np.testing.assert_array_equal(table.ground_cd, [0, 0, 4])
+    np.testing.assert_array_equal(table.attacking, [True, False, False])
+    np.testing.assert_array_equal(table.idle, [True, False, True])
+    assert set(table.units) == {5, 3, 9}
+
+    # Unit 3 died, unit 9 moved, unit 7 has no row
+    table.update([make_unit(9, 31, 8), make_unit(5, 10, 40), make_unit(7, 50, 40)])
+
+    np.testing.assert_array_equal(table.alive, [True, False, True])
+    np.testing.assert_array_equal(table.x, [10, 20, 31])
+    np.testing.assert_array_equal(table.health, [40, 25, 8])
+    assert set(table.units) == {5, 9}
+    assert table.units[9].x == 31
+
+    # Dead unit comes back in place of its row
+    table.update([make_unit(3, 21, 5)])
+
+    np.testing.assert_array_equal(table.alive, [False, True, False])
+    np.testing.assert_array_equal(table.x, [10, 21, 31])
+    assert set(table.units) == {3}
+
+    table.update([])
+    assert not table.alive.any()
+    assert table.units == {}
+
+
+def test_empty_table():
+    table = UnitTable([])
+    table.update([make_unit(1, 10, 40)])
+
+    assert len(table) == 0
+    assert table.x.shape == (0,)
+    assert table.units == {}
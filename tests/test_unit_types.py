@@ -0,0 +1,55 @@
+'''
+Cooldown ratios must stay in [0, 1] and be fixed per unit type, for types
+with and without attributes in the environment.
+'''
+import numpy as np
+
+from gym_starcraft.unit_table import UnitTable
+from gym_starcraft.unit_types import UnitTypeTable, DEFAULT_MAX_CD
+
+
+MARINE = 0
+ZERGLING = 37
+# Type without a weapon cooldown in the table
+UNKNOWN = 200
+
+UNIT_ATTRIBUTES = {
+    MARINE: {'cdAttribute': 'groundCD', 'maxCD': 15, 'rangeAttribute': 'groundRange'}
+}
+
+# One entry per unit type like tcc.staticvalues
+STATIC_VALUES = {'sightRange': [224] * 234}
+
+
+def make_table(types, ground_cd):
+    table = UnitTable(list(range(len(types))))
+    table.type[:] = types
+    table.ground_cd[:] = ground_cd
+    table.alive[:] = True
+    return table
+
+
+def test_cooldown_ratio_of_known_type():
+    unit_types = UnitTypeTable(STATIC_VALUES, UNIT_ATTRIBUTES)
+    ratio = unit_types.get_cooldown_ratio(make_table([MARINE, MARINE], [15, 5]))
+
+    assert np.allclose(ratio, [1, 5 / 15])
+
+
+def test_cooldown_ratio_of_type_without_attributes_is_fixed():
+    unit_types = UnitTypeTable(STATIC_VALUES, UNIT_ATTRIBUTES)
+
+    # Zergling claws have a BWAPI cooldown of 8 frames
+    ratio = unit_types.get_cooldown_ratio(make_table([ZERGLING, ZERGLING], [8, 2]))
+    assert np.allclose(ratio, [1, 2 / 8])
+
+    # Same cooldown has same ratio whatever was seen before
+    ratio = unit_types.get_cooldown_ratio(make_table([ZERGLING, ZERGLING], [4, 2]))
+    assert np.allclose(ratio, [4 / 8, 2 / 8])
+
+
+def test_cooldown_ratio_of_unknown_type_is_clipped():
+    unit_types = UnitTypeTable(STATIC_VALUES, UNIT_ATTRIBUTES)
+    ratio = unit_types.get_cooldown_ratio(make_table([UNKNOWN, UNKNOWN], [50, 1000]))
+
+    assert np.allclose(ratio, [50 / DEFAULT_MAX_CD, 1])
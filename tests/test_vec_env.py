@@ -0,0 +1,113 @@
+'''
+Workers of StarCraftVecEnv must write the same results an env in this
+process gets into shared buffers, and errors of workers, also while building
+their env, must surface as RuntimeError. Workers are forked with the local
+TorchCraft stand-in installed.
+'''
+import multiprocessing as mp
+import random
+
+import numpy as np
+import pytest
+
+from gym_starcraft.envs.starcraft_mvn import StarCraftMvN
+from gym_starcraft.envs.starcraft_vec_env import StarCraftVecEnv
+
+
+def reseed():
+    random.seed(0)
+    np.random.seed(0)
+
+
+@pytest.fixture
+def make_vec_env(local_tc):
+    """Returns factory of vec envs of local 'env_class' with forked workers,
+    closed at end of the test"""
+    envs = []
+
+    def make(env_class, args_list):
+        env = StarCraftVecEnv(local_tc.local_env(env_class), args_list, start_method='fork')
+        envs.append(env)
+        return env
+
+    yield make
+
+    for env in envs:
+        env.close()
+
+
+class SeededMvN(StarCraftMvN):
+    """MvN seeding random modules when it is built, as forked workers
+    reseed 'random'"""
+    def __init__(self, args, final_init=True):
+        if final_init:
+            reseed()
+        super(SeededMvN, self).__init__(args, final_init)
+
+
+class BrokenMvN(StarCraftMvN):
+    """MvN which fails to build in workers"""
+    def __init__(self, args, final_init=True):
+        if final_init:
+            raise ValueError('broken env')
+        super(BrokenMvN, self).__init__(args, final_init)
+
+
+def test_shared_buffers_round_trip(make_vec_env, make_env, make_args):
+    args = make_args()
+    rng = np.random.RandomState(1)
+    actions = [rng.randint(0, 9 + args.nenemies, args.nagents) for _ in range(5)]
+
+    vec_env = make_vec_env(SeededMvN, [args, args])
+    vec_obs = [vec_env.reset().copy()]
+    vec_steps = []
+    for action in actions:
+        obs, reward, done, alive_mask = vec_env.step([action, action])
+        assert obs is vec_env.buffers['obs']
+        vec_steps.append((obs.copy(), reward.copy(), done.copy(), alive_mask.copy()))
+
+    env = make_env(SeededMvN)
+    expected_obs = env.reset()
+    for row in range(2):
+        np.testing.assert_allclose(vec_obs[0][row], expected_obs)
+
+    for action, (obs, reward, done, alive_mask) in zip(actions, vec_steps):
+        expected_obs, expected_reward, expected_done, info = env.step(action)
+        for row in range(2):
+            np.testing.assert_allclose(obs[row], expected_obs)
+            np.testing.assert_allclose(reward[row], expected_reward)
+            assert done[row] == expected_done
+            np.testing.assert_allclose(alive_mask[row], info['alive_mask'])
+
+    assert vec_env.get_stats() == [env.stat, env.stat]
+
+
+def test_worker_error_while_building_env(local_tc, make_args):
+    with pytest.raises(RuntimeError, match='broken env'):
+        StarCraftVecEnv(local_tc.local_env(BrokenMvN), [make_args()], start_method='fork')
+
+
+def test_worker_error_while_building_closes_other_workers(local_tc, make_args):
+    # Second worker fails, first one builds its env and must be closed
+    class SecondBrokenMvN(StarCraftMvN):
+        def __init__(self, args, final_init=True):
+            if final_init and args.nenemies == 2:
+                raise ValueError('broken env')
+            super(SecondBrokenMvN, self).__init__(args, final_init)
+
+    with pytest.raises(RuntimeError, match='broken env'):
+        StarCraftVecEnv(local_tc.local_env(SecondBrokenMvN),
+                        [make_args(), make_args(nenemies=2)], start_method='fork')
+
+    assert mp.active_children() == []
+
+
+def test_worker_exit_raises(make_vec_env, make_args):
+    vec_env = make_vec_env(StarCraftMvN, [make_args(), make_args()])
+    vec_env.reset()
+
+    vec_env.processes[1].kill()
+    vec_env.processes[1].join()
+
+    with pytest.raises(RuntimeError, match='exited'):
+        vec_env.reset()
@@ -0,0 +1,73 @@
+'''
+Waiting for a TorchCraft server must return its port, or raise with the
+launcher's output when it doesn't start in time or exits first. Launchers
+are played by tests/fake_launcher.py.
+'''
+import time
+
+import pytest
+
+import gym_starcraft.launcher as launcher
+
+
+def start(fake_launcher_config, tmp_path, mode):
+    launcher_path, options = launcher.load_launcher_config(fake_launcher_config(mode))
+    return launcher.ServerProcess(launcher_path, str(tmp_path), options)
+
+
+def test_returns_port(fake_launcher_config, tmp_path):
+    proc = start(fake_launcher_config, tmp_path, 'ok')
+    try:
+        port = proc.wait_port(10)
+        assert proc.logs()[-1] == 'TorchCraft server listening on port %d' % port
+    finally:
+        proc.kill()
+
+
+def test_timeout_raises_with_output(fake_launcher_config, tmp_path):
+    proc = start(fake_launcher_config, tmp_path, 'hang')
+    try:
+        start_time = time.monotonic()
+        with pytest.raises(RuntimeError, match='did not start in time') as error:
+            proc.wait_port(0.5)
+
+        assert time.monotonic() - start_time < 5
+        assert 'fake BWAPILauncher starting' in str(error.value)
+        assert proc.poll() is None
+    finally:
+        proc.kill()
+
+
+def test_early_exit_raises_with_code(fake_launcher_config, tmp_path):
+    proc = start(fake_launcher_config, tmp_path, 'exit')
+
+    # Exit is noticed before the timeout
+    start_time = time.monotonic()
+    with pytest.raises(RuntimeError, match='exited with code 3') as error:
+        proc.wait_port(30)
+
+    assert time.monotonic() - start_time < 10
+    assert 'fake BWAPILauncher starting' in str(error.value)
+
+
+def test_failed_pair_kills_started_servers(fake_launcher_config, tmp_path, monkeypatch):
+    launcher_path, options = launcher.load_launcher_config(fake_launcher_config('ok'))
+    procs = []
+    start_server = launcher.start_server
+
+    # Second server of the pair never prints its port
+    def start_second_hanging(launcher_path, torchcraft_dir, options):
+        if len(procs) == 1:
+            options = dict(options, FAKE_LAUNCHER_MODE='hang')
+        procs.append(start_server(launcher_path, torchcraft_dir, options))
+        return procs[-1]
+
+    monkeypatch.setattr(launcher, 'start_server', start_second_hanging)
+
+    with pytest.raises(RuntimeError, match='did not start in time'):
+        launcher.start_server_pairs(launcher_path, str(tmp_path), options, timeout=1)
+
+    # Both servers were killed, waiting on them would time out otherwise
+    assert len(procs) == 2
+    for proc in procs:
+        proc.proc.wait(5)